@@ -60,17 +60,19 @@ class DockerClientWrapper(DockerUtilityMixin, APIClient):
                     raise DockerStatusError(log_str, output.get('errorDetail'))
         return image_str or log_str  # Line with image id or last line written to stdout
 
-    def _docker_status_stream(self, response, raise_on_error):
+    def _docker_status_stream(self, response, raise_on_error, progress=None):
         result = {}
         for e in response:
             output = parse_response(e)
             if output:
                 result.update(output)
+                if progress is not None:
+                    progress.update(output)
                 if 'status' in output:
                     oid = output.get('id')
-                    progress = output.get('progress', '')
+                    progress_bar = output.get('progress', '')
                     if oid:
-                        self.push_progress(output['status'], oid, progress)
+                        self.push_progress(output['status'], oid, progress_bar)
                     else:
                         self.push_log(output['status'], logging.INFO)
                 elif 'error' in output:
@@ -78,6 +80,8 @@ class DockerClientWrapper(DockerUtilityMixin, APIClient):
                     self.push_log(error_message, logging.ERROR)
                     if raise_on_error:
                         raise DockerStatusError(error_message, output.get('errorDetail'))
+        if progress is not None:
+            progress.finish()
         return result
 
     def push_progress(self, status, object_id, progress):
@@ -150,7 +154,7 @@ class DockerClientWrapper(DockerUtilityMixin, APIClient):
         response = super(DockerClientWrapper, self).login(username, password, email, registry, reauth=reauth, **kwargs)
         return response.get('Status') == 'Login Succeeded' or response.get('username') == username
 
-    def pull(self, repository, tag=None, stream=False, raise_on_error=True, **kwargs):
+    def pull(self, repository, tag=None, stream=False, raise_on_error=True, progress=None, **kwargs):
         """
         Pulls an image repository from the registry.
 
@@ -163,18 +167,21 @@ class DockerClientWrapper(DockerUtilityMixin, APIClient):
         :param raise_on_error: Raises errors in the status output as a DockerStatusException. Otherwise only logs
          errors.
         :type raise_on_error: bool
+        :param progress: Optional aggregator for byte counters and transfer rates from the status stream.
+        :type progress: dockermap.client.progress.ProgressAggregator
         :param kwargs: Additional kwargs for :meth:`docker.client.Client.pull`.
         :return: ``True`` if the image has been pulled successfully.
         :rtype: bool
         """
         response = super(DockerClientWrapper, self).pull(repository, tag=tag, stream=stream, **kwargs)
         if stream:
-            result = self._docker_status_stream(response, raise_on_error)
+            result = self._docker_status_stream(response, raise_on_error, progress)
         else:
-            result = self._docker_status_stream(response.split('\r\n') if response else (), raise_on_error)
+            result = self._docker_status_stream(response.split('\r\n') if response else (), raise_on_error,
+                                                progress)
         return result and not result.get('error')
 
-    def push(self, repository, stream=False, raise_on_error=True, **kwargs):
+    def push(self, repository, stream=False, raise_on_error=True, progress=None, **kwargs):
         """
         Pushes an image repository to the registry.
 
@@ -185,15 +192,18 @@ class DockerClientWrapper(DockerUtilityMixin, APIClient):
         :param raise_on_error: Raises errors in the status output as a DockerStatusException. Otherwise only logs
          errors.
         :type raise_on_error: bool
+        :param progress: Optional aggregator for byte counters and transfer rates from the status stream.
+        :type progress: dockermap.client.progress.ProgressAggregator
         :param kwargs: Additional kwargs for :meth:`docker.client.Client.push`.
         :return: ``True`` if the image has been pushed successfully.
         :rtype: bool
         """
         response = super(DockerClientWrapper, self).push(repository, stream=stream, **kwargs)
         if stream:
-            result = self._docker_status_stream(response, raise_on_error)
+            result = self._docker_status_stream(response, raise_on_error, progress)
         else:
-            result = self._docker_status_stream(response.split('\r\n') if response else (), raise_on_error)
+            result = self._docker_status_stream(response.split('\r\n') if response else (), raise_on_error,
+                                                progress)
         return result and not result.get('error')
 
     def push_container_logs(self, container):
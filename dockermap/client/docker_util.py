@@ -1,15 +1,18 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import itertools
 import logging
-
+from multiprocessing.pool import ThreadPool
 import sys
+import threading
+import time
 
 from distutils.version import StrictVersion
 from requests import Timeout
+import six
 
 from ..build.context import DockerContext
-from ..dep import ImageDependentsResolver
 from ..exceptions import PartialResultsError
 
 
@@ -77,7 +80,192 @@ def primary_container_name(names, default=None, strip_trailing_slash=True):
     return default
 
 
+def run_parallel(func, items, workers):
+    """
+    Runs a function on each of the given items using a pool of threads. After the first error, remaining items are
+    skipped.
+
+    :param func: Function accepting a single item as argument.
+    :type func: callable
+    :param items: Items to process.
+    :type items: list
+    :param workers: Maximum number of threads.
+    :type workers: int
+    :return: Successfully processed items in their original order, and the exception information of the first error
+      that has occurred, or ``None``.
+    :rtype: (list, tuple)
+    """
+    if not items:
+        return [], None
+    cancelled = threading.Event()
+
+    def _run(item):
+        if cancelled.is_set():
+            return None
+        try:
+            func(item)
+        except:
+            cancelled.set()
+            return sys.exc_info()
+        return ()
+
+    pool = ThreadPool(min(workers, len(items)))
+    try:
+        results = pool.map(_run, items)
+    finally:
+        pool.close()
+        pool.join()
+    processed = [item for item, result in zip(items, results) if result == ()]
+    errors = [result for result in results if result]
+    return processed, errors[0] if errors else None
+
+
+def get_blocked_images(keep_images, image_parents):
+    """
+    Returns the images that cannot be removed, i.e. that are kept or are an ancestor of an image that is kept.
+
+    :param keep_images: Ids of images to keep.
+    :type keep_images: collections.Iterable[unicode | str]
+    :param image_parents: Dictionary of image ids and the ids of their parent images.
+    :type image_parents: dict[unicode | str, unicode | str]
+    :return: Ids of images that cannot be removed.
+    :rtype: set[unicode | str]
+    """
+    blocked_images = set()
+    for image_id in keep_images:
+        while image_id and image_id not in blocked_images:
+            blocked_images.add(image_id)
+            image_id = image_parents.get(image_id)
+    return blocked_images
+
+
+def get_removal_levels(image_ids, image_parents):
+    """
+    Groups images for removal so that child images are removed before their parents. Images within each group do
+    not depend on each other, so that they can be removed concurrently.
+
+    :param image_ids: Ids of images to remove, e.g. in the order of the image list.
+    :type image_ids: list[unicode | str]
+    :param image_parents: Dictionary of image ids and the ids of their parent images.
+    :type image_parents: dict[unicode | str, unicode | str]
+    :return: Lists of image ids, starting with images that have no children.
+    :rtype: list[list[unicode | str]]
+    """
+    image_levels = dict.fromkeys(image_ids, 0)
+    for image_id in image_ids:
+        level = 0
+        parent_id = image_parents.get(image_id)
+        while parent_id in image_levels:
+            level += 1
+            if image_levels[parent_id] >= level:
+                break
+            image_levels[parent_id] = level
+            parent_id = image_parents.get(parent_id)
+    levels = [[] for __ in range(max(image_levels.values()) + 1)] if image_levels else []
+    for image_id in image_ids:
+        levels[image_levels[image_id]].append(image_id)
+    return levels
+
+
+class ImageGarbageCollector(object):
+    """
+    Determines which images can be removed from a Docker host, based on a set of retention rules. The image graph is
+    built once from the output of ``images(all=True)``. Images that are used by containers, protected, or retained by
+    any rule are kept along with their parent images. All other images are removed, including images that have
+    repository tags.
+
+    :param images: Image list from the Docker Remote API.
+    :type images: list[dict]
+    :param used_images: Ids of images that are used by containers.
+    :type used_images: collections.Iterable[unicode | str]
+    :param protected: Image ids or names to keep, e.g. from
+      :meth:`~dockermap.map.config.main.ContainerMap.get_image_names`. Names without a tag refer to the ``latest`` tag.
+    :type protected: collections.Iterable[unicode | str]
+    """
+    def __init__(self, images, used_images=None, protected=None):
+        self._images = images
+        self._image_parents = {image['Id']: image['ParentId']
+                               for image in images
+                               if image['ParentId']}
+        self._image_tags = tag_ids = {}
+        self._repositories = repositories = {}
+        for image in images:
+            image_id = image['Id']
+            for repo_tag in image['RepoTags'] or ():
+                if repo_tag == '<none>:<none>':
+                    continue
+                tag_ids[repo_tag] = image_id
+                repo_images = repositories.setdefault(repo_tag.rpartition(':')[0], [])
+                if image not in repo_images:
+                    repo_images.append(image)
+        self._used_images = set(used_images or ())
+        self._protected_images = protected_ids = set()
+        for name in protected or ():
+            image_id = tag_ids.get(name)
+            if not image_id and ':' not in name.rpartition('/')[2]:
+                image_id = tag_ids.get('{0}:latest'.format(name))
+            protected_ids.add(image_id or name)
+
+    def get_retained_images(self, keep_latest=None, max_age=None, size_budget=None, now=None):
+        """
+        Applies the retention rules and returns the images to keep, in addition to used and protected images.
+
+        :param keep_latest: Number of the most recently created images to keep in each repository. By default all
+          images with repository tags are kept.
+        :type keep_latest: int
+        :param max_age: Keep images that have been created within this number of seconds.
+        :type max_age: int | float
+        :param size_budget: After applying the other rules, keep the most recently created images as long as their
+          total size in bytes is within this budget. Since images can share layers, this is an upper estimate.
+        :type size_budget: int
+        :param now: Current time as a timestamp. Defaults to the local system time.
+        :type now: int | float
+        :return: Ids of images to keep.
+        :rtype: set[unicode | str]
+        """
+        keep_images = self._used_images | self._protected_images
+        if keep_latest is None:
+            keep_images.update(self._image_tags.values())
+        elif keep_latest > 0:
+            for repo_images in six.itervalues(self._repositories):
+                newest = sorted(repo_images, key=lambda i: i['Created'], reverse=True)[:keep_latest]
+                keep_images.update(image['Id'] for image in newest)
+        if max_age is not None:
+            min_created = (now or time.time()) - max_age
+            keep_images.update(image['Id']
+                               for image in self._images
+                               if image['Created'] >= min_created)
+        if size_budget is not None:
+            kept_size = sum(image.get('Size', 0)
+                            for image in self._images
+                            if image['Id'] in keep_images)
+            for image in sorted(self._images, key=lambda i: i['Created'], reverse=True):
+                if image['Id'] in keep_images:
+                    continue
+                kept_size += image.get('Size', 0)
+                if kept_size > size_budget:
+                    break
+                keep_images.add(image['Id'])
+        return keep_images
+
+    def get_removal_plan(self, **kwargs):
+        """
+        Generates the images to remove, grouped by levels as in :func:`get_removal_levels`. Keyword arguments are
+        passed to :meth:`get_retained_images`.
+
+        :return: Lists of image ids, starting with images that have no children.
+        :rtype: list[list[unicode | str]]
+        """
+        blocked_images = get_blocked_images(self.get_retained_images(**kwargs), self._image_parents)
+        unused_images = [image['Id']
+                         for image in self._images
+                         if image['Id'] not in blocked_images]
+        return get_removal_levels(unused_images, self._image_parents)
+
+
 class DockerUtilityMixin(object):
+    stop_poll_interval = 0.5
+
     def add_extra_tags(self, image_id, main_tag, extra_tags, add_latest):
         """
         Adds extra tags to an image after de-duplicating tag names.
@@ -155,10 +343,11 @@ class DockerUtilityMixin(object):
         with DockerContext(dockerfile, finalize=True) as ctx:
             return self.build_from_context(ctx, tag, **kwargs)
 
-    def cleanup_containers(self, include_initial=False, exclude=None, raise_on_error=False, list_only=False):
+    def cleanup_containers(self, include_initial=False, exclude=None, raise_on_error=False, list_only=False,
+                           workers=None):
         """
         Finds all stopped containers and removes them; by default does not remove containers that have never been
-        started.
+        started. If ``workers`` is set, containers are removed concurrently.
 
         :param include_initial: Consider containers that have never been started.
         :type include_initial: bool
@@ -168,6 +357,8 @@ class DockerUtilityMixin(object):
         :type raise_on_error: bool
         :param list_only: When set to ``True``, only lists containers, but does not actually remove them.
         :type list_only: bool
+        :param workers: Number of containers to remove at the same time. By default they are removed one by one.
+        :type workers: int
         :return: List of removed containers.
         :rtype: list[unicode | str]
         """
@@ -186,6 +377,22 @@ class DockerUtilityMixin(object):
         stopped_containers = list(_stopped_containers())
         if list_only:
             return stopped_containers
+        if workers:
+            def _remove(cn):
+                try:
+                    self.remove_container(cn)
+                except:
+                    if raise_on_error:
+                        raise
+                else:
+                    removed.add(cn)
+
+            removed = set()
+            __, error = run_parallel(_remove, [cn for __, cn in stopped_containers], workers)
+            removed_containers = [cn for __, cn in stopped_containers if cn in removed]
+            if error:
+                raise PartialResultsError(error, removed_containers)
+            return removed_containers
         removed_containers = []
         for cid, cn in stopped_containers:
             try:
@@ -198,10 +405,11 @@ class DockerUtilityMixin(object):
                 removed_containers.append(cn)
         return removed_containers
 
-    def cleanup_images(self, remove_old=False, keep_tags=None, force=False, raise_on_error=False, list_only=False):
+    def cleanup_images(self, remove_old=False, keep_tags=None, force=False, raise_on_error=False, list_only=False,
+                       workers=None):
         """
         Finds all images that are neither used by any container nor another image, and removes them; by default does not
-        remove repository images.
+        remove repository images. Child images are removed before their parents.
 
         :param remove_old: Also removes images that have repository names, but no `latest` tag.
         :type remove_old: bool
@@ -214,15 +422,16 @@ class DockerUtilityMixin(object):
         :type raise_on_error: bool
         :param list_only: When set to ``True`` only lists images, but does not actually remove them.
         :type list_only: bool
+        :param workers: Number of images to remove at the same time. By default they are removed one by one.
+        :type workers: int
         :return: List of removed image ids.
         :rtype: list[unicode | str]
         """
-        used_images = set(self.inspect_container(container['Id'])['Image']
-                          for container in self.containers(all=True))
+        used_images = self.get_used_images()
         all_images = self.images(all=True)
-        image_dependencies = [(image['Id'], image['ParentId'])
-                              for image in all_images
-                              if image['ParentId']]
+        image_parents = {image['Id']: image['ParentId']
+                         for image in all_images
+                         if image['ParentId']}
         if remove_old:
             check_tags = {'latest'}
             if keep_tags:
@@ -235,17 +444,68 @@ class DockerUtilityMixin(object):
         keep_images = {image['Id']
                        for image in all_images
                        if tag_check(image)} | used_images
-        test_images = [image['Id']
-                       for image in all_images
-                       if image['Id'] not in keep_images]
-        resolver = ImageDependentsResolver(image_dependencies)
-        unused_images = [image_id
-                         for image_id in test_images
-                         if keep_images.isdisjoint(resolver.get_dependencies(image_id))]
+        blocked_images = get_blocked_images(keep_images, image_parents)
+        unused_images = [image['Id']
+                         for image in all_images
+                         if image['Id'] not in blocked_images]
         if list_only:
             return unused_images
+        return self.remove_image_levels(get_removal_levels(unused_images, image_parents), force=force,
+                                        raise_on_error=raise_on_error, workers=workers)
+
+    def get_used_images(self):
+        """
+        Returns the ids of images that are used by any container on the host.
+
+        :return: Image ids.
+        :rtype: set[unicode | str]
+        """
+        used_images = set()
+        for container in self.containers(all=True):
+            image_id = container.get('ImageID')
+            if not image_id:
+                # Older API versions do not include the image id in the container list.
+                image_id = self.inspect_container(container['Id'])['Image']
+            used_images.add(image_id)
+        return used_images
+
+    def remove_image_levels(self, image_levels, force=False, raise_on_error=False, workers=None):
+        """
+        Removes images in the order of the given levels, e.g. as returned by
+        :meth:`ImageGarbageCollector.get_removal_plan`. If ``workers`` is set, images of each level are removed
+        concurrently.
+
+        :param image_levels: Lists of image ids.
+        :type image_levels: list[list[unicode | str]]
+        :param force: Force the removal of images that are referenced by multiple repositories.
+        :type force: bool
+        :param raise_on_error: Forward errors raised by the client and cancel the process. By default only logs errors.
+        :type raise_on_error: bool
+        :param workers: Number of images to remove at the same time. By default they are removed one by one.
+        :type workers: int
+        :return: List of removed image ids.
+        :rtype: list[unicode | str]
+        """
+        if workers:
+            def _remove(iid):
+                try:
+                    self.remove_image(iid, force=force)
+                except:
+                    if raise_on_error:
+                        raise
+                else:
+                    removed.add(iid)
+
+            removed = set()
+            removed_images = []
+            for level_images in image_levels:
+                __, error = run_parallel(_remove, level_images, workers)
+                removed_images.extend(iid for iid in level_images if iid in removed)
+                if error:
+                    raise PartialResultsError(error, removed_images)
+            return removed_images
         removed_images = []
-        for iid in unused_images:
+        for iid in itertools.chain.from_iterable(image_levels):
             try:
                 self.remove_image(iid, force=force)
             except:
@@ -256,14 +516,100 @@ class DockerUtilityMixin(object):
                 removed_images.append(iid)
         return removed_images
 
-    def remove_all_containers(self, stop_timeout=10, list_only=False):
+    def collect_images(self, keep_latest=None, max_age=None, size_budget=None, protected=None, force=False,
+                       raise_on_error=False, list_only=False, workers=None):
+        """
+        Removes images according to retention rules, as implemented in :class:`ImageGarbageCollector`. Images used by
+        containers and their parent images are always kept.
+
+        :param keep_latest: Number of the most recently created images to keep in each repository. By default all
+          images with repository tags are kept.
+        :type keep_latest: int
+        :param max_age: Keep images that have been created within this number of seconds.
+        :type max_age: int | float
+        :param size_budget: Keep the most recently created of the remaining images within this total size in bytes.
+        :type size_budget: int
+        :param protected: Image ids or names to keep, e.g. images referenced by container maps.
+        :type protected: collections.Iterable[unicode | str]
+        :param force: Force the removal of images that are referenced by multiple repositories.
+        :type force: bool
+        :param raise_on_error: Forward errors raised by the client and cancel the process. By default only logs errors.
+        :type raise_on_error: bool
+        :param list_only: When set to ``True`` only returns the removal plan, but does not actually remove images.
+        :type list_only: bool
+        :param workers: Number of images to remove at the same time. By default they are removed one by one.
+        :type workers: int
+        :return: List of removed image ids; with ``list_only`` lists of image ids to remove in each level.
+        :rtype: list[unicode | str] | list[list[unicode | str]]
+        """
+        collector = ImageGarbageCollector(self.images(all=True), self.get_used_images(), protected)
+        removal_plan = collector.get_removal_plan(keep_latest=keep_latest, max_age=max_age, size_budget=size_budget)
+        if list_only:
+            return removal_plan
+        return self.remove_image_levels(removal_plan, force=force, raise_on_error=raise_on_error, workers=workers)
+
+    def _wait_for_stop(self, containers, timeout):
+        deadline = time.time() + timeout
+        pending = set(containers)
+        while pending:
+            pending.intersection_update(container['Id'] for container in self.containers())
+            remaining = deadline - time.time()
+            if not pending or remaining <= 0:
+                break
+            time.sleep(min(self.stop_poll_interval, remaining))
+        return pending
+
+    def _kill_running(self, c_id, signal=None):
+        try:
+            self.kill(c_id, signal=signal)
+        except:
+            exc_info = sys.exc_info()
+            try:
+                running = self.inspect_container(c_id)['State']['Running']
+            except:
+                running = True
+            if running:
+                six.reraise(*exc_info)
+
+    def _stop_all_parallel(self, running_containers, stop_timeout, workers):
+        def _signal(c_id):
+            try:
+                stop_signal = self.inspect_container(c_id)['Config'].get('StopSignal')
+            except:
+                stop_signal = None
+            self._kill_running(c_id, stop_signal or 'SIGTERM')
+
+        signaled_containers, error = run_parallel(_signal, running_containers, workers)
+        pending = self._wait_for_stop(signaled_containers, stop_timeout)
+        if pending:
+            log.warning("Containers %s did not stop in time - sending SIGKILL.", ', '.join(pending))
+            killed_containers, kill_error = run_parallel(self._kill_running, list(pending), workers)
+            failed = pending.difference(killed_containers)
+            remaining = self._wait_for_stop(killed_containers, stop_timeout)
+            if remaining:
+                log.warning("Containers %s did not stop after SIGKILL.", ', '.join(remaining))
+                failed.update(remaining)
+            error = error or kill_error
+            signaled_containers = [c_id for c_id in signaled_containers if c_id not in failed]
+        if error:
+            raise PartialResultsError(error, (signaled_containers, []))
+        return signaled_containers
+
+    def remove_all_containers(self, stop_timeout=10, list_only=False, workers=None):
         """
         First stops (if necessary) and them removes all containers present on the Docker instance.
 
-        :param stop_timeout: Timeout to stopping each container.
+        If ``workers`` is set, all running containers are sent their stop signal (``SIGTERM`` by default) at once, and
+        are then waited for together. Containers that have not stopped within ``stop_timeout`` are killed and waited for
+        again. Afterwards, containers are removed concurrently.
+
+        :param stop_timeout: Timeout to stopping each container. With ``workers``, this is the time to wait for all
+          containers.
         :type stop_timeout: int
         :param list_only: When set to ``True`` only lists containers, but does not actually stop or remove them.
         :type list_only: bool
+        :param workers: Number of requests to run at the same time. By default containers are processed one by one.
+        :type workers: int
         :return: A tuple of two lists: Stopped container ids, and removed container ids.
         :rtype: (list[unicode | str], list[unicode | str])
         """
@@ -274,6 +620,12 @@ class DockerUtilityMixin(object):
                               if not (status.startswith('Exited') or status == 'Dead')]
         if list_only:
             return running_containers, [c[0] for c in containers]
+        if workers:
+            stopped_containers = self._stop_all_parallel(running_containers, stop_timeout, workers)
+            removed_containers, error = run_parallel(self.remove_container, [c[0] for c in containers], workers)
+            if error:
+                raise PartialResultsError(error, (stopped_containers, removed_containers))
+            return stopped_containers, removed_containers
         stopped_containers = []
         for c_id in running_containers:
             try:
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from calendar import timegm
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+import logging
+import re
+import threading
+
+from requests import Timeout
+
+from ..docker_api import WAIT_RESULT_DICT
+
+log = logging.getLogger(__name__)
+
+TIMESTAMP_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:\d{2})?$')
+
+
+def _get_wait_result(exit_code):
+    if WAIT_RESULT_DICT:
+        return {'StatusCode': exit_code}
+    return exit_code
+
+
+def get_event_time(event):
+    """
+    Returns the time of an event as a string, that can be passed to the ``since`` argument of the event stream. Uses
+    the precise ``timeNano`` where available.
+
+    :param event: Decoded event.
+    :type event: dict
+    :return: Timestamp in seconds, with fractional digits if applicable. ``None`` if the event does not have a time.
+    :rtype: unicode | str
+    """
+    time_nano = event.get('timeNano')
+    if time_nano:
+        return '{0}.{1:09d}'.format(*divmod(time_nano, 1000000000))
+    time_sec = event.get('time')
+    if time_sec:
+        return '{0}'.format(time_sec)
+    return None
+
+
+def get_timestamp_time(timestamp):
+    """
+    Converts a timestamp as returned by the Docker host, e.g. ``SystemTime`` of the ``info`` command, to the format
+    used by the ``since`` argument of the event stream.
+
+    :param timestamp: Timestamp in RFC 3339 format, with optional fractional seconds and timezone offset.
+    :type timestamp: unicode | str
+    :return: Timestamp in seconds, with fractional digits if applicable.
+    :rtype: unicode | str
+    """
+    ts_match = TIMESTAMP_PATTERN.match(timestamp)
+    if not ts_match:
+        raise ValueError("Invalid timestamp: {0}".format(timestamp))
+    dt_str, fraction, offset = ts_match.groups()
+    dt = datetime.strptime(dt_str, '%Y-%m-%dT%H:%M:%S')
+    if offset and offset != 'Z':
+        offset_delta = timedelta(hours=int(offset[1:3]), minutes=int(offset[4:6]))
+        if offset[0] == '+':
+            dt -= offset_delta
+        else:
+            dt += offset_delta
+    seconds = timegm(dt.timetuple())
+    if fraction:
+        return '{0}.{1}'.format(seconds, fraction[:9].ljust(9, '0'))
+    return '{0}'.format(seconds)
+
+
+class EventMonitor(object):
+    """
+    Follows the event stream of a Docker client in a background thread and passes every event to a set of listeners.
+    If the stream is interrupted, it is re-opened starting with the time of the last event received.
+
+    Listeners are callables accepting a single argument, the decoded event as a dictionary. They are run in the
+    thread of the monitor, while holding :attr:`lock`.
+
+    :param client: Docker client.
+    :type client: docker.client.Client
+    :param retry_interval: Seconds to wait before re-opening the event stream after it has been interrupted.
+    :type retry_interval: int | float
+    """
+    def __init__(self, client, retry_interval=5):
+        self._client = client
+        self._retry_interval = retry_interval
+        self._listeners = OrderedDict()
+        self._lock = threading.RLock()
+        self._stopped = None
+        self._thread = None
+        self._stream = None
+        self._cursor = None
+
+    def _open_stream(self, since):
+        if since:
+            return self._client.events(decode=True, since=since)
+        return self._client.events(decode=True)
+
+    def _run(self, stopped):
+        while not stopped.is_set():
+            try:
+                for event in self._stream:
+                    if stopped.is_set():
+                        return
+                    self.process_event(event)
+            except Exception as e:
+                if not stopped.is_set():
+                    log.warning("Event stream interrupted: %s", e)
+            if stopped.wait(self._retry_interval):
+                return
+            try:
+                self._stream = self._open_stream(self._cursor)
+            except Exception as e:
+                log.warning("Failed to re-open event stream: %s", e)
+                self._stream = ()
+
+    def add_listener(self, callback, key=None):
+        """
+        Registers a function to be called for every event. A previous listener with the same key is replaced.
+
+        :param callback: Function accepting a single event argument.
+        :type callback: callable
+        :param key: Key for identifying the listener. By default this is the function itself.
+        """
+        with self._lock:
+            self._listeners[key or callback] = callback
+
+    def remove_listener(self, key):
+        """
+        Removes a listener, if it is registered.
+
+        :param key: Key of the listener, i.e. the function if no separate key has been set.
+        """
+        with self._lock:
+            self._listeners.pop(key, None)
+
+    def process_event(self, event):
+        """
+        Passes a single event to all listeners and updates the :attr:`cursor`. Exceptions raised by listeners are logged
+        but not propagated.
+
+        :param event: Decoded event.
+        :type event: dict
+        """
+        with self._lock:
+            event_time = get_event_time(event)
+            if event_time:
+                self._cursor = event_time
+            for listener in list(self._listeners.values()):
+                try:
+                    listener(event)
+                except Exception:
+                    log.exception("Failed to process event %s.", event)
+
+    def process_events(self, events):
+        """
+        Processes all events from an iterable, e.g. a recorded event stream, in the current thread.
+
+        :param events: Iterable of decoded events.
+        :type events: collections.Iterable[dict]
+        """
+        for event in events:
+            self.process_event(event)
+
+    def start(self, since=None):
+        """
+        Opens the event stream and starts processing events in a background thread. Does nothing if the monitor is
+        already running.
+
+        :param since: Only process events after this time. By default continues from the :attr:`cursor`, if set.
+        :type since: unicode | str | int
+        """
+        with self._lock:
+            if self.running:
+                return
+            self._stream = self._open_stream(since or self._cursor)
+            self._stopped = stopped = threading.Event()
+            self._thread = thread = threading.Thread(target=self._run, args=(stopped, ), name='EventMonitor')
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        """
+        Stops processing events. Where the client allows for it, the event stream is closed immediately; otherwise the
+        background thread ends after the next event.
+        """
+        if self._stopped:
+            self._stopped.set()
+        close = getattr(self._stream, 'close', None)
+        if close:
+            try:
+                close()
+            except Exception as e:
+                log.debug("Could not close event stream: %s", e)
+        self._thread = None
+
+    @property
+    def running(self):
+        """
+        Whether the monitor is currently processing events in the background.
+
+        :return: ``True`` if the background thread is running, ``False`` otherwise.
+        :rtype: bool
+        """
+        thread = self._thread
+        return bool(thread and thread.is_alive() and not self._stopped.is_set())
+
+    @property
+    def cursor(self):
+        """
+        Time of the last event processed, in a format that can be passed to the ``since`` argument of the event
+        stream.
+
+        :return: Timestamp.
+        :rtype: unicode | str
+        """
+        return self._cursor
+
+    @cursor.setter
+    def cursor(self, value):
+        self._cursor = value
+
+    @property
+    def lock(self):
+        """
+        Lock held while processing an event. Acquiring this blocks event processing, e.g. for making sure that no
+        events are lost during a refresh of state from the client.
+
+        :return: Re-entrant lock.
+        :rtype: threading.RLock
+        """
+        return self._lock
+
+
+class _ContainerWait(object):
+    def __init__(self, kind, keys):
+        self.kind = kind
+        self.keys = keys
+        self.value = None
+        self.done = threading.Event()
+
+
+class ContainerWaiter(object):
+    """
+    Waits for containers to stop or to change their health status, based on the events of an :class:`EventMonitor`.
+    Instead of a long-polling ``wait`` request for each container, any number of threads can wait for containers,
+    which are resolved as the events arrive on the single event stream. The monitor is started upon first use.
+
+    :param client: Docker client.
+    :type client: docker.client.Client
+    :param monitor: Event monitor of the same client.
+    :type monitor: EventMonitor
+    """
+    def __init__(self, client, monitor):
+        self._client = client
+        self._monitor = monitor
+        self._waits = defaultdict(list)
+        monitor.add_listener(self.process_event, key=self)
+
+    def _add(self, kind, c_info):
+        keys = [c_info['Id'], c_info['Name'].lstrip('/')]
+        c_wait = _ContainerWait(kind, keys)
+        for key in keys:
+            self._waits[key].append(c_wait)
+        return c_wait
+
+    def _remove(self, c_wait):
+        with self._monitor.lock:
+            for key in c_wait.keys:
+                key_waits = self._waits.get(key)
+                if key_waits and c_wait in key_waits:
+                    key_waits.remove(c_wait)
+                    if not key_waits:
+                        del self._waits[key]
+
+    def process_event(self, event):
+        """
+        Resolves waits on the container of an event, if it has stopped or its health status has changed.
+
+        :param event: Decoded event.
+        :type event: dict
+        """
+        if event.get('Type', 'container') != 'container':
+            return
+        action = event.get('Action') or event.get('status')
+        if action == 'die':
+            kind = 'stop'
+        elif action and action.startswith('health_status'):
+            kind = 'health'
+        else:
+            return
+        actor = event.get('Actor') or {}
+        attributes = actor.get('Attributes') or {}
+        if kind == 'stop':
+            exit_code = attributes.get('exitCode')
+            value = int(exit_code) if exit_code is not None else None
+        else:
+            value = action.partition(':')[2].strip()
+        for key in (actor.get('ID') or event.get('id'), attributes.get('name')):
+            key_waits = self._waits.get(key)
+            if not key_waits:
+                continue
+            for c_wait in [w for w in key_waits if w.kind == kind]:
+                c_wait.value = value
+                c_wait.done.set()
+                self._remove(c_wait)
+
+    def wait(self, container, timeout=None):
+        """
+        Waits for a container to stop. Returns immediately if the container is not running.
+
+        :param container: Container name or id.
+        :type container: unicode | str
+        :param timeout: Maximum time in seconds to wait. By default waits without a time limit.
+        :type timeout: int | float
+        :return: Result in the same format as ``wait`` of the client, i.e. the exit code or, from docker-py 3.0 on, a
+          dictionary with the exit code in ``StatusCode``.
+        :rtype: int | dict
+        :raise requests.Timeout: If the container has not stopped within the timeout.
+        """
+        monitor = self._monitor
+        monitor.start()
+        # Holding the lock, no event can be processed between inspection and adding the wait.
+        with monitor.lock:
+            c_info = self._client.inspect_container(container)
+            if not c_info['State']['Running']:
+                return _get_wait_result(c_info['State']['ExitCode'])
+            c_wait = self._add('stop', c_info)
+        if not c_wait.done.wait(timeout):
+            self._remove(c_wait)
+            raise Timeout("Container {0} did not stop within {1} seconds.".format(container, timeout))
+        exit_code = c_wait.value
+        if exit_code is None:
+            exit_code = self._client.inspect_container(c_info['Id'])['State']['ExitCode']
+        return _get_wait_result(exit_code)
+
+    def wait_health(self, container, timeout=None):
+        """
+        Waits for a container to report a health status other than ``starting``. Returns immediately if this is already
+        the case, or if the container does not have a health check.
+
+        :param container: Container name or id.
+        :type container: unicode | str
+        :param timeout: Maximum time in seconds to wait. By default waits without a time limit.
+        :type timeout: int | float
+        :return: Health status, e.g. ``healthy`` or ``unhealthy``. ``None`` if the container has no health check.
+        :rtype: unicode | str
+        :raise requests.Timeout: If the status has not changed within the timeout.
+        """
+        monitor = self._monitor
+        monitor.start()
+        with monitor.lock:
+            c_info = self._client.inspect_container(container)
+            health = c_info['State'].get('Health')
+            if not health:
+                return None
+            if health['Status'] != 'starting':
+                return health['Status']
+            c_wait = self._add('health', c_info)
+        if not c_wait.done.wait(timeout):
+            self._remove(c_wait)
+            raise Timeout("Container {0} did not report health within {1} seconds.".format(container, timeout))
+        return c_wait.value
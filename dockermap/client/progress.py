@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+import time
+
+import six
+
+
+TRANSFER_STATUS = {'Downloading', 'Pushing'}
+COMPLETE_STATUS = {'Download complete', 'Pull complete', 'Pushed'}
+PRESENT_STATUS = {'Already exists', 'Layer already exists'}
+# Messages about the entire image, where the id is a tag or repository instead of a layer.
+IMAGE_STATUS_PREFIXES = ('Pulling from ', 'Pulling repository', 'Digest: ', 'Status: ', 'The push refers to ')
+
+
+class LayerProgress(object):
+    """
+    Transfer progress of a single image layer.
+
+    :param layer_id: Layer id, as reported in the status stream.
+    :type layer_id: unicode | str
+    """
+    def __init__(self, layer_id):
+        self.layer_id = layer_id
+        self.status = None
+        self.current = 0
+        self.total = None
+        self.complete = False
+        self.present = False
+
+    def __repr__(self):
+        return ("LayerProgress(layer_id={0.layer_id!r}, status={0.status!r}, current={0.current!r}, "
+                "total={0.total!r})".format(self))
+
+
+class ProgressAggregator(object):
+    """
+    Aggregates the status stream of a pull or push operation into byte counters for each layer and for the entire
+    image. It can be passed to :meth:`~dockermap.client.base.DockerClientWrapper.pull` or
+    :meth:`~dockermap.client.base.DockerClientWrapper.push` as ``progress``. The ``callback`` is run with this object
+    after every update, but at most every ``callback_interval`` seconds; it is always run when the stream has ended.
+
+    :param name: Name of the image, for reference in callbacks.
+    :type name: unicode | str
+    :param callback: Optional function to call with this object.
+    :type callback: callable
+    :param callback_interval: Minimum number of seconds between callbacks.
+    :type callback_interval: int | float
+    """
+    def __init__(self, name=None, callback=None, callback_interval=0):
+        self.name = name
+        self._callback = callback
+        self._callback_interval = callback_interval
+        self._layers = {}
+        self._lock = threading.Lock()
+        self._started = None
+        self._last_update = None
+        self._last_callback = None
+        self._finished = False
+
+    def update(self, output, timestamp=None):
+        """
+        Processes a single decoded status message. Messages that do not refer to a layer, e.g. ``Pulling from``, are
+        ignored.
+
+        :param output: Decoded status message from the stream.
+        :type output: dict
+        :param timestamp: Time of the message. By default the current time.
+        :type timestamp: int | float
+        """
+        layer_id = output.get('id')
+        status = output.get('status')
+        if not (layer_id and status) or status.startswith(IMAGE_STATUS_PREFIXES):
+            return
+        now = timestamp or time.time()
+        with self._lock:
+            if self._started is None:
+                self._started = now
+            self._last_update = now
+            layer = self._layers.get(layer_id)
+            if layer is None:
+                self._layers[layer_id] = layer = LayerProgress(layer_id)
+            layer.status = status
+            if status in TRANSFER_STATUS:
+                detail = output.get('progressDetail') or {}
+                if 'current' in detail:
+                    layer.current = detail['current']
+                if detail.get('total'):
+                    layer.total = detail['total']
+            elif status in COMPLETE_STATUS:
+                layer.complete = True
+                if layer.total is not None:
+                    layer.current = layer.total
+            elif status in PRESENT_STATUS or status.startswith('Mounted from '):
+                layer.present = layer.complete = True
+        self._run_callback(now)
+
+    def finish(self, timestamp=None):
+        """
+        Marks the end of the stream and runs the callback a last time.
+
+        :param timestamp: Time of the end of the stream. By default the current time.
+        :type timestamp: int | float
+        """
+        now = timestamp or time.time()
+        with self._lock:
+            self._finished = True
+            if self._started is not None:
+                self._last_update = now
+        self._run_callback(now, force=True)
+
+    def _run_callback(self, now, force=False):
+        if not self._callback:
+            return
+        if not force and self._last_callback is not None and now - self._last_callback < self._callback_interval:
+            return
+        self._last_callback = now
+        self._callback(self)
+
+    @property
+    def layers(self):
+        """
+        Progress of all layers that have been reported in the stream.
+
+        :return: Dictionary of layer ids and their progress.
+        :rtype: dict[unicode | str, LayerProgress]
+        """
+        with self._lock:
+            return dict(self._layers)
+
+    @property
+    def finished(self):
+        """
+        Whether the stream has ended.
+
+        :rtype: bool
+        """
+        return self._finished
+
+    @property
+    def present_layers(self):
+        """
+        Number of layers that did not need to be transferred, since they already existed at the destination.
+
+        :rtype: int
+        """
+        with self._lock:
+            return sum(1 for layer in six.itervalues(self._layers) if layer.present)
+
+    @property
+    def complete_layers(self):
+        """
+        Number of layers that have been completed, including layers that already existed.
+
+        :rtype: int
+        """
+        with self._lock:
+            return sum(1 for layer in six.itervalues(self._layers) if layer.complete)
+
+    @property
+    def current_bytes(self):
+        """
+        Number of bytes transferred so far.
+
+        :rtype: int
+        """
+        with self._lock:
+            return sum(layer.current for layer in six.itervalues(self._layers))
+
+    @property
+    def total_bytes(self):
+        """
+        Number of bytes to transfer, as far as the sizes of layers have been reported yet.
+
+        :rtype: int
+        """
+        with self._lock:
+            return sum(layer.total for layer in six.itervalues(self._layers) if layer.total)
+
+    @property
+    def elapsed(self):
+        """
+        Seconds between the first and the latest message.
+
+        :rtype: float
+        """
+        with self._lock:
+            if self._started is None:
+                return 0.0
+            return float(self._last_update - self._started)
+
+    @property
+    def bytes_per_second(self):
+        """
+        Average transfer rate since the first message.
+
+        :return: Bytes per second, or ``None`` if it cannot be determined yet.
+        :rtype: float
+        """
+        elapsed = self.elapsed
+        if not elapsed:
+            return None
+        return self.current_bytes / elapsed
+
+    @property
+    def eta(self):
+        """
+        Estimated number of seconds until the remaining bytes are transferred, based on the average transfer rate.
+        Only includes layers which have reported their size.
+
+        :return: Seconds, or ``None`` if it cannot be determined yet.
+        :rtype: float
+        """
+        rate = self.bytes_per_second
+        if not rate:
+            return None
+        with self._lock:
+            remaining = sum(layer.total - layer.current
+                            for layer in six.itervalues(self._layers)
+                            if layer.total and not layer.complete)
+        return max(remaining, 0) / rate
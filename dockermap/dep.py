@@ -234,3 +234,292 @@ class MultiReverseDependencyResolver(with_metaclass(ABCMeta, BaseDependencyResol
                 dep = self._deps[si]
                 if parent not in dep.parent:
                     dep.parent.append(parent)
+
+
+class DependencyGraph(object):
+    """
+    Immutable dependency graph, compiled once from a set of items and their direct dependencies. Items are stored in
+    adjacency arrays by index. Upon compilation, the graph is sorted topologically; transitive closures of dependencies
+    and dependents are stored as integer bitsets, where each bit represents the item with the same index.
+
+    Items that are part of a circular dependency, or that depend on one, are not included in the topological order.
+    Resolving their dependencies raises :class:`CircularDependency`.
+
+    :param items: Iterable or dictionary in the format `(dependent_item, dependencies)`. Dependencies that do not occur
+      as a dependent item are added as items without dependencies.
+    :type items: collections.Iterable
+    """
+    def __init__(self, items=None):
+        self._index = index = {}
+        self._items = item_list = []
+        parent_sets = []
+
+        def _get_index(item):
+            i = index.get(item)
+            if i is None:
+                index[item] = i = len(item_list)
+                item_list.append(item)
+                parent_sets.append(None)
+            return i
+
+        parent_lists = {}
+        edges = []
+        for item, parents in _iterate_dependencies(items):
+            i = _get_index(item)
+            i_parents = parent_lists.setdefault(i, [])
+            i_parent_set = parent_sets[i]
+            if i_parent_set is None:
+                parent_sets[i] = i_parent_set = set()
+            for parent in parents:
+                p = _get_index(parent)
+                if p not in i_parent_set:
+                    i_parent_set.add(p)
+                    i_parents.append(p)
+                    edges.append((i, p))
+        count = len(item_list)
+        self._parents = parents = tuple(tuple(parent_lists.get(i, ())) for i in range(count))
+        children = [[] for __ in range(count)]
+        for i, p in edges:
+            children[p].append(i)
+        self._children = children = tuple(tuple(c) for c in children)
+
+        # Kahn's algorithm, also assigning levels, i.e. the longest path to an item without dependencies.
+        remaining = [len(p) for p in parents]
+        levels = [None] * count
+        order = [i for i in range(count) if not remaining[i]]
+        for i in order:
+            levels[i] = 0
+        for i in order:
+            next_level = levels[i] + 1
+            for c in children[i]:
+                if levels[c] is None or levels[c] < next_level:
+                    levels[c] = next_level
+                remaining[c] -= 1
+                if not remaining[c]:
+                    order.append(c)
+        for i in range(count):
+            if remaining[i]:
+                levels[i] = None
+        self._order = tuple(order)
+        self._levels = tuple(levels)
+
+        dependency_bits = [0] * count
+        for i in order:
+            bits = 0
+            for p in parents[i]:
+                bits |= dependency_bits[p] | (1 << p)
+            dependency_bits[i] = bits
+        dependent_bits = [0] * count
+        for i in reversed(order):
+            bits = 0
+            for c in children[i]:
+                if levels[c] is not None:
+                    bits |= dependent_bits[c] | (1 << c)
+            dependent_bits[i] = bits
+        self._dependency_bits = tuple(dependency_bits)
+        self._dependent_bits = tuple(dependent_bits)
+        self._dependency_lists = [None] * count
+        self._dependent_lists = [None] * count
+
+    def __contains__(self, item):
+        return item in self._index
+
+    def __len__(self):
+        return len(self._items)
+
+    def _raise_circular(self, i, adjacent):
+        if i in adjacent[i]:
+            raise CircularDependency(self._items[i], True)
+        levels = self._levels
+        visited = set()
+        while i not in visited:
+            visited.add(i)
+            i = next(a for a in adjacent[i] if levels[a] is None)
+        raise CircularDependency(self._items[i])
+
+    def _resolve(self, item, adjacent, resolved_lists):
+        i = self._index.get(item)
+        if i is None:
+            return []
+        levels = self._levels
+        if levels[i] is None:
+            self._raise_circular(i, self._parents)
+        items = self._items
+        stack = [i]
+        while stack:
+            current = stack[-1]
+            if resolved_lists[current] is not None:
+                stack.pop()
+                continue
+            current_adjacent = adjacent[current]
+            pending = [a for a in current_adjacent if resolved_lists[a] is None]
+            for a in pending:
+                if levels[a] is None:
+                    self._raise_circular(a, self._parents)
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            # Resolved items of all adjacent items first, then the adjacent items themselves.
+            merged = []
+            merged_set = set()
+            merged_add = merged_set.add
+            for a in current_adjacent:
+                merged.extend(d for d in resolved_lists[a] if d not in merged_set and not merged_add(d))
+            merged.extend(items[a] for a in current_adjacent
+                          if items[a] not in merged_set and not merged_add(items[a]))
+            resolved_lists[current] = merged
+        return resolved_lists[i]
+
+    def get_dependencies(self, item):
+        """
+        Returns all dependencies of an item, in an order that they can be processed in. Results are cached.
+
+        :param item: Item to resolve the dependencies of.
+        :return: List of dependencies.
+        :rtype: list
+        :raise CircularDependency: If the item is part of, or depends on a circular dependency.
+        """
+        return self._resolve(item, self._parents, self._dependency_lists)
+
+    def get_dependents(self, item):
+        """
+        Returns all dependents of an item, in an order that they can be processed in, i.e. the last dependent first.
+        Results are cached.
+
+        :param item: Item to resolve the dependents of.
+        :return: List of dependents.
+        :rtype: list
+        :raise CircularDependency: If the item or one of its dependents is part of a circular dependency.
+        """
+        return self._resolve(item, self._children, self._dependent_lists)
+
+    def get(self, item):
+        """
+        Returns the direct dependencies of a single item.
+
+        :param item: Item to return dependencies for.
+        :return: Immediate dependencies.
+        :rtype: list
+        """
+        i = self._index.get(item)
+        if i is None:
+            return []
+        items = self._items
+        return [items[p] for p in self._parents[i]]
+
+    def get_index(self, item):
+        """
+        Returns the index of an item, i.e. its bit in closure bitsets.
+
+        :param item: Item.
+        :return: Index. ``None`` if the item is not part of the graph.
+        :rtype: int
+        """
+        return self._index.get(item)
+
+    def get_level(self, item):
+        """
+        Returns the level of an item, i.e. the length of the longest path to an item without dependencies. Items of the
+        same level do not depend on each other and can be processed in parallel, once all lower levels are complete.
+
+        :param item: Item.
+        :return: Level. ``None`` if the item is not in the topological order.
+        :rtype: int
+        """
+        i = self._index.get(item)
+        if i is None:
+            return None
+        return self._levels[i]
+
+    def get_dependency_bits(self, item):
+        """
+        Returns the transitive closure of dependencies of an item as a bitset.
+
+        :param item: Item.
+        :return: Bitset of dependencies.
+        :rtype: int
+        """
+        i = self._index.get(item)
+        if i is None:
+            return 0
+        return self._dependency_bits[i]
+
+    def get_dependent_bits(self, item):
+        """
+        Returns the transitive closure of dependents of an item as a bitset.
+
+        :param item: Item.
+        :return: Bitset of dependents.
+        :rtype: int
+        """
+        i = self._index.get(item)
+        if i is None:
+            return 0
+        return self._dependent_bits[i]
+
+    def depends_on(self, item, other):
+        """
+        Checks whether an item depends on another item, directly or indirectly.
+
+        :param item: Dependent item.
+        :param other: Possible dependency.
+        :return: ``True`` if ``item`` depends on ``other``, ``False`` otherwise.
+        :rtype: bool
+        """
+        o = self._index.get(other)
+        if o is None:
+            return False
+        return bool(self.get_dependency_bits(item) >> o & 1)
+
+    def get_items(self, bits):
+        """
+        Returns the items of a bitset, in topological order.
+
+        :param bits: Bitset, e.g. a closure of dependencies.
+        :type bits: int
+        :return: List of items.
+        :rtype: list
+        """
+        items = self._items
+        return [items[i] for i in self._order if bits >> i & 1]
+
+    @property
+    def items(self):
+        """
+        All items in the graph, in the order they have been added.
+
+        :return: Tuple of items.
+        :rtype: tuple
+        """
+        return tuple(self._items)
+
+    @property
+    def topological_order(self):
+        """
+        Items in topological order, i.e. each item comes after all of its dependencies. Items that are part of circular
+        dependencies are not included.
+
+        :return: List of items.
+        :rtype: list
+        """
+        items = self._items
+        return [items[i] for i in self._order]
+
+    @property
+    def levels(self):
+        """
+        Items grouped by their level, as returned by :meth:`get_level`, starting with level 0.
+
+        :return: List of item lists.
+        :rtype: list[list]
+        """
+        levels = []
+        items = self._items
+        item_levels = self._levels
+        for i in self._order:
+            level = item_levels[i]
+            while len(levels) <= level:
+                levels.append([])
+            levels[level].append(items[i])
+        return levels
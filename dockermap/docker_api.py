@@ -43,3 +43,6 @@ else:
         ('healthcheck', '1.24'),
         ('container_update_restart_policy', '1.23'),
     ])
+
+# From docker-py 3.0 on, ``wait`` returns the response of the Remote API instead of the exit code.
+WAIT_RESULT_DICT = docker.version_info[0] >= 3
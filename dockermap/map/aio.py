@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import asyncio
+from functools import partial
+
+from .client import MappingDockerClient
+
+
+def _executor_method(method_name):
+    def method(self, *args, **kwargs):
+        return self._run(getattr(self._client, method_name), *args, **kwargs)
+
+    method.__name__ = str(method_name)
+    method.__doc__ = """
+        Runs :meth:`~dockermap.map.client.MappingDockerClient.{0}` in the executor and returns an awaitable future of its
+        result. Arguments are the same as for the blocking method.
+
+        :return: Future of the result.
+        :rtype: asyncio.Future
+        """.format(method_name)
+    return method
+
+
+class AsyncMappingDockerClient(object):
+    """
+    Adapter for using a :class:`~dockermap.map.client.MappingDockerClient` from an :mod:`asyncio` event loop. State
+    generation and actions are run in a thread pool, which can be shared among multiple instances, so that many maps
+    and clients can be processed from one event loop without starting a thread for each of them. Action names and
+    arguments are the same as on the blocking client, but methods return futures that can be awaited, e.g.::
+
+        executor = ThreadPoolExecutor(8)
+        clients = [AsyncMappingDockerClient(MappingDockerClient(c_map, client), executor=executor)
+                   for c_map, client in configs]
+        results = await asyncio.gather(*[c.startup('app') for c in clients])
+
+    Note that cached names of a client and its policy are not shared between threads, unless a
+    :class:`~dockermap.map.policy.cache.CacheRegistry` is used. Concurrent calls on the same instance should therefore
+    be avoided, or use a policy that is set up with a registry.
+
+    :param client: Mapping client. Alternatively, positional and keyword arguments can be passed for creating a new
+      instance of :attr:`client_class`.
+    :type client: dockermap.map.client.MappingDockerClient
+    :param loop: Event loop. By default the current loop is used upon each call.
+    :type loop: asyncio.AbstractEventLoop
+    :param executor: Executor for running the blocking client methods. By default, the loop's default executor is used.
+    :type executor: concurrent.futures.Executor
+    """
+    client_class = MappingDockerClient
+
+    def __init__(self, client=None, *args, **kwargs):
+        self._loop = kwargs.pop('loop', None)
+        self._executor = kwargs.pop('executor', None)
+        if isinstance(client, MappingDockerClient):
+            self._client = client
+        else:
+            self._client = self.client_class(client, *args, **kwargs)
+
+    def _run(self, func, *args, **kwargs):
+        loop = self._loop or asyncio.get_event_loop()
+        return loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def get_states(self, action_name, config_name, instances=None, map_name=None, **kwargs):
+        """
+        Generates the states in relation to the indicated action in the executor. Unlike
+        :meth:`~dockermap.map.client.MappingDockerClient.get_states`, all states are determined before the result is
+        available.
+
+        :param action_name: Action name.
+        :type action_name: unicode | str
+        :param config_name: Name(s) of container configuration(s) or MapConfigId tuple(s).
+        :type config_name: unicode | str | collections.Iterable[unicode | str] | dockermap.map.input.InputConfigId | collections.Iterable[dockermap.map.input.InputConfigId]
+        :param instances: Optional instance names, where applicable but not included in ``config_name``.
+        :type instances: unicode | str | collections.Iterable[unicode | str]
+        :param map_name: Optional map name, where not inlcuded in ``config_name``.
+        :param kwargs: Additional kwargs for state generation.
+        :return: Future of the resulting states of the configurations.
+        :rtype: asyncio.Future
+        """
+        def _get_states():
+            return list(self._client.get_states(action_name, config_name, instances=instances, map_name=map_name,
+                                                **kwargs))
+
+        return self._run(_get_states)
+
+    def get_actions(self, action_name, config_name, instances=None, map_name=None, **kwargs):
+        """
+        Generates the entire set of actions performed for the indicated action name in the executor, without running
+        them.
+
+        :param action_name: Action name.
+        :type action_name: unicode | str
+        :param config_name: Name(s) of container configuration(s) or MapConfigId tuple(s).
+        :type config_name: unicode | str | collections.Iterable[unicode | str] | dockermap.map.input.MapConfigId | collections.Iterable[dockermap.map.input.MapConfigId]
+        :param instances: Optional instance names, where applicable but not included in ``config_name``.
+        :type instances: unicode | str | collections.Iterable[unicode | str]
+        :param map_name: Optional map name, where not inlcuded in ``config_name``.
+        :param kwargs: Additional kwargs for state generation and action generation.
+        :return: Future of the resulting actions of the configurations.
+        :rtype: asyncio.Future
+        """
+        def _get_actions():
+            return list(self._client.get_actions(action_name, config_name, instances=instances, map_name=map_name,
+                                                 **kwargs))
+
+        return self._run(_get_actions)
+
+    run_actions = _executor_method('run_actions')
+    create = _executor_method('create')
+    start = _executor_method('start')
+    restart = _executor_method('restart')
+    stop = _executor_method('stop')
+    remove = _executor_method('remove')
+    startup = _executor_method('startup')
+    shutdown = _executor_method('shutdown')
+    update = _executor_method('update')
+    call = _executor_method('call')
+    run_script = _executor_method('run_script')
+    signal = _executor_method('signal')
+    pull_images = _executor_method('pull_images')
+    refresh_names = _executor_method('refresh_names')
+    list_persistent_containers = _executor_method('list_persistent_containers')
+
+    @property
+    def client(self):
+        """
+        The blocking mapping client that methods are run on.
+
+        :return: Mapping client.
+        :rtype: dockermap.map.client.MappingDockerClient
+        """
+        return self._client
+
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import functools
 import logging
 import sys
 
@@ -12,6 +13,7 @@ from .config.utils import get_map_config_ids
 from .exceptions import ActionException, ActionRunnerException
 from .policy.base import BasePolicy
 from .runner.base import DockerClientRunner
+from .runner.parallel import DeferredActions
 from .state.base import (SingleStateGenerator, DependencyStateGenerator, DependentStateGenerator,
                          ImageDependencyStateGenerator)
 from .state.update import UpdateStateGenerator
@@ -41,7 +43,8 @@ class MappingDockerClient(object):
     ignored.
 
     Image names, container status, and dependencies are cached. In order to force a refresh, use :meth:`refresh_names`.
-    It is also cleared on every change of ``policy_class``.
+    It is also cleared on every change of ``policy_class``. If ``snapshot_store`` is set, cached names are restored from
+    it when the policy is created, and can be stored with :meth:`save_snapshot`.
 
     :param container_maps: :class:`~dockermap.map.config.main.ContainerMap` instance or a tuple or list of such
       instances along with an associated instance.
@@ -68,6 +71,7 @@ class MappingDockerClient(object):
         'pull_images': (ImageDependencyStateGenerator, simple.ImagePullActionGenerator),
     }
     runner_class = DockerClientRunner
+    snapshot_store = None
 
     def __init__(self, container_maps=None, docker_client=None, clients=None):
         if container_maps:
@@ -106,9 +110,19 @@ class MappingDockerClient(object):
         :rtype: dockermap.map.policy.base.BasePolicy
         """
         if not self._policy:
-            self._policy = self.policy_class(self._maps, self._clients)
+            self._policy = policy = self.policy_class(self._maps, self._clients)
+            if self.snapshot_store:
+                self.snapshot_store.load(policy)
         return self._policy
 
+    def save_snapshot(self):
+        """
+        Stores the cached names of the current policy in :attr:`snapshot_store`, so that they can be restored by
+        another instance, e.g. in a new process.
+        """
+        if self.snapshot_store and self._policy:
+            self.snapshot_store.save(self._policy)
+
     def get_state_generator(self, action_name, policy, kwargs):
         """
         Returns the state generator to be used for the given action.
@@ -206,12 +220,55 @@ class MappingDockerClient(object):
             else:
                 log.debug("No actions returned.")
 
+    def get_deferred_actions(self, action_name, config_name, instances=None, map_name=None, **kwargs):
+        """
+        Like :meth:`get_actions`, but returns the items in the order they would be processed without inspecting them.
+        The state and the actions of each item are only determined when its ``get_actions`` function is called, e.g.
+        by :meth:`~dockermap.map.runner.parallel.ParallelRunnerMixin.run_parallel` after the actions of its
+        dependencies have been run.
+
+        :param action_name: Action name.
+        :type action_name: unicode | str
+        :param config_name: Name(s) of container configuration(s) or MapConfigId tuple(s).
+        :type config_name: unicode | str | collections.Iterable[unicode | str] | dockermap.map.input.MapConfigId | collections.Iterable[dockermap.map.input.MapConfigId]
+        :param instances: Optional instance names, where applicable but not included in ``config_name``.
+        :type instances: unicode | str | collections.Iterable[unicode | str]
+        :param map_name: Optional map name, where not inlcuded in ``config_name``.
+        :param kwargs: Additional kwargs for state generation, action generation, runner, or the client action.
+        :return: Deferred actions of the configurations.
+        :rtype: list[dockermap.map.runner.parallel.DeferredActions]
+        """
+        policy = self.get_policy()
+        action_generator = self.get_action_generator(action_name, policy, kwargs)
+        _set_forced_update_ids(kwargs, policy.container_maps, map_name or self._default_map, instances)
+        state_generator = self.get_state_generator(action_name, policy, kwargs)
+        config_ids = get_map_config_ids(config_name, policy.container_maps, map_name or self._default_map,
+                                        instances)
+
+        def _get_item_actions(client_name, config_id, config_flags):
+            state = state_generator.get_item_state(client_name, config_id, config_flags)
+            log.debug("Evaluating state: %s.", state)
+            return action_generator.get_state_actions(state, **kwargs) or []
+
+        return [
+            DeferredActions(client_name, config_id,
+                            functools.partial(_get_item_actions, client_name, config_id, config_flags))
+            for config_id, config_flags in state_generator.get_state_items(config_ids)
+            for client_name in state_generator.get_config_clients(config_id)
+        ]
+
     def run_actions(self, action_name, config_name, instances=None, map_name=None, **kwargs):
         """
         Runs the entire set of actions performed for the indicated action name. On any client failure this raises a
         :class:`~dockermap.map.exceptions.ActionRunnerException`, where partial results can be reviewed in the property
         ``results``, or :class:`~dockermap.exceptions.MiscInvocationError` if no particular action was performed.
 
+        If ``parallel_workers`` or ``shard_clients`` is passed, actions of independent configurations or clients are run
+        concurrently, as implemented in :meth:`~dockermap.map.runner.parallel.ParallelRunnerMixin.run_parallel`.
+        With ``readiness_gating``, this returns after all started containers are ready. With ``pull_workers``, images of
+        ``pull_images`` are pulled concurrently, as implemented in
+        :meth:`~dockermap.map.runner.image.ImageMixin.pull_all`.
+
         :param action_name: Action name.
         :type action_name: unicode | str
         :param config_name: Name(s) of container configuration(s) or MapConfigId tuple(s).
@@ -226,15 +283,23 @@ class MappingDockerClient(object):
         policy = self.get_policy()
         results = []
         runner = self.get_runner(policy, kwargs)
-        for action_list in self.get_actions(action_name, config_name, instances, map_name, **kwargs):
-            try:
-                for res in runner.run_actions(action_list):
-                    results.append(res)
-            except ActionException as ae:
-                raise ActionRunnerException.from_action_exception(ae, results)
-            except:
-                exc_info = sys.exc_info()
-                raise PartialResultsError(exc_info, results)
+        if action_name == 'pull_images' and getattr(runner, 'pull_workers', None):
+            results = runner.pull_all(self.get_actions(action_name, config_name, instances, map_name, **kwargs))
+        elif getattr(runner, 'parallel_workers', None) or getattr(runner, 'shard_clients', False):
+            results = runner.run_parallel(self.get_deferred_actions(action_name, config_name, instances, map_name,
+                                                                    **kwargs))
+        else:
+            for action_list in self.get_actions(action_name, config_name, instances, map_name, **kwargs):
+                try:
+                    for res in runner.run_actions(action_list):
+                        results.append(res)
+                except ActionException as ae:
+                    raise ActionRunnerException.from_action_exception(ae, results)
+                except:
+                    exc_info = sys.exc_info()
+                    raise PartialResultsError(exc_info, results)
+        if getattr(runner, 'readiness_gating', False):
+            runner.wait_all_ready()
         return results
 
     def create(self, container, instances=None, map_name=None, **kwargs):
@@ -459,11 +524,18 @@ class MappingDockerClient(object):
         """
         return self.run_actions('pull_images', container, map_name=map_name, **kwargs)
 
-    def refresh_names(self):
+    def refresh_names(self, client_name=None):
         """
         Invalidates the policy name and status cache.
+
+        :param client_name: Optional client name. If set, only the cached names of this client are fetched again, and
+          the remaining policy is kept.
+        :type client_name: unicode | str
         """
-        self._policy = None
+        if client_name and self._policy:
+            self._policy.invalidate_caches(client_name)
+        else:
+            self._policy = None
 
     def list_persistent_containers(self, map_name=None):
         """
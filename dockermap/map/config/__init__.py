@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from collections import namedtuple, OrderedDict
+import itertools
 
 import six
 
@@ -8,6 +9,7 @@ from ..input import NotSet, NamedTupleList, get_list
 
 
 _IMMUTABLE_TYPES = (bool, float, tuple, frozenset) + six.integer_types + six.string_types
+_revisions = itertools.count(1)
 
 
 class ConfigurationProperty(namedtuple('ConfigurationProperty', ['attr_type', 'default', 'input_func',
@@ -44,6 +46,7 @@ def _get_property(prop_name, doc=None):
     def set_item(self, value):
         self._modified.add(prop_name)
         self._config[prop_name] = value
+        self._revision = next(_revisions)
 
     return property(get_item, set_item, doc=doc)
 
@@ -73,6 +76,7 @@ class ConfigurationObject(six.with_metaclass(ConfigurationMeta)):
             for attr_name, attr_config in six.iteritems(all_props)
         }
         self._modified = set()
+        self._revision = next(_revisions)
         if values:
             self.update(values, copy_instance=True)
         if kwargs:
@@ -189,6 +193,7 @@ class ConfigurationObject(six.with_metaclass(ConfigurationMeta)):
                              if key in all_props}
             self._config.update(filtered_dict)
             self._modified.difference_update(filtered_dict.keys())
+        self._revision = next(_revisions)
 
     def merge_from_dict(self, dct, lists_only=False):
         """
@@ -216,6 +221,7 @@ class ConfigurationObject(six.with_metaclass(ConfigurationMeta)):
                     self._merge_value(attr_type, merge_func, key, value)
             else:
                 self.merge_default_from_dict(key, value, lists_only=lists_only)
+        self._revision = next(_revisions)
 
     def merge_from_obj(self, obj, lists_only=False):
         """
@@ -238,6 +244,7 @@ class ConfigurationObject(six.with_metaclass(ConfigurationMeta)):
             if (merge_func is not False and value != default and
                     (not lists_only or (attr_type and issubclass(attr_type, list)))):
                 self._merge_value(attr_type, merge_func, key, value)
+        self._revision = next(_revisions)
 
     def update(self, values, copy_instance=False):
         """
@@ -306,6 +313,17 @@ class ConfigurationObject(six.with_metaclass(ConfigurationMeta)):
                 self._config[prop_name] = attr_config.input_func(self._config[prop_name])
         self._modified.clear()
 
+    @property
+    def revision(self):
+        """
+        Modification counter of this object. It changes whenever an attribute is set, or the object is updated or merged
+        with other values. Modifying a list or dictionary in place does not change the revision.
+
+        :return: Revision number, unique among all configuration objects.
+        :rtype: int
+        """
+        return self._revision
+
     @property
     def is_clean(self):
         """
@@ -4,6 +4,7 @@ from __future__ import unicode_literals
 from distutils.version import StrictVersion
 
 from ...client.base import DockerClientWrapper
+from ...client.events import ContainerWaiter, EventMonitor
 from ...docker_api import CLIENT_FEATURES
 from .. import DictMap
 
@@ -32,6 +33,8 @@ class ClientConfiguration(DictMap):
     """
     init_kwargs = 'base_url', 'version', 'timeout', 'tls'
     client_constructor = DockerClientWrapper
+    event_monitor_constructor = EventMonitor
+    container_waiter_constructor = ContainerWaiter
 
     def __init__(self, base_url=None, version=None, timeout=None, *args, **kwargs):
         self._base_url = base_url
@@ -51,6 +54,8 @@ class ClientConfiguration(DictMap):
             self._interfaces_ipv6 = DictMap()
         self._auth_configs = kwargs.pop('auth_configs', None) or {}
         self._client = kwargs.pop('client', None)
+        self._event_monitor = kwargs.pop('event_monitor', None)
+        self._container_waiter = None
         super(ClientConfiguration, self).__init__(*args, **kwargs)
         self.update_settings(version=version)
 
@@ -120,6 +125,34 @@ class ClientConfiguration(DictMap):
                 self.version = updated_version
         return client
 
+    def get_event_monitor(self):
+        """
+        Retrieves or creates an event monitor for the client of this configuration. If instantiated from this
+        configuration, the resulting object is also cached in the property ``event_monitor``. The monitor is not started
+        automatically.
+
+        :return: Event monitor instance.
+        :rtype: dockermap.client.events.EventMonitor
+        """
+        monitor = self._event_monitor
+        if not monitor:
+            self._event_monitor = monitor = self.event_monitor_constructor(self.get_client())
+        return monitor
+
+    def get_container_waiter(self):
+        """
+        Retrieves or creates a container waiter for the client of this configuration, which uses the event monitor
+        from :meth:`get_event_monitor`.
+
+        :return: Container waiter instance.
+        :rtype: dockermap.client.events.ContainerWaiter
+        """
+        waiter = self._container_waiter
+        if not waiter:
+            self._container_waiter = waiter = self.container_waiter_constructor(self.get_client(),
+                                                                               self.get_event_monitor())
+        return waiter
+
     @property
     def base_url(self):
         """
@@ -225,6 +258,20 @@ class ClientConfiguration(DictMap):
     def client(self, value):
         self._client = value
 
+    @property
+    def event_monitor(self):
+        """
+        Assigned event monitor instance.
+
+        :return: Event monitor.
+        :rtype: dockermap.client.events.EventMonitor
+        """
+        return self._event_monitor
+
+    @event_monitor.setter
+    def event_monitor(self, value):
+        self._event_monitor = value
+
     @property
     def features(self):
         """
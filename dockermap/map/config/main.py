@@ -60,6 +60,7 @@ class ContainerMap(ConfigurationObject):
     def __init__(self, name, initial=None, check_integrity=True, check_duplicates=True, **kwargs):
         self._name = name
         self._extended = False
+        self._extended_configs = {}
         self._containers = containers = DefaultDictMap(ContainerConfiguration)
         self._volumes = VolumeConfigurationMap()
         self._networks = DefaultDictMap(NetworkConfiguration)
@@ -329,6 +330,19 @@ class ContainerMap(ConfigurationObject):
         default_tag = resolve_value(self.default_tag)
         return repo_name, default_tag or 'latest'
 
+    def get_image_names(self):
+        """
+        Returns the names of all images used by container configurations of this map, including their tags. These can
+        for example be protected from removal in
+        :meth:`~dockermap.client.docker_util.DockerUtilityMixin.collect_images`.
+
+        :return: Image names with tags.
+        :rtype: set[unicode | str]
+        """
+        ext_map = self if self._extended else self.get_extended_map()
+        return {'{0}:{1}'.format(*self.get_image(c_config.image or c_name))
+                for c_name, c_config in ext_map}
+
     def dependency_items(self):
         """
         Generates all containers' dependencies, i.e. an iterator on tuples in the format
@@ -499,9 +513,41 @@ class ContainerMap(ConfigurationObject):
         """
         return self._volumes.get(name)
 
+    def _get_extends_key(self, config):
+        key = [config.revision]
+        for ext_name in config.extends:
+            ext_cfg_base = self._containers.get(ext_name)
+            if not ext_cfg_base:
+                raise KeyError(ext_name)
+            key.append(self._get_extends_key(ext_cfg_base))
+        return tuple(key)
+
+    def _get_extended(self, config):
+        extends_key = self._get_extends_key(config)
+        cached = self._extended_configs.get(id(config))
+        if cached and cached[0] is config and cached[1] == extends_key:
+            return cached[2]
+        extended_config = ContainerConfiguration()
+        for ext_name in config.extends:
+            ext_cfg_base = self._containers[ext_name]
+            ext_cfg = self._get_extended(ext_cfg_base) if ext_cfg_base.extends else ext_cfg_base
+            extended_config.merge_from_obj(ext_cfg)
+        extended_config.merge_from_obj(config)
+        self._prune_extended_configs()
+        self._extended_configs[id(config)] = config, extends_key, extended_config
+        return extended_config
+
+    def _prune_extended_configs(self):
+        current_ids = set(map(id, six.itervalues(self._containers)))
+        for config_id in [c_id for c_id in self._extended_configs if c_id not in current_ids]:
+            del self._extended_configs[config_id]
+
     def get_extended(self, config):
         """
-        Generates a configuration that includes all inherited values.
+        Generates a configuration that includes all inherited values. The merged configuration is cached until the
+        configuration or any of the configurations it extends has been modified, as indicated by their
+        :attr:`~dockermap.map.config.ConfigurationObject.revision`. Every call returns a new copy of it, so that
+        modifications do not affect the cache or other callers.
 
         :param config: Container configuration.
         :type config: ContainerConfiguration
@@ -510,15 +556,7 @@ class ContainerMap(ConfigurationObject):
         """
         if not config.extends or self._extended:
             return config
-        extended_config = ContainerConfiguration()
-        for ext_name in config.extends:
-            ext_cfg_base = self._containers.get(ext_name)
-            if not ext_cfg_base:
-                raise KeyError(ext_name)
-            ext_cfg = self.get_extended(ext_cfg_base)
-            extended_config.merge_from_obj(ext_cfg)
-        extended_config.merge_from_obj(config)
-        return extended_config
+        return self._get_extended(config).copy()
 
     def get_extended_map(self):
         """
@@ -527,6 +565,7 @@ class ContainerMap(ConfigurationObject):
         :return: Copy of this map.
         :rtype: ContainerMap
         """
+        self._prune_extended_configs()
         map_copy = self.__class__(self.name)
         map_copy.update_from_obj(self, copy=True, update_containers=False)
         for c_name, c_config in self:
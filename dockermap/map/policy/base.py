@@ -2,13 +2,14 @@
 from __future__ import unicode_literals
 
 import logging
+import re
 
 from six import iteritems, itervalues
 
 from ... import DEFAULT_COREIMAGE, DEFAULT_BASEIMAGE, DEFAULT_HOSTNAME_REPLACEMENT, DEFAULT_PRESET_NETWORKS
-from ..input import UsedVolume
+from ..input import ItemType, UsedVolume
 from .cache import ContainerCache, ImageCache, NetworkCache, VolumeCache
-from .dep import ContainerDependencyResolver, ContainerDependentsResolver
+from ...dep import DependencyGraph
 
 log = logging.getLogger(__name__)
 
@@ -27,6 +28,10 @@ class BasePolicy(object):
     default_client_name = '__default__'
     hostname_replace = DEFAULT_HOSTNAME_REPLACEMENT
     default_network_names = ['bridge']
+    filter_caches = False
+    managed_label = None
+    fingerprint_label = None
+    cache_registry = None
 
     def __init__(self, container_maps, clients):
         self._maps = maps = {
@@ -34,19 +39,20 @@ class BasePolicy(object):
             for map_name, map_contents in iteritems(container_maps)
         }
         self._clients = clients
-        self._container_names = ContainerCache(clients)
-        self._network_names = NetworkCache(clients)
-        self._volume_names = VolumeCache(clients)
-        self._images = ImageCache(clients)
-        self._f_resolver = f_resolver = ContainerDependencyResolver()
-        self._r_resolver = r_resolver = ContainerDependentsResolver()
+        registry = self.cache_registry
+        self._container_names = ContainerCache(clients, filters=self.get_cache_filters(ItemType.CONTAINER),
+                                               registry=registry)
+        self._network_names = NetworkCache(clients, filters=self.get_cache_filters(ItemType.NETWORK),
+                                           registry=registry)
+        self._volume_names = VolumeCache(clients, filters=self.get_cache_filters(ItemType.VOLUME), registry=registry)
+        self._images = ImageCache(clients, registry=registry)
+        self._kwargs_templates = {}
+        dependency_items = []
         self._default_volume_paths = volume_paths = {}
         self._volume_users = volume_users = {}
         self._volume_permissions = volume_permissions = {}
         for m in itervalues(maps):
-            depdendency_items = list(m.dependency_items())
-            f_resolver.update(depdendency_items)
-            r_resolver.update(depdendency_items)
+            dependency_items.extend(m.dependency_items())
             volume_paths[m.name] = map_paths = {}
             volume_users[m.name] = map_users = {}
             volume_permissions[m.name] = map_permissions = {}
@@ -80,6 +86,7 @@ class BasePolicy(object):
                                        v_permissions.get(a.name) or c_config.permissions)
                                        for c_name, c_config in m
                                        for a in c_config.attaches)
+        self._dependency_graph = DependencyGraph(dependency_items)
 
     @classmethod
     def cname(cls, map_name, container, instance=None):
@@ -177,7 +184,7 @@ class BasePolicy(object):
         :return: Dependency configuration types, container map names, configuration names, and instances.
         :rtype: collections.Iterable[(unicode | str, unicode | str, unicode | str, unicode | str)]
         """
-        return self._f_resolver.get_dependencies(config_id)
+        return self._dependency_graph.get_dependencies(config_id)
 
     def get_dependents(self, config_id):
         """
@@ -188,7 +195,58 @@ class BasePolicy(object):
         :return: Dependent configuration types, container map names, configuration names, and instances.
         :rtype: collections.Iterable[(unicode | str, unicode | str, unicode | str, unicode | str)]
         """
-        return self._r_resolver.get_dependencies(config_id)
+        return self._dependency_graph.get_dependents(config_id)
+
+    def get_cache_filters(self, item_type):
+        """
+        Generates filters for listing containers, networks, and volumes on the clients, if
+        :attr:`~BasePolicy.filter_caches` is set to ``True``. In this implementation, names have to start with one of
+        the prefixes generated by :meth:`cname`, :meth:`aname`, and :meth:`nname` for each map; networks can also be
+        one of the preset networks. If :attr:`~BasePolicy.managed_label` is set, containers are filtered by that label
+        instead. Note that containers, networks, and volumes that are not included cannot be referred to by maps, e.g.
+        when using a container's network.
+
+        :param item_type: Item type.
+        :type item_type: dockermap.map.input.ItemType
+        :return: Filters to pass to the listing function of the client, or ``None`` for listing all items.
+        :rtype: dict
+        """
+        if not self.filter_caches:
+            return None
+        map_names = sorted(self._maps)
+        if item_type == ItemType.CONTAINER:
+            if self.managed_label:
+                return {'label': self.managed_label}
+            prefixes = set(self.cname(map_name, '') for map_name in map_names)
+            prefixes.update(self.aname(map_name, '') for map_name in map_names)
+            return {'name': ['^/{0}'.format(re.escape(prefix)) for prefix in sorted(prefixes)]}
+        elif item_type == ItemType.NETWORK:
+            names = ['^{0}'.format(re.escape(self.nname(map_name, ''))) for map_name in map_names]
+            names.extend('^{0}$'.format(n_name) for n_name in DEFAULT_PRESET_NETWORKS)
+            return {'name': names}
+        elif item_type == ItemType.VOLUME:
+            return {'name': ['^{0}'.format(re.escape(self.aname(map_name, ''))) for map_name in map_names]}
+        return None
+
+    def get_caches(self):
+        """
+        Returns the caches of container, image, network, and volume names.
+
+        :return: Tuple of caches.
+        :rtype: tuple[dockermap.map.policy.cache.DockerHostItemCache]
+        """
+        return self._container_names, self._images, self._network_names, self._volume_names
+
+    def invalidate_caches(self, client_name=None):
+        """
+        Invalidates the cached container, image, network, and volume names of a client, or of all clients. They are
+        fetched again upon next access.
+
+        :param client_name: Client name. If not set, all clients are invalidated.
+        :type client_name: unicode | str
+        """
+        for cache in self.get_caches():
+            cache.invalidate(client_name)
 
     @property
     def container_maps(self):
@@ -200,6 +258,16 @@ class BasePolicy(object):
         """
         return self._maps
 
+    @property
+    def dependency_graph(self):
+        """
+        Dependency graph of all configurations on the container maps, compiled upon instantiation of the policy.
+
+        :return: Dependency graph.
+        :rtype: dockermap.dep.DependencyGraph
+        """
+        return self._dependency_graph
+
     @property
     def clients(self):
         """
@@ -282,3 +350,14 @@ class BasePolicy(object):
         :rtype: dict[unicode | str, dict]
         """
         return self._volume_permissions
+
+    @property
+    def kwargs_templates(self):
+        """
+        Compiled keyword arguments for creating and starting containers, by item type and configuration. See
+        :meth:`~dockermap.map.runner.base.DockerConfigMixin.get_container_create_kwargs`.
+
+        :return: Dictionary of kwargs templates.
+        :rtype: dict[tuple, tuple]
+        """
+        return self._kwargs_templates
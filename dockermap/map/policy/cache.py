@@ -1,18 +1,75 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import json
+import re
+import threading
+import time
+
+import six
+from docker.errors import APIError
+
+from ..input import ItemType
+
+
+def _discard_index(index, key, value):
+    values = index.get(key)
+    if values:
+        values.discard(value)
+        if not values:
+            del index[key]
+
+
+def get_filters_key(filters):
+    """
+    Generates a string that identifies a set of filters, e.g. for comparing them or using them as dictionary keys.
+
+    :param filters: Filters applied when listing items.
+    :type filters: dict
+    :return: JSON representation of the filters, with sorted keys.
+    :rtype: unicode | str
+    """
+    return json.dumps(filters, sort_keys=True)
+
 
 class CachedItems(object):
     """
-    Abstract implementation for a caching collection of client names or ids.
+    Abstract implementation for a caching collection of client names or ids. Single changes to the collection, e.g. from
+    events or actions, are thread-safe; changes that consist of multiple steps are made while holding :attr:`lock`.
 
     :param client: Client object.
     :type client: docker.client.Client
+    :param filters: Optional filters to apply when listing items on the client.
+    :type filters: dict
+    :param initial: Optional items to initialize the cache with, e.g. from a snapshot. If set, the items are not
+      fetched from the client.
     """
-    def __init__(self, client):
+    def __init__(self, client, filters=None, initial=None):
         self._client = client
+        self._filters = filters
+        self._lock = threading.RLock()
         super(CachedItems, self).__init__()
-        self.refresh()
+        if initial is None:
+            self.refresh()
+        else:
+            self.update(initial)
+
+    def _get_list_kwargs(self):
+        if self._filters:
+            return {'filters': self._filters}
+        return {}
+
+    def _is_included(self, name, attributes=None):
+        filters = self._filters
+        if not filters:
+            return True
+        name_patterns = filters.get('name')
+        if name_patterns and not any(re.match(pattern, name) for pattern in name_patterns):
+            return False
+        label = filters.get('label')
+        if label and attributes is not None and label not in attributes:
+            return False
+        return True
 
     def refresh(self):
         """
@@ -20,16 +77,144 @@ class CachedItems(object):
         """
         raise NotImplementedError("Method 'refresh' is not implemented.")
 
+    def get_snapshot(self):
+        """
+        Returns the cached items in a form that can be serialized to JSON, and passed as ``initial`` argument later.
+
+        :return: Cached items.
+        :rtype: dict | list
+        """
+        return dict(self)
+
+    def update_from_event(self, event):
+        """
+        Updates the cached items from a Docker event. By default events are ignored.
+
+        :param event: Decoded event from the Docker event stream.
+        :type event: dict
+        """
+        pass
+
+    def _remove_id(self, item_id):
+        for name, c_id in list(self.items()):
+            if c_id == item_id:
+                self.pop(name, None)
+
+    @property
+    def lock(self):
+        """
+        Lock held during changes of the cached items that consist of multiple steps.
+
+        :return: Re-entrant lock.
+        :rtype: threading.RLock
+        """
+        return self._lock
+
+
+def _get_repository(tag):
+    repository, __, tag_name = tag.rpartition(':')
+    if not repository or '/' in tag_name:
+        return tag
+    return repository
+
 
 class CachedImages(CachedItems, dict):
     """
     Dictionary of image names and ids, which also keeps track of the client object to pull images if necessary.
+    In addition to the image name lookup, it maintains indexes of tags per image id and per repository.
     """
+    def __init__(self, *args, **kwargs):
+        self._image_tags = {}
+        self._repo_tags = {}
+        super(CachedImages, self).__init__(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            previous_id = self.get(key)
+            if previous_id == value:
+                return
+            if previous_id is not None:
+                _discard_index(self._image_tags, previous_id, key)
+            super(CachedImages, self).__setitem__(key, value)
+            self._image_tags.setdefault(value, set()).add(key)
+            self._repo_tags.setdefault(_get_repository(key), set()).add(key)
+
+    def __delitem__(self, key):
+        with self._lock:
+            image_id = self[key]
+            super(CachedImages, self).__delitem__(key)
+            _discard_index(self._image_tags, image_id, key)
+            _discard_index(self._repo_tags, _get_repository(key), key)
+
+    def pop(self, key, *args):
+        with self._lock:
+            if key in self:
+                value = self[key]
+                del self[key]
+                return value
+            return super(CachedImages, self).pop(key, *args)
+
+    def popitem(self):
+        with self._lock:
+            key, value = super(CachedImages, self).popitem()
+            _discard_index(self._image_tags, value, key)
+            _discard_index(self._repo_tags, _get_repository(key), key)
+            return key, value
+
+    def setdefault(self, key, default=None):
+        with self._lock:
+            if key not in self:
+                self[key] = default
+            return self[key]
+
+    def update(self, *args, **kwargs):
+        with self._lock:
+            for key, value in six.iteritems(dict(*args, **kwargs)):
+                self[key] = value
+
+    def clear(self):
+        with self._lock:
+            super(CachedImages, self).clear()
+            self._image_tags.clear()
+            self._repo_tags.clear()
+
+    def _remove_id(self, item_id):
+        with self._lock:
+            for tag in self.get_tags(item_id):
+                del self[tag]
+
     def _update(self, image_list):
-        for image in image_list:
-            tags = image.get('RepoTags')
-            if tags:
-                self.update({tag: image['Id'] for tag in tags})
+        with self._lock:
+            for image in image_list:
+                tags = image.get('RepoTags')
+                if tags:
+                    image_id = image['Id']
+                    for tag in tags:
+                        self[tag] = image_id
+
+    def get_tags(self, image_id):
+        """
+        Returns all cached tags of an image.
+
+        :param image_id: Image id.
+        :type image_id: unicode | str
+        :return: Set of image tags, including the repository name.
+        :rtype: set[unicode | str]
+        """
+        with self._lock:
+            return set(self._image_tags.get(image_id, ()))
+
+    def get_repository_tags(self, name):
+        """
+        Returns all cached tags of a repository.
+
+        :param name: Repository name, without a tag.
+        :type name: unicode | str
+        :return: Set of image tags, including the repository name.
+        :rtype: set[unicode | str]
+        """
+        with self._lock:
+            return set(self._repo_tags.get(name, ()))
 
     def refresh(self):
         """
@@ -38,17 +223,60 @@ class CachedImages(CachedItems, dict):
         if not self._client:
             return
         current_images = self._client.images()
-        self.clear()
-        self._update(current_images)
-        for image in current_images:
-            tags = image.get('RepoTags')
-            if tags:
-                self.update({tag: image['Id'] for tag in tags})
+        with self._lock:
+            self.clear()
+            self._update(current_images)
 
     def refresh_repo(self, name):
+        """
+        Fetches the images of a single repository from the client. Tags of the repository that no longer exist are
+        removed.
+
+        :param name: Repository name, without a tag.
+        :type name: unicode | str
+        """
+        if not self._client:
+            return
+        current_images = self._client.images(name=name)
+        current_tags = set(tag
+                           for image in current_images
+                           for tag in image.get('RepoTags') or ())
+        with self._lock:
+            previous_tags = self.get_repository_tags(name)
+            self._update(current_images)
+            for tag in previous_tags - current_tags:
+                self.pop(tag, None)
+
+    def refresh_image(self, image):
+        """
+        Updates the tags of a single image, also removing tags that no longer refer to it.
+
+        :param image: Image id or name.
+        :type image: unicode | str
+        """
         if not self._client:
             return
-        self._update(self._client.images(name=name))
+        try:
+            image_info = self._client.inspect_image(image)
+        except APIError as e:
+            if e.response.status_code != 404:
+                raise
+            self._remove_id(image)
+            return
+        with self._lock:
+            for tag in self.get_tags(image_info['Id']).difference(image_info.get('RepoTags') or ()):
+                self.pop(tag, None)
+            self._update([image_info])
+
+    def update_from_event(self, event):
+        if event.get('Type') != 'image':
+            return
+        action = event.get('Action')
+        image = event['Actor']['ID']
+        if action == 'delete':
+            self._remove_id(image)
+        elif action in ('pull', 'import', 'load', 'tag', 'untag'):
+            self.refresh_image(image)
 
 
 class CachedContainerNames(CachedItems, dict):
@@ -58,7 +286,7 @@ class CachedContainerNames(CachedItems, dict):
         """
         if not self._client:
             return
-        current_containers = self._client.containers(all=True)
+        current_containers = self._client.containers(all=True, **self._get_list_kwargs())
         self.clear()
         for container in current_containers:
             container_names = container.get('Names')
@@ -67,6 +295,24 @@ class CachedContainerNames(CachedItems, dict):
                 self.update((name[1:], c_id)
                             for name in container_names)
 
+    def update_from_event(self, event):
+        if event.get('Type') != 'container':
+            return
+        action = event.get('Action')
+        actor = event['Actor']
+        attributes = actor.get('Attributes') or {}
+        if action == 'create':
+            name = attributes['name']
+            if self._is_included('/{0}'.format(name), attributes):
+                self[name] = actor['ID']
+        elif action == 'rename':
+            self.pop(attributes['oldName'].lstrip('/'), None)
+            name = attributes['name']
+            if self._is_included('/{0}'.format(name), attributes):
+                self[name] = actor['ID']
+        elif action == 'destroy':
+            self._remove_id(actor['ID'])
+
 
 class CachedNetworkNames(CachedItems, dict):
     def refresh(self):
@@ -75,11 +321,23 @@ class CachedNetworkNames(CachedItems, dict):
         """
         if not self._client:
             return
-        current_networks = self._client.networks()
+        current_networks = self._client.networks(**self._get_list_kwargs())
         self.clear()
         self.update((net['Name'], net['Id'])
                     for net in current_networks)
 
+    def update_from_event(self, event):
+        if event.get('Type') != 'network':
+            return
+        action = event.get('Action')
+        actor = event['Actor']
+        if action == 'create':
+            name = actor['Attributes']['name']
+            if self._is_included(name):
+                self[name] = actor['ID']
+        elif action == 'destroy':
+            self._remove_id(actor['ID'])
+
 
 class CachedVolumeNames(CachedItems, set):
     def refresh(self):
@@ -88,24 +346,151 @@ class CachedVolumeNames(CachedItems, set):
         """
         if not self._client:
             return
-        current_volumes = self._client.volumes()['Volumes']
+        current_volumes = self._client.volumes(**self._get_list_kwargs())['Volumes']
         self.clear()
         if current_volumes:
             self.update(vol['Name'] for vol in current_volumes)
 
+    def get_snapshot(self):
+        return sorted(self)
+
+    def update_from_event(self, event):
+        if event.get('Type') != 'volume':
+            return
+        action = event.get('Action')
+        if action == 'create':
+            name = event['Actor']['ID']
+            if self._is_included(name):
+                self.add(name)
+        elif action == 'destroy':
+            self.discard(event['Actor']['ID'])
+
+
+class CacheRegistry(object):
+    """
+    Registry of cached items that can be shared between policies, e.g. of multiple instances of
+    :class:`~dockermap.map.client.MappingDockerClient` in different threads. Items are registered by item type, client
+    URL, and filters. A lock is held per entry while the items are fetched, so that concurrent requests for the same
+    items only cause a single listing on the client.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._entries = {}
+        self._generations = {}
+
+    def get_lock(self, key):
+        """
+        Returns the lock for fetching the items of an entry.
+
+        :param key: Entry key.
+        :type key: tuple
+        :return: Re-entrant lock.
+        :rtype: threading.RLock
+        """
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                self._locks[key] = lock = threading.RLock()
+            return lock
+
+    def get(self, key):
+        """
+        Returns a registered entry.
+
+        :param key: Entry key.
+        :type key: tuple
+        :return: Tuple of items, their generation, and the time they have been fetched. ``None`` if there is no entry.
+        :rtype: (CachedItems, int, float)
+        """
+        return self._entries.get(key)
+
+    def set(self, key, items, generation, fetch_time):
+        """
+        Registers items, replacing previous items of the entry.
+
+        :param key: Entry key.
+        :type key: tuple
+        :param items: Cached items.
+        :type items: CachedItems
+        :param generation: Generation of the entry at the time the items have been fetched.
+        :type generation: int
+        :param fetch_time: Time when the items have been fetched.
+        :type fetch_time: float
+        """
+        self._entries[key] = items, generation, fetch_time
+
+    def get_generation(self, key):
+        """
+        Returns the generation of an entry. It is increased every time the entry is invalidated.
+
+        :param key: Entry key.
+        :type key: tuple
+        :return: Generation number.
+        :rtype: int
+        """
+        return self._generations.get(key, 0)
+
+    def invalidate(self, key=None):
+        """
+        Invalidates an entry, or all entries.
+
+        :param key: Entry key. If not set, all entries are invalidated.
+        :type key: tuple
+        """
+        with self._lock:
+            if key is None:
+                keys = list(self._entries.keys())
+            else:
+                keys = [key]
+            for k in keys:
+                self._generations[k] = self._generations.get(k, 0) + 1
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+default_registry = CacheRegistry()
+
 
 class DockerHostItemCache(dict):
     """
     Abstract class for implementing caches of items (containers, images) present on the Docker client, so that
     their existence does not have to be checked separately for every action.
 
+    Items are fetched again from a client when they are accessed after they have been invalidated with
+    :meth:`invalidate`, or when they are older than set in ``cache_ttl`` of the client configuration. This can be
+    either a number of seconds or a dictionary with different values per item type, e.g. ``{'image': 600}``. Item types
+    can be given as :class:`~dockermap.map.input.ItemType` or its value.
+
+    If the client configuration has ``cache_events`` set to ``True``, the items are listed only once and afterwards
+    kept up to date from the event stream of the client. Note that this requires a Docker host with API version 1.22
+    or higher.
+
+    If a ``registry`` is passed, items of clients with a ``base_url`` are stored there, and shared with all other caches
+    using the same registry.
+
     :param clients: Dictionary of clients with alias and client object.
     :type clients: dict[unicode | str, dockermap.map.config.client.ClientConfiguration]
+    :param filters: Optional filters to apply when listing items on the clients.
+    :type filters: dict
+    :param registry: Optional registry for sharing cached items.
+    :type registry: CacheRegistry
     """
     item_class = None
+    item_type = None
 
     def __init__(self, clients, *args, **kwargs):
         self._clients = clients
+        self._filters = kwargs.pop('filters', None)
+        self._filters_key = get_filters_key(self._filters)
+        self._registry = kwargs.pop('registry', None)
+        self._generations = {}
+        self._fetched = {}
         super(DockerHostItemCache, self).__init__(*args, **kwargs)
 
     def __getitem__(self, item):
@@ -116,10 +501,148 @@ class DockerHostItemCache(dict):
         :type item: unicode | str
         :return: Items in the cache.
         """
-        if item not in self:
+        key = self.get_registry_key(item)
+        if key:
+            entry = self._registry.get(key)
+            if not entry or self.is_stale(item):
+                with self._registry.get_lock(key):
+                    # Another thread may have fetched the items in the meantime.
+                    if self.is_stale(item):
+                        return self.refresh(item)
+                    entry = self._registry.get(key)
+            val = entry[0]
+            super(DockerHostItemCache, self).__setitem__(item, val)
+            return val
+        if item not in self or self.is_stale(item):
             return self.refresh(item)
         return super(DockerHostItemCache, self).__getitem__(item)
 
+    def get_registry_key(self, item):
+        """
+        Returns the key for storing the items of a client in the registry.
+
+        :param item: Client name.
+        :type item: unicode | str
+        :return: Tuple of item type, client URL, and filters. ``None`` if the items are not shared.
+        :rtype: tuple
+        """
+        if not self._registry:
+            return None
+        base_url = self._clients[item].base_url
+        if not base_url:
+            return None
+        return self.item_type.value, base_url, self._filters_key
+
+    def get_cached(self, item):
+        """
+        Returns the cached items of a client without fetching them.
+
+        :param item: Client name.
+        :type item: unicode | str
+        :return: Items in the cache. ``None`` if they have not been fetched yet.
+        :rtype: DockerHostItemCache.item_class
+        """
+        key = self.get_registry_key(item)
+        if key:
+            entry = self._registry.get(key)
+            return entry and entry[0]
+        return self.get(item)
+
+    def get_ttl(self, item):
+        """
+        Returns the time in seconds after which cached items of a client are fetched again.
+
+        :param item: Client name.
+        :type item: unicode | str
+        :return: Time in seconds. ``None`` if the items do not expire.
+        :rtype: int | float
+        """
+        ttl = self._clients[item].get('cache_ttl')
+        if isinstance(ttl, dict):
+            item_ttl = ttl.get(self.item_type)
+            if item_ttl is None:
+                return ttl.get(self.item_type.value)
+            return item_ttl
+        return ttl
+
+    def get_generation(self, item):
+        """
+        Returns the generation of cached items of a client. It is increased every time the items are invalidated.
+
+        :param item: Client name.
+        :type item: unicode | str
+        :return: Generation number.
+        :rtype: int
+        """
+        key = self.get_registry_key(item)
+        if key:
+            return self._registry.get_generation(key)
+        return self._generations.get(item, 0)
+
+    def is_stale(self, item):
+        """
+        Checks whether the cached items of a client need to be fetched again, because they have been invalidated or
+        expired.
+
+        :param item: Client name.
+        :type item: unicode | str
+        :return: ``True`` if the items should be fetched again, ``False`` otherwise.
+        :rtype: bool
+        """
+        key = self.get_registry_key(item)
+        if key:
+            entry = self._registry.get(key)
+            fetched = entry and entry[1:]
+        else:
+            fetched = self._fetched.get(item)
+        if not fetched:
+            return True
+        generation, fetch_time = fetched
+        if generation != self.get_generation(item):
+            return True
+        ttl = self.get_ttl(item)
+        return bool(ttl and time.time() - fetch_time > ttl)
+
+    def invalidate(self, item=None):
+        """
+        Invalidates the cached items of a client, or of all clients. They are fetched again upon next access. Shared
+        items are also invalidated for other caches using the same registry.
+
+        :param item: Client name. If not set, all clients are invalidated.
+        :type item: unicode | str
+        """
+        if item is None:
+            items = list(self.keys())
+        else:
+            items = [item]
+        for i in items:
+            key = self.get_registry_key(i)
+            if key:
+                self._registry.invalidate(key)
+            else:
+                self._generations[i] = self.get_generation(i) + 1
+
+    def _set_items(self, item, get_items):
+        client_config = self._clients[item]
+        generation = self.get_generation(item)
+        fetch_time = time.time()
+        if client_config.get('cache_events'):
+            monitor = client_config.get_event_monitor()
+            monitor.start()
+            # Holding the lock, events are queued until the items are in place.
+            with monitor.lock:
+                val = get_items(client_config.get_client())
+                monitor.add_listener(val.update_from_event, key=(self.item_class, self._filters_key))
+        else:
+            val = get_items(client_config.get_client())
+        key = self.get_registry_key(item)
+        if key:
+            self._registry.set(key, val, generation, fetch_time)
+        else:
+            self._fetched[item] = generation, fetch_time
+        super(DockerHostItemCache, self).__setitem__(item, val)
+        return val
+
     def refresh(self, item):
         """
         Forces a refresh of a cached item.
@@ -129,9 +652,30 @@ class DockerHostItemCache(dict):
         :return: Items in the cache.
         :rtype: DockerHostItemCache.item_class
         """
-        client = self._clients[item].get_client()
-        self[item] = val = self.item_class(client)
-        return val
+        return self._set_items(item, lambda client: self.item_class(client, filters=self._filters))
+
+    def restore(self, item, initial):
+        """
+        Sets the cached items of a client, e.g. from a snapshot, instead of fetching them.
+
+        :param item: Client name.
+        :type item: unicode | str
+        :param initial: Cached items, as returned by :meth:`CachedItems.get_snapshot`.
+        :type initial: dict | list
+        :return: Items in the cache.
+        :rtype: DockerHostItemCache.item_class
+        """
+        return self._set_items(item, lambda client: self.item_class(client, filters=self._filters, initial=initial))
+
+    @property
+    def filters(self):
+        """
+        Filters applied when listing items on the clients.
+
+        :return: Filters.
+        :rtype: dict
+        """
+        return self._filters
 
 
 class ImageCache(DockerHostItemCache):
@@ -139,6 +683,7 @@ class ImageCache(DockerHostItemCache):
     Fetches and caches image names and ids from a Docker host.
     """
     item_class = CachedImages
+    item_type = ItemType.IMAGE
 
 
 class ContainerCache(DockerHostItemCache):
@@ -146,6 +691,7 @@ class ContainerCache(DockerHostItemCache):
     Fetches and caches container names from a Docker host.
     """
     item_class = CachedContainerNames
+    item_type = ItemType.CONTAINER
 
 
 class NetworkCache(DockerHostItemCache):
@@ -153,6 +699,7 @@ class NetworkCache(DockerHostItemCache):
     Fetches and caches network names from a Docker host.
     """
     item_class = CachedNetworkNames
+    item_type = ItemType.NETWORK
 
     def refresh(self, item):
         client_config = self._clients[item]
@@ -166,6 +713,7 @@ class VolumeCache(DockerHostItemCache):
     Fetches and caches volume names from a Docker host.
     """
     item_class = CachedVolumeNames
+    item_type = ItemType.VOLUME
 
     def refresh(self, item):
         client_config = self._clients[item]
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+import logging
+import os
+import tempfile
+import time
+
+from ...client.events import get_timestamp_time
+from .cache import get_filters_key
+
+
+log = logging.getLogger(__name__)
+
+
+def _get_earlier_time(timestamp, margin):
+    seconds, __, fraction = timestamp.partition('.')
+    earlier = int(seconds) - margin
+    if fraction:
+        return '{0}.{1}'.format(earlier, fraction)
+    return '{0}'.format(earlier)
+
+
+class CacheSnapshotStore(object):
+    """
+    Stores the cached items of a policy in a file, along with the time of the last processed Docker event for each
+    client. A new process can restore the caches from the file and only needs to process the events that have occurred
+    since then, instead of listing all items again.
+
+    Only clients that have ``cache_events`` set in their configuration are considered, since the caches could not be
+    brought up to date otherwise. Note that the Docker host only keeps a limited number of past events (currently 256)
+    for replay. If more events are expected to occur between two processes, set ``max_age`` accordingly, or do not
+    use a snapshot store.
+
+    :param path: Path to the snapshot file.
+    :type path: unicode | str
+    :param max_age: Maximum age of a snapshot in seconds. Older snapshots are ignored upon loading.
+    :type max_age: int | float
+    :param margin: If no events have been processed before saving a snapshot, the current time of the Docker host minus
+      this number of seconds is stored, so that events that are not yet processed at this point are replayed later.
+    :type margin: int
+    """
+    def __init__(self, path, max_age=None, margin=1):
+        self._path = path
+        self._max_age = max_age
+        self._margin = margin
+
+    def _read(self):
+        try:
+            with open(self._path) as f:
+                return json.load(f)
+        except (IOError, OSError):
+            return {}
+        except ValueError:
+            log.warning("Ignoring invalid cache snapshot file %s.", self._path)
+            return {}
+
+    def _write(self, data):
+        dir_name = os.path.dirname(os.path.abspath(self._path))
+        fd, temp_path = tempfile.mkstemp(dir=dir_name, prefix='.snapshot')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            replace = getattr(os, 'replace', os.rename)
+            replace(temp_path, self._path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+    def _get_client_names(self, policy, client_names):
+        names = client_names or policy.clients.keys()
+        for client_name in names:
+            client_config = policy.clients[client_name]
+            if client_config.get('cache_events'):
+                yield client_name, client_config
+
+    def get_snapshot(self, policy, client_name, client_config):
+        """
+        Generates the snapshot of cached items for a single client. Only items that have been fetched are included.
+
+        :param policy: Policy instance.
+        :type policy: dockermap.map.policy.base.BasePolicy
+        :param client_name: Client name.
+        :type client_name: unicode | str
+        :param client_config: Client configuration.
+        :type client_config: dockermap.map.config.client.ClientConfiguration
+        :return: Snapshot data. ``None`` if the client does not follow the event stream.
+        :rtype: dict
+        """
+        monitor = client_config.get_event_monitor()
+        if not monitor.running:
+            return None
+        with monitor.lock:
+            cursor = monitor.cursor
+            if not cursor:
+                system_time = client_config.get_client().info()['SystemTime']
+                cursor = _get_earlier_time(get_timestamp_time(system_time), self._margin)
+            items = {}
+            filters = {}
+            for cache in policy.get_caches():
+                cached_items = cache.get_cached(client_name)
+                if cached_items is not None:
+                    type_name = cache.item_type.value
+                    items[type_name] = cached_items.get_snapshot()
+                    filters[type_name] = get_filters_key(cache.filters)
+        return {
+            'base_url': client_config.base_url,
+            'cursor': cursor,
+            'time': time.time(),
+            'items': items,
+            'filters': filters,
+        }
+
+    def save(self, policy, client_names=None):
+        """
+        Writes the cached items of the policy to the snapshot file. Existing entries of other clients are preserved.
+
+        :param policy: Policy instance.
+        :type policy: dockermap.map.policy.base.BasePolicy
+        :param client_names: Optional names of clients to store. By default includes all clients.
+        :type client_names: collections.Iterable[unicode | str]
+        """
+        data = self._read()
+        for client_name, client_config in self._get_client_names(policy, client_names):
+            snapshot = self.get_snapshot(policy, client_name, client_config)
+            if snapshot:
+                data[client_name] = snapshot
+        self._write(data)
+
+    def load(self, policy, client_names=None):
+        """
+        Restores the caches of the policy from the snapshot file, and starts following the event stream of each
+        restored client from the time the snapshot has been taken. Clients are skipped if their event monitor is
+        already running, the snapshot is older than ``max_age``, or if the client URL or cache filters have changed.
+
+        :param policy: Policy instance.
+        :type policy: dockermap.map.policy.base.BasePolicy
+        :param client_names: Optional names of clients to restore. By default includes all clients.
+        :type client_names: collections.Iterable[unicode | str]
+        :return: Names of the restored clients.
+        :rtype: list[unicode | str]
+        """
+        data = self._read()
+        restored = []
+        now = time.time()
+        caches = {cache.item_type.value: cache for cache in policy.get_caches()}
+        for client_name, client_config in self._get_client_names(policy, client_names):
+            snapshot = data.get(client_name)
+            if not snapshot:
+                continue
+            if snapshot.get('base_url') != client_config.base_url:
+                log.debug("Skipping cache snapshot of client %s, since the URL has changed.", client_name)
+                continue
+            if self._max_age is not None and now - snapshot.get('time', 0) > self._max_age:
+                log.debug("Skipping expired cache snapshot of client %s.", client_name)
+                continue
+            items = snapshot.get('items', {})
+            filters = snapshot.get('filters', {})
+            if any(get_filters_key(caches[type_name].filters) != filters.get(type_name)
+                   for type_name in items):
+                log.debug("Skipping cache snapshot of client %s, since cache filters have changed.", client_name)
+                continue
+            monitor = client_config.get_event_monitor()
+            with monitor.lock:
+                if monitor.running:
+                    continue
+                # Events are replayed from the cursor once the monitor is started by the first restored cache.
+                monitor.cursor = snapshot['cursor']
+                for type_name, type_items in items.items():
+                    caches[type_name].restore(client_name, type_items)
+            restored.append(client_name)
+        return restored
@@ -7,7 +7,7 @@ from ..action import VolumeUtilAction
 from ..config.client import USE_HC_MERGE
 from ..input import ItemType
 from ..policy.utils import get_instance_volumes
-from .utils import update_kwargs, get_preparation_cmd
+from .utils import update_kwargs, get_preparation_cmd, wait_container
 
 
 PREPARATION_TMP_PATH = '/volume-tmp'
@@ -139,7 +139,7 @@ class AttachedPreparationMixin(AttachedConfigMixin):
         if not apc_kwargs:
             return
         a_wait_kwargs = self.get_attached_preparation_wait_kwargs(action, volume_container)
-        client.wait(volume_container, **a_wait_kwargs)
+        wait_container(action, **a_wait_kwargs)
         temp_container = client.create_container(**apc_kwargs)
         temp_id = temp_container['Id']
         try:
@@ -149,7 +149,7 @@ class AttachedPreparationMixin(AttachedConfigMixin):
                 aps_kwargs = self.get_attached_preparation_host_config_kwargs(action, temp_id, volume_container)
                 client.start(**aps_kwargs)
             temp_wait_kwargs = self.get_attached_preparation_wait_kwargs(action, temp_id)
-            client.wait(temp_id, **temp_wait_kwargs)
+            wait_container(action, **temp_wait_kwargs)
         finally:
             client.remove_container(temp_id)
 
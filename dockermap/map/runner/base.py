@@ -5,7 +5,7 @@ import logging
 from time import sleep
 
 from requests import Timeout
-from six import text_type, iteritems, string_types
+from six import text_type, iteritems, itervalues, string_types
 from six.moves import map
 
 from ...docker_api import HostConfig, NetworkingConfig, EndpointConfig
@@ -20,9 +20,12 @@ from .attached import AttachedPreparationMixin
 from .cmd import ExecMixin
 from .image import ImageMixin
 from .network import NetworkUtilMixin
+from .parallel import ParallelRunnerMixin
+from .ready import ReadinessGateMixin
 from .script import ScriptMixin
 from .signal_stop import SignalMixin
-from .utils import update_kwargs, get_volumes, get_volumes_from, get_host_binds, get_port_bindings
+from .utils import (update_kwargs, get_volumes, get_volumes_from, get_host_binds, get_port_bindings,
+                    wait_container, get_config_fingerprint, get_label_dict, has_lazy_values, copy_kwargs)
 
 log = logging.getLogger(__name__)
 
@@ -117,7 +120,9 @@ class DockerBaseRunnerMixin(object):
             c_kwargs = self.get_container_host_config_kwargs(action, c_name, kwargs=kwargs)
             res = action.client.start(**c_kwargs)
         start_delay = action.config.start_delay
-        if start_delay:
+        if self.readiness_gating:
+            self.add_pending_ready(action, c_name)
+        elif start_delay:
             log.debug("Sleeping %s seconds after container %s start.", start_delay, c_name)
             sleep(start_delay)
         return res
@@ -133,7 +138,7 @@ class DockerBaseRunnerMixin(object):
         except Timeout:
             log.warning("Container %s did not stop in time - sent SIGKILL.", c_name)
             try:
-                action.client.wait(c_name, timeout=c_kwargs.get('timeout', 10))
+                wait_container(action, container=c_name, timeout=c_kwargs.get('timeout', 10))
             except Timeout:
                 pass
         return None
@@ -154,23 +159,72 @@ class DockerBaseRunnerMixin(object):
 
     def wait(self, action, c_name, **kwargs):
         c_kwargs = self.get_container_wait_kwargs(action, c_name, kwargs=kwargs)
-        return action.client.wait(**c_kwargs)
+        return wait_container(action, **c_kwargs)
 
 
 class DockerConfigMixin(object):
-    def get_container_create_kwargs(self, action, container_name, kwargs=None):
-        """
-        Generates keyword arguments for the Docker client to create a container.
+    def _uses_lazy_values(self, action):
+        container_map = action.container_map
+        client_config = action.client_config
+        config_values = [value for key, value in iteritems(action.config.as_dict())
+                         if key not in ('create_options', 'host_config')]
+        return has_lazy_values([
+            config_values,
+            self._policy.default_volume_paths[action.config_id.map_name],
+            dict(container_map.host),
+            container_map.host.root,
+            container_map.default_domain,
+            client_config.get('domainname'),
+            dict(client_config.interfaces),
+            dict(client_config.interfaces_ipv6),
+        ])
+
+    def _get_template_revision(self, action):
+        container_map = action.container_map
+        client_config = action.client_config
+        config_revisions = [c_config.revision for c_config in itervalues(container_map.containers)]
+        config_revisions.extend(v_config.revision for v_config in itervalues(container_map.volumes))
+        return (
+            action.config.revision,
+            container_map.revision,
+            max(config_revisions) if config_revisions else None,
+            len(config_revisions),
+            dict(container_map.host),
+            container_map.host.root,
+            client_config.version,
+            dict(client_config.features),
+            client_config.get('domainname'),
+            dict(client_config.interfaces),
+            dict(client_config.interfaces_ipv6),
+        )
 
-        :param action: Action configuration.
-        :type action: ActionConfig
-        :param container_name: Container name.
-        :type container_name: unicode | str
-        :param kwargs: Additional keyword arguments to complement or override the configuration-based values.
-        :type kwargs: dict | NoneType
-        :return: Resulting keyword arguments.
-        :rtype: dict
+    def _get_kwargs_template(self, action, container_name, compile_func):
+        """
+        Returns keyword arguments from ``compile_func``, which are compiled only once per map, configuration, instance,
+        client, and container name. The result is not cached if the configuration contains lazy values, since they
+        need to be resolved on every call. It is compiled again after the configuration, any other configuration of the
+        map, the map itself, or the relevant client settings have been modified. Lists and dictionaries of the
+        configuration that are modified in place do not change its revision, and are therefore not detected.
         """
+        config_id = action.config_id
+        key = (compile_func.__name__, config_id.map_name, config_id.config_name, config_id.instance_name,
+               action.client_name, container_name)
+        revision = self._get_template_revision(action)
+        templates = self._policy.kwargs_templates
+        cached = templates.get(key)
+        if cached and cached[0] == revision:
+            template = cached[1]
+            if template is not None:
+                return copy_kwargs(template)
+            return compile_func(action, container_name)
+        c_kwargs = compile_func(action, container_name)
+        if self._uses_lazy_values(action):
+            templates[key] = revision, None
+        else:
+            templates[key] = revision, copy_kwargs(c_kwargs)
+        return c_kwargs
+
+    def _compile_container_create_kwargs(self, action, container_name):
         policy = self._policy
         client_config = action.client_config
         container_map = action.container_map
@@ -199,35 +253,52 @@ class DockerConfigMixin(object):
             })
         if client_config.features['stop_signal'] and container_config.stop_signal:
             c_kwargs['stop_signal'] = container_config.stop_signal
-        hc_extra_kwargs = kwargs.pop('host_config', None) if kwargs else None
-        use_host_config = client_config.features['host_config']
-        if use_host_config:
-            hc_kwargs = self.get_container_host_config_kwargs(action, None, kwargs=hc_extra_kwargs)
-            if hc_kwargs:
-                if use_host_config == USE_HC_MERGE:
-                    c_kwargs.update(hc_kwargs)
-                else:
-                    c_kwargs['host_config'] = HostConfig(version=client_config.version, **hc_kwargs)
         if client_config.features['stop_timeout'] and container_config.stop_timeout:
             c_kwargs['stop_timeout'] = container_config.stop_timeout
         if client_config.features['healthcheck'] and container_config.healthcheck:
             c_kwargs['healthcheck'] = container_config.healthcheck._asdict()
-        update_kwargs(c_kwargs, init_options(container_config.create_options), kwargs)
         return c_kwargs
 
-    def get_container_host_config_kwargs(self, action, container_name, kwargs=None):
+    def get_container_create_kwargs(self, action, container_name, kwargs=None):
         """
-        Generates keyword arguments for the Docker client to set up the HostConfig or start a container.
+        Generates keyword arguments for the Docker client to create a container. Values that are derived from the
+        configuration are compiled once and stored in
+        :attr:`~dockermap.map.policy.base.BasePolicy.kwargs_templates`, unless the configuration contains lazy values.
+        The ``create_options`` of the configuration and ``kwargs`` are applied on every call.
 
         :param action: Action configuration.
         :type action: ActionConfig
-        :param container_name: Container name or id. Set ``None`` when included in kwargs for ``create_container``.
-        :type container_name: unicode | str | NoneType
+        :param container_name: Container name.
+        :type container_name: unicode | str
         :param kwargs: Additional keyword arguments to complement or override the configuration-based values.
         :type kwargs: dict | NoneType
         :return: Resulting keyword arguments.
         :rtype: dict
         """
+        policy = self._policy
+        client_config = action.client_config
+        c_kwargs = self._get_kwargs_template(action, container_name, self._compile_container_create_kwargs)
+        hc_extra_kwargs = kwargs.pop('host_config', None) if kwargs else None
+        use_host_config = client_config.features['host_config']
+        if use_host_config:
+            hc_kwargs = self.get_container_host_config_kwargs(action, None, kwargs=hc_extra_kwargs)
+            if hc_kwargs:
+                if use_host_config == USE_HC_MERGE:
+                    c_kwargs.update(hc_kwargs)
+                else:
+                    c_kwargs['host_config'] = HostConfig(version=client_config.version, **hc_kwargs)
+        update_kwargs(c_kwargs, init_options(action.config.create_options), kwargs)
+        managed_label = policy.managed_label
+        fingerprint_label = policy.fingerprint_label
+        if managed_label or fingerprint_label:
+            c_kwargs['labels'] = labels = get_label_dict(c_kwargs.get('labels'))
+            if managed_label:
+                labels[managed_label] = action.config_id.map_name
+            if fingerprint_label:
+                labels[fingerprint_label] = get_config_fingerprint(c_kwargs, fingerprint_label)
+        return c_kwargs
+
+    def _compile_container_host_config_kwargs(self, action, container_name):
         container_map = action.container_map
         container_config = action.config
         client_config = action.client_config
@@ -253,7 +324,25 @@ class DockerConfigMixin(object):
             c_kwargs['network_mode'] = network_mode
         if container_name:
             c_kwargs['container'] = container_name
-        update_kwargs(c_kwargs, init_options(container_config.host_config), kwargs)
+        return c_kwargs
+
+    def get_container_host_config_kwargs(self, action, container_name, kwargs=None):
+        """
+        Generates keyword arguments for the Docker client to set up the HostConfig or start a container. As in
+        :meth:`get_container_create_kwargs`, configuration-based values are compiled once; the ``host_config`` of the
+        configuration and ``kwargs`` are applied on every call.
+
+        :param action: Action configuration.
+        :type action: ActionConfig
+        :param container_name: Container name or id. Set ``None`` when included in kwargs for ``create_container``.
+        :type container_name: unicode | str | NoneType
+        :param kwargs: Additional keyword arguments to complement or override the configuration-based values.
+        :type kwargs: dict | NoneType
+        :return: Resulting keyword arguments.
+        :rtype: dict
+        """
+        c_kwargs = self._get_kwargs_template(action, container_name, self._compile_container_host_config_kwargs)
+        update_kwargs(c_kwargs, init_options(action.config.host_config), kwargs)
         return c_kwargs
 
     def get_attached_container_create_kwargs(self, action, container_name, kwargs=None):
@@ -291,6 +380,9 @@ class DockerConfigMixin(object):
                 else:
                     c_kwargs['host_config'] = HostConfig(version=client_config.version, **hc_kwargs)
         update_kwargs(c_kwargs, kwargs)
+        if policy.managed_label:
+            c_kwargs['labels'] = labels = get_label_dict(c_kwargs.get('labels'))
+            labels[policy.managed_label] = config_id.map_name
         return c_kwargs
 
     def get_attached_container_host_config_kwargs(self, action, container_name, kwargs=None):
@@ -639,7 +731,8 @@ class DockerConfigMixin(object):
 
 
 class DockerClientRunner(DockerBaseRunnerMixin, DockerConfigMixin, AttachedPreparationMixin, ExecMixin, SignalMixin,
-                         ScriptMixin, NetworkUtilMixin, ImageMixin, AbstractRunner):
+                         ScriptMixin, NetworkUtilMixin, ImageMixin, ReadinessGateMixin, ParallelRunnerMixin,
+                         AbstractRunner):
     """
     Runs actions on a Docker client and returns results from the API.
     """
@@ -2,22 +2,134 @@
 from __future__ import unicode_literals
 
 import logging
+from multiprocessing.pool import ThreadPool
+import sys
+import threading
+import time
+import weakref
 
 from ..action import ImageAction
+from ..exceptions import ActionException, ActionRunnerException
 from ..input import ItemType
+from . import ActionConfig, ActionOutput
 from .utils import update_kwargs
 
 log = logging.getLogger(__name__)
 
 
+def _get_registry(repository):
+    registry, __, image = repository.rpartition('/')
+    if registry and '.' in registry:
+        return registry
+    return None
+
+
+class LoginCache(object):
+    """
+    Keeps track of successful registry logins per client object and registry, so that runners using the same client
+    do not log in again. A login expires after ``ttl`` seconds; if set to ``None``, it is kept for the lifetime of the
+    client object. A lock is held per client and registry during the login, so that concurrent pulls only cause a
+    single request to the registry.
+
+    :param ttl: Seconds after which a login is repeated.
+    :type ttl: int | float
+    """
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._logins = weakref.WeakKeyDictionary()
+        self._locks = weakref.WeakKeyDictionary()
+
+    def get_lock(self, client, registry):
+        """
+        Returns the lock for logging in to a registry on a client.
+
+        :param client: Client object.
+        :type client: docker.client.Client
+        :param registry: Registry name.
+        :type registry: unicode | str
+        :return: Lock.
+        :rtype: threading.Lock
+        """
+        with self._lock:
+            client_locks = self._locks.get(client)
+            if client_locks is None:
+                self._locks[client] = client_locks = {}
+            lock = client_locks.get(registry)
+            if lock is None:
+                client_locks[registry] = lock = threading.Lock()
+            return lock
+
+    def is_valid(self, client, registry):
+        """
+        Checks whether the client has logged in to the registry and the login has not expired.
+
+        :param client: Client object.
+        :type client: docker.client.Client
+        :param registry: Registry name.
+        :type registry: unicode | str
+        :rtype: bool
+        """
+        with self._lock:
+            login_time = self._logins.get(client, {}).get(registry)
+        if login_time is None:
+            return False
+        return self.ttl is None or time.time() - login_time < self.ttl
+
+    def set(self, client, registry):
+        """
+        Registers a successful login of the client to the registry.
+
+        :param client: Client object.
+        :type client: docker.client.Client
+        :param registry: Registry name.
+        :type registry: unicode | str
+        """
+        with self._lock:
+            client_logins = self._logins.get(client)
+            if client_logins is None:
+                self._logins[client] = client_logins = {}
+            client_logins[registry] = time.time()
+
+    def invalidate(self, client=None, registry=None):
+        """
+        Removes logins, so that they are repeated on the next pull.
+
+        :param client: Client object. If not set, logins of all clients are removed.
+        :type client: docker.client.Client
+        :param registry: Registry name. If not set, logins to all registries are removed.
+        :type registry: unicode | str
+        """
+        with self._lock:
+            if client is None:
+                client_logins = list(self._logins.values())
+            else:
+                client_logins = [self._logins.get(client, {})]
+            for logins in client_logins:
+                if registry is None:
+                    logins.clear()
+                else:
+                    logins.pop(registry, None)
+
+
+default_login_cache = LoginCache()
+
+
 class ImageMixin(object):
+    """
+    Pulls images of configurations. With ``pull_workers``, :meth:`pull_all` pulls every distinct image tag of a set of
+    actions once per client, using up to this number of threads. ``registry_pull_workers`` optionally limits the number
+    of concurrent pulls from each registry.
+
+    Registry logins are shared between all runners through ``login_cache``.
+    """
     action_method_names = [
         (ItemType.IMAGE, ImageAction.PULL, 'pull'),
     ]
-
-    def __init__(self, *args, **kwargs):
-        super(ImageMixin, self).__init__(*args, **kwargs)
-        self._login_registries = set()
+    policy_options = ['pull_workers', 'registry_pull_workers']
+    pull_workers = None
+    registry_pull_workers = None
+    login_cache = default_login_cache
 
     def login(self, action, registry, **kwargs):
         """
@@ -45,7 +157,7 @@ class ImageMixin(object):
         res = action.client.login(**login_kwargs)
         if res:
             log.debug("User %(username)s logged into %(registry)s.", login_kwargs)
-            self._login_registries.add(registry)
+            self.login_cache.set(action.client, registry)
         return res
 
     def pull(self, action, image_name, **kwargs):
@@ -59,13 +171,101 @@ class ImageMixin(object):
         :param kwargs: Additional keyword arguments to complement or override the configuration-based values.
         :type kwargs: dict
         """
+        res = self._pull_image(action, **kwargs)
+        repository = action.config_id.config_name
+        self._policy.images[action.client_name].refresh_repo(repository)
+        log.debug("Refreshed image cache for repo %s.", repository)
+        return res
+
+    def _pull_image(self, action, **kwargs):
         config_id = action.config_id
-        registry, __, image = config_id.config_name.rpartition('/')
-        if registry and '.' in registry and registry not in self._login_registries:
-            self.login(action, registry, insecure_registry=kwargs.get('insecure_registry'))
+        registry = _get_registry(config_id.config_name)
+        login_cache = self.login_cache
+        if registry and not login_cache.is_valid(action.client, registry):
+            with login_cache.get_lock(action.client, registry):
+                # Another runner may have logged in the meantime.
+                if not login_cache.is_valid(action.client, registry):
+                    self.login(action, registry, insecure_registry=kwargs.get('insecure_registry'))
         log.info("Pulling image %s:%s.", config_id.config_name, config_id.instance_name)
         res = action.client.pull(repository=config_id.config_name, tag=config_id.instance_name, **kwargs)
         log.debug("Done pulling image %s:%s.", config_id.config_name, config_id.instance_name)
-        self._policy.images[action.client_name].refresh_repo(config_id.config_name)
-        log.debug("Refreshed image cache for repo %s.", config_id.config_name)
         return res
+
+    def pull_all(self, action_lists):
+        """
+        Pulls all images of the given actions concurrently, using up to ``pull_workers`` threads. Identical image tags
+        are only pulled once per client. With ``registry_pull_workers``, the number of concurrent pulls from each
+        registry is limited as well. The image cache of each client is refreshed once after all pulls have finished.
+
+        :param action_lists: Lists of pull actions, e.g. from the ``pull_images`` action generator.
+        :type action_lists: collections.Iterable[list[dockermap.map.action.ItemAction]]
+        :return: Client output of pull actions, in the order the images first appear in the action lists.
+        :rtype: list[dockermap.map.runner.ActionOutput]
+        :raise dockermap.map.exceptions.ActionRunnerException: If a pull has failed. Results of completed pulls are
+          available in ``results``.
+        """
+        policy = self._policy
+        pull_actions = []
+        pull_keys = set()
+        for action_list in action_lists:
+            for action in action_list:
+                config_id = action.config_id
+                if config_id.config_type != ItemType.IMAGE or ImageAction.PULL not in action.action_types:
+                    continue
+                key = action.client_name, config_id.config_name, config_id.instance_name
+                if key in pull_keys:
+                    continue
+                pull_keys.add(key)
+                pull_actions.append(action)
+        count = len(pull_actions)
+        if not count:
+            return []
+        if self.registry_pull_workers:
+            registry_semaphores = {_get_registry(action.config_id.config_name):
+                                   threading.BoundedSemaphore(self.registry_pull_workers)
+                                   for action in pull_actions}
+        else:
+            registry_semaphores = {}
+
+        def _pull(index):
+            action = pull_actions[index]
+            config_id = action.config_id
+            client_config = policy.clients[action.client_name]
+            action_config = ActionConfig(action.client_name, config_id, client_config, client_config.get_client(),
+                                         policy.container_maps[config_id.map_name], None)
+            semaphore = registry_semaphores.get(_get_registry(config_id.config_name))
+            try:
+                if semaphore:
+                    with semaphore:
+                        res = self._pull_image(action_config, **action.extra_data)
+                else:
+                    res = self._pull_image(action_config, **action.extra_data)
+            except Exception:
+                exc_info = sys.exc_info()
+                return index, None, ActionException(exc_info, action.client_name, config_id, ImageAction.PULL)
+            return index, res, None
+
+        pool = ThreadPool(min(self.pull_workers or count, count))
+        try:
+            pull_results = pool.map(_pull, range(count))
+        finally:
+            pool.close()
+            pool.join()
+        results = []
+        first_error = None
+        refresh_clients = set()
+        for index, res, error in pull_results:
+            action = pull_actions[index]
+            if error:
+                if first_error is None:
+                    first_error = error
+                continue
+            refresh_clients.add(action.client_name)
+            if res is not None:
+                results.append(ActionOutput(action.client_name, action.config_id, ImageAction.PULL, res))
+        for client_name in refresh_clients:
+            policy.images[client_name].refresh()
+            log.debug("Refreshed image cache of client %s.", client_name)
+        if first_error:
+            raise ActionRunnerException.from_action_exception(first_error, results)
+        return results
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from collections import defaultdict, namedtuple
+import logging
+from multiprocessing.pool import ThreadPool
+import sys
+import threading
+
+import six
+
+from ...exceptions import PartialResultsError
+from ..exceptions import ActionException, ActionRunnerException
+
+log = logging.getLogger(__name__)
+
+
+class DeferredActions(namedtuple('DeferredActions', ('client_name', 'config_id', 'get_actions'))):
+    """
+    Actions for a single item on a client, that are only determined when they are about to be run, since the state of
+    the item can depend on actions of its dependencies. ``get_actions`` is called without arguments and returns a list
+    of actions.
+    """
+    __slots__ = ()
+
+
+def _get_config_ids(action_list):
+    config_ids = []
+    for action in action_list:
+        if action.config_id not in config_ids:
+            config_ids.append(action.config_id)
+    return config_ids
+
+
+def _get_list_items(action_list):
+    if isinstance(action_list, DeferredActions):
+        return {action_list.client_name}, [action_list.config_id]
+    return set(action.client_name for action in action_list), _get_config_ids(action_list)
+
+
+class ParallelRunnerMixin(object):
+    """
+    Runs lists of actions concurrently, where their configurations do not depend on each other. Actions of a
+    configuration that is a dependency or dependent of another one are run in the order they are passed in, as are
+    multiple lists of the same configuration on the same client. Actions of configurations that are not part of the
+    policy's dependency graph are run after all previous actions and before all following actions.
+
+    ``parallel_workers`` sets the number of actions lists that can run at the same time. Optionally the number
+    of concurrent action lists per client can be further limited by ``client_workers``.
+
+    With ``shard_clients``, lists of actions on different clients are not ordered against each other, i.e. dependencies
+    are only considered within each client. Unless set otherwise in ``client_workers``, every client then runs one
+    action list at a time, in the order they are passed in.
+    """
+    policy_options = ['parallel_workers', 'client_workers', 'shard_clients']
+    parallel_workers = None
+    client_workers = None
+    shard_clients = False
+
+    def _get_list_dependencies(self, client_names, config_ids, previous):
+        graph = self._policy.dependency_graph
+        related_bits = 0
+        unknown = False
+        item_bits = 0
+        for config_id in config_ids:
+            item_index = graph.get_index(config_id)
+            if item_index is None:
+                unknown = True
+                break
+            item_bits |= 1 << item_index
+            related_bits |= graph.get_dependency_bits(config_id) | graph.get_dependent_bits(config_id)
+        list_dependencies = set()
+        for p_index, p_client_names, p_bits in previous:
+            if self.shard_clients and not p_client_names & client_names:
+                continue
+            if (unknown or p_bits is None or p_bits & related_bits or
+                    (p_bits & item_bits and p_client_names & client_names)):
+                list_dependencies.add(p_index)
+        previous.append((len(previous), client_names, None if unknown else item_bits))
+        return list_dependencies
+
+    def get_action_list_dependencies(self, action_lists):
+        """
+        Determines which action lists have to be completed before another list can be run.
+
+        :param action_lists: Lists of actions, or :class:`DeferredActions`.
+        :type action_lists: list[list[dockermap.map.action.ItemAction] | DeferredActions]
+        :return: Indexes of action lists that each list depends on.
+        :rtype: list[set[int]]
+        """
+        previous = []
+        return [self._get_list_dependencies(client_names, config_ids, previous)
+                for client_names, config_ids in map(_get_list_items, action_lists)]
+
+    def run_parallel(self, action_lists):
+        """
+        Runs the given lists of actions concurrently, as far as they are independent. Every list of actions is passed
+        to :meth:`~dockermap.map.runner.AbstractRunner.run_actions` in a worker thread. If an action fails, no further
+        action lists are started, but the ones that are already running are completed before raising the exception.
+
+        Items can also be :class:`DeferredActions`, which are only resolved to a list of actions in the worker thread,
+        after all items that they depend on have been completed. If ``action_lists`` is an iterator instead of a list or
+        tuple, the next item is only requested when no action list is running, since generating it may depend on the
+        outcome of previous actions. In order to run lists of a generator concurrently, it should therefore
+        yield :class:`DeferredActions`.
+
+        :param action_lists: Lists of actions, e.g. for each configuration state.
+        :type action_lists: collections.Iterable[list[dockermap.map.action.ItemAction] | DeferredActions]
+        :return: Client output of actions, in the order the action lists have been passed in.
+        :rtype: list[dockermap.map.runner.ActionOutput]
+        :raise dockermap.map.exceptions.ActionRunnerException: If an action has failed. Results of all actions that have
+          been run, including those of the failed action list, are available in ``results``.
+        :raise dockermap.exceptions.PartialResultsError: If an error has occurred that is not related to a particular
+          action.
+        """
+        lazy = not isinstance(action_lists, (list, tuple))
+        iterator = iter(action_lists)
+        client_limit = self.client_workers or (1 if self.shard_clients else None)
+        if self.parallel_workers:
+            workers = self.parallel_workers
+        elif lazy:
+            workers = 1
+        else:
+            count = len(action_lists)
+            if not count:
+                return []
+            if client_limit:
+                client_count = len(set.union(*[_get_list_items(action_list)[0] for action_list in action_lists]))
+                workers = min(client_limit * client_count, count)
+            else:
+                workers = count
+        sources = []
+        dependencies = []
+        list_clients = []
+        previous = []
+        finished = []
+        finished_cond = threading.Condition()
+
+        def _run_list(index):
+            output = []
+            error = None
+            try:
+                source = sources[index]
+                if isinstance(source, DeferredActions):
+                    action_list = source.get_actions()
+                else:
+                    action_list = source
+                for res in self.run_actions(action_list):
+                    output.append(res)
+            except BaseException:
+                error = sys.exc_info()
+            finally:
+                with finished_cond:
+                    finished.append((index, output, error))
+                    finished_cond.notify()
+
+        results = []
+        pending = []
+        completed = set()
+        client_running = defaultdict(int)
+        active = 0
+        exhausted = False
+        first_error = None
+        pool = ThreadPool(workers)
+        try:
+            while True:
+                while first_error is None and not exhausted and not (lazy and (active or pending)):
+                    try:
+                        source = next(iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    client_names, config_ids = _get_list_items(source)
+                    sources.append(source)
+                    list_clients.append(client_names)
+                    dependencies.append(self._get_list_dependencies(client_names, config_ids, previous))
+                    results.append(None)
+                    pending.append(len(sources) - 1)
+                    if lazy:
+                        break
+                if first_error is None:
+                    for index in list(pending):
+                        if not dependencies[index].issubset(completed):
+                            continue
+                        if client_limit and any(client_running[c] >= client_limit for c in list_clients[index]):
+                            continue
+                        pending.remove(index)
+                        for c in list_clients[index]:
+                            client_running[c] += 1
+                        active += 1
+                        log.debug("Starting action list %s.", index + 1)
+                        pool.apply_async(_run_list, (index, ))
+                if not active:
+                    if first_error is None and not exhausted:
+                        continue
+                    break
+                with finished_cond:
+                    while not finished:
+                        finished_cond.wait()
+                    finished_items = finished[:]
+                    del finished[:]
+                for index, output, error in finished_items:
+                    active -= 1
+                    for c in list_clients[index]:
+                        client_running[c] -= 1
+                    results[index] = output
+                    if error:
+                        if first_error is None:
+                            first_error = error
+                    else:
+                        completed.add(index)
+        finally:
+            pool.close()
+            pool.join()
+        partial_results = [output
+                           for list_output in results if list_output
+                           for output in list_output]
+        if first_error:
+            exc = first_error[1]
+            if isinstance(exc, ActionException):
+                raise ActionRunnerException.from_action_exception(exc, partial_results)
+            if not isinstance(exc, Exception):
+                six.reraise(*first_error)
+            raise PartialResultsError(first_error, partial_results)
+        return partial_results
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+from requests import Timeout
+
+from ..input import ItemType
+
+log = logging.getLogger(__name__)
+
+
+class _PendingReady(object):
+    def __init__(self, client_config, c_name, deadline, use_health):
+        self.client_config = client_config
+        self.c_name = c_name
+        self.deadline = deadline
+        self.use_health = use_health
+        self.waiting = False
+        self.ready = threading.Event()
+
+
+class ReadinessGateMixin(object):
+    """
+    Instead of sleeping for the ``start_delay`` right after starting a container, with ``readiness_gating`` the runner
+    only waits for a started container to become ready before running actions on one of its dependents. Where the
+    container configuration includes a ``healthcheck`` and the client supports it, the container is considered ready
+    when it is reported as healthy, or after ``readiness_timeout`` seconds. Otherwise it is considered ready after
+    ``start_delay``. With ``wait_events`` set on the client configuration, the health status is followed from the event
+    stream instead of inspecting the container repeatedly.
+
+    Delays of independent containers therefore do not add up. In combination with
+    :class:`~dockermap.map.runner.parallel.ParallelRunnerMixin`, other actions also continue while a dependent is
+    waiting.
+    """
+    policy_options = ['readiness_gating', 'readiness_timeout']
+    readiness_gating = False
+    readiness_timeout = 60
+    readiness_poll_interval = 0.5
+
+    def __init__(self, *args, **kwargs):
+        self._pending_ready = {}
+        self._pending_lock = threading.Lock()
+        super(ReadinessGateMixin, self).__init__(*args, **kwargs)
+
+    def add_pending_ready(self, action, c_name):
+        """
+        Registers a container that has just been started, so that dependents wait for it to become ready.
+
+        :param action: Action configuration.
+        :type action: dockermap.map.runner.ActionConfig
+        :param c_name: Container name.
+        :type c_name: unicode | str
+        """
+        config = action.config
+        use_health = bool(config.healthcheck and action.client_config.features['healthcheck'])
+        start_delay = config.start_delay
+        if not (use_health or start_delay):
+            return
+        if use_health:
+            deadline = time.time() + (self.readiness_timeout or 0)
+        else:
+            deadline = time.time() + start_delay
+        log.debug("Container %s is not considered ready before %s.", c_name, "healthy" if use_health else deadline)
+        with self._pending_lock:
+            self._pending_ready[(action.client_name, action.config_id)] = _PendingReady(action.client_config, c_name,
+                                                                                        deadline, use_health)
+
+    def _wait_ready(self, client_config, c_name, deadline, use_health):
+        if use_health and client_config.get('wait_events'):
+            try:
+                status = client_config.get_container_waiter().wait_health(c_name,
+                                                                          timeout=max(deadline - time.time(), 0))
+            except Timeout:
+                log.warning("Container %s has not become healthy within %s seconds.", c_name, self.readiness_timeout)
+            else:
+                if status != 'healthy':
+                    log.warning("Container %s is not healthy: %s.", c_name, status)
+            return
+        client = client_config.get_client()
+        while True:
+            remaining = deadline - time.time()
+            if use_health:
+                health = client.inspect_container(c_name)['State'].get('Health')
+                status = health['Status'] if health else None
+                if status != 'starting':
+                    if status != 'healthy':
+                        log.warning("Container %s is not healthy: %s.", c_name, status)
+                    return
+                if remaining <= 0:
+                    log.warning("Container %s has not become healthy within %s seconds.", c_name,
+                                self.readiness_timeout)
+                    return
+                time.sleep(min(self.readiness_poll_interval, remaining))
+            else:
+                if remaining > 0:
+                    log.debug("Waiting %s seconds for container %s to be ready.", remaining, c_name)
+                    time.sleep(remaining)
+                return
+
+    def _wait_pending(self, keys):
+        with self._pending_lock:
+            pending = []
+            for key in keys:
+                p_ready = self._pending_ready.get(key)
+                if p_ready:
+                    # Only the first dependent checks the container; others wait for the result.
+                    pending.append((key, p_ready, not p_ready.waiting))
+                    p_ready.waiting = True
+        for key, p_ready, check in sorted(pending, key=lambda p: p[1].deadline):
+            if not check:
+                p_ready.ready.wait()
+                continue
+            try:
+                self._wait_ready(p_ready.client_config, p_ready.c_name, p_ready.deadline, p_ready.use_health)
+            finally:
+                with self._pending_lock:
+                    if self._pending_ready.get(key) is p_ready:
+                        del self._pending_ready[key]
+                p_ready.ready.set()
+
+    def wait_ready(self, client_name, config_ids):
+        """
+        Waits for the given containers to become ready, if they have been started by this runner and are still
+        pending. A container remains pending until it is ready, so that concurrent dependents all wait for it.
+
+        :param client_name: Client name.
+        :type client_name: unicode | str
+        :param config_ids: Configuration ids of containers.
+        :type config_ids: collections.Iterable[dockermap.map.input.MapConfigId]
+        """
+        self._wait_pending([(client_name, config_id) for config_id in config_ids])
+
+    def wait_all_ready(self):
+        """
+        Waits for all containers that have been started by this runner and are still pending to become ready.
+        """
+        with self._pending_lock:
+            keys = list(self._pending_ready)
+        self._wait_pending(keys)
+
+    def run_actions(self, actions):
+        if self.readiness_gating and self._pending_ready:
+            policy = self._policy
+            for action in actions:
+                if action.config_id.config_type == ItemType.CONTAINER:
+                    self.wait_ready(action.client_name, policy.get_dependencies(action.config_id))
+        return super(ReadinessGateMixin, self).run_actions(actions)
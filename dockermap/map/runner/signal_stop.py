@@ -8,6 +8,7 @@ from requests.exceptions import Timeout
 
 from ..action import ContainerUtilAction
 from ..input import ItemType
+from .utils import wait_container
 
 log = logging.getLogger(__name__)
 
@@ -38,10 +39,10 @@ class SignalMixin(object):
             except Timeout:
                 log.warning("Container %s did not stop in time - sent SIGKILL.", c_name)
                 try:
-                    client.wait(c_name, timeout=stop_kwargs.get('timeout', 10))
+                    wait_container(action, container=c_name, timeout=stop_kwargs.get('timeout', 10))
                 except Timeout:
                     pass
         else:
             log.debug("Sending signal %s to the container %s and waiting for stop.", sig, c_name)
             client.kill(c_name, signal=sig)
-            client.wait(c_name, timeout=stop_kwargs.get('timeout', 10))
+            wait_container(action, container=c_name, timeout=stop_kwargs.get('timeout', 10))
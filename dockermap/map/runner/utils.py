@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import copy
+import hashlib
 import itertools
+import json
 import six
 from six.moves import map, filter
 
-from ...functional import resolve_value
+from ...functional import lazy_type, resolve_value, uses_type_registry
 from ...shortcuts import chown, chmod
 from ...utils import merge_list
 from ..input import HostVolume, UsedVolume
@@ -62,6 +65,92 @@ def update_kwargs(kwargs, *updates):
                 kwargs[key] = u_item
 
 
+def _normalize_kwargs(value):
+    if isinstance(value, dict):
+        return sorted([six.text_type(k), _normalize_kwargs(v)] for k, v in six.iteritems(value) if v is not None)
+    if isinstance(value, (list, tuple)):
+        return [_normalize_kwargs(v) for v in value]
+    if value is None or isinstance(value, (bool, six.integer_types, float)):
+        return value
+    return six.text_type(value)
+
+
+def get_label_dict(labels):
+    """
+    Returns a copy of container labels as a dictionary. Labels given as a list of ``key=value`` strings are split into
+    keys and values; entries without ``=`` get an empty value.
+
+    :param labels: Labels as a dictionary or list, or ``None``.
+    :type labels: dict | list[unicode | str] | tuple[unicode | str] | NoneType
+    :return: Labels as a dictionary.
+    :rtype: dict
+    """
+    if not labels:
+        return {}
+    if isinstance(labels, dict):
+        return dict(labels)
+    label_dict = {}
+    for label in labels:
+        key, __, value = label.partition('=')
+        label_dict[key] = value
+    return label_dict
+
+
+def get_config_fingerprint(kwargs, label=None):
+    """
+    Generates a stable hash of fully resolved keyword arguments, e.g. for creating a container. Dictionaries are
+    compared independently of their order, and ``None`` values are ignored.
+
+    :param kwargs: Keyword arguments, including nested dictionaries such as the host config.
+    :type kwargs: dict
+    :param label: Name of a label to exclude from the ``labels`` item, e.g. the label the fingerprint is stored in.
+    :type label: unicode | str
+    :return: Hexadecimal SHA-256 hash.
+    :rtype: unicode | str
+    """
+    labels = kwargs.get('labels')
+    if label and labels and label in labels:
+        kwargs = kwargs.copy()
+        kwargs['labels'] = {k: v for k, v in six.iteritems(labels) if k != label}
+    data = json.dumps(_normalize_kwargs(kwargs), separators=(',', ':'))
+    return six.text_type(hashlib.sha256(data.encode('utf-8')).hexdigest())
+
+
+def has_lazy_values(value, max_depth=5):
+    """
+    Checks whether a value, or any item in nested lists, tuples, and dictionaries, is resolved late, i.e. is a lazy
+    object or of a type registered for late value resolution.
+
+    :param value: Value to check.
+    :param max_depth: Maximum depth to recurse into nested lists, tuples and dictionaries.
+    :type max_depth: int
+    :rtype: bool
+    """
+    if isinstance(value, lazy_type) or uses_type_registry(value):
+        return True
+    if max_depth > 0:
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return any(has_lazy_values(item, max_depth - 1) for item in value)
+        if isinstance(value, dict):
+            return any(has_lazy_values(key, max_depth - 1) or has_lazy_values(item, max_depth - 1)
+                       for key, item in six.iteritems(value))
+    return False
+
+
+def copy_kwargs(kwargs):
+    """
+    Copies keyword arguments, including lists and dictionaries in the first level, so that they can be modified by
+    :func:`update_kwargs` without affecting the original.
+
+    :param kwargs: Keyword arguments.
+    :type kwargs: dict
+    :return: Copy of the keyword arguments.
+    :rtype: dict
+    """
+    return {key: copy.copy(value) if isinstance(value, (list, dict)) else value
+            for key, value in six.iteritems(kwargs)}
+
+
 def get_volumes(container_map, config, default_volume_paths, include_named):
     """
     Generates volume paths for the ``volumes`` argument during container creation.
@@ -263,6 +352,22 @@ def get_port_bindings(container_config, client_config):
     return port_bindings
 
 
+def wait_container(action, **kwargs):
+    """
+    Waits for a container to stop. If ``wait_events`` is set on the client configuration, the container waiter of the
+    client is used, so that containers are resolved from the event stream instead of a request per container.
+
+    :param action: Action configuration.
+    :type action: dockermap.map.runner.ActionConfig
+    :param kwargs: Keyword arguments for the ``wait`` method, i.e. ``container`` and optionally ``timeout``.
+    :return: Result of the wait.
+    """
+    client_config = action.client_config
+    if client_config.get('wait_events'):
+        return client_config.get_container_waiter().wait(**kwargs)
+    return action.client.wait(**kwargs)
+
+
 def get_preparation_cmd(user, permissions, path):
     """
     Generates the command lines for adjusting a volume's ownership and permission flags. Returns an empty list if there
@@ -3,7 +3,10 @@ from __future__ import unicode_literals
 
 import itertools
 from abc import abstractmethod
+from collections import OrderedDict
 import logging
+from multiprocessing.pool import ThreadPool
+import re
 
 from six import with_metaclass
 
@@ -16,6 +19,8 @@ from .utils import merge_dependency_paths
 
 log = logging.getLogger(__name__)
 
+EXIT_CODE_PATTERN = re.compile(r'\((-?\d+)\)')
+
 
 class _ObjectNotFound(object):
     def __nonzero__(self):
@@ -27,6 +32,44 @@ class _ObjectNotFound(object):
 NOT_FOUND = _ObjectNotFound()
 
 
+def get_summary_detail(container_info):
+    """
+    Converts an entry from the container list into a dictionary of the same structure as returned by
+    ``inspect_container``, as far as information about the container state is included. Since the container list does
+    not include the process id, ``Pid`` is set to ``None``.
+
+    :param container_info: Container list entry.
+    :type container_info: dict
+    :return: Container detail, with ``Id``, ``Image``, and ``State`` set.
+    :rtype: dict
+    """
+    status = container_info.get('Status') or ''
+    c_state = container_info.get('State')
+    if not c_state:
+        # Older API versions only provide the status message.
+        if not status or status == 'Created':
+            c_state = 'created'
+        elif status.startswith('Up'):
+            c_state = 'paused' if '(Paused)' in status else 'running'
+        elif status.startswith('Restarting'):
+            c_state = 'restarting'
+        else:
+            c_state = 'exited'
+    exit_code_match = EXIT_CODE_PATTERN.search(status)
+    return {
+        'Id': container_info['Id'],
+        'Image': container_info.get('ImageID'),
+        'State': {
+            'Running': c_state in ('running', 'paused', 'restarting'),
+            'Restarting': c_state == 'restarting',
+            'Paused': c_state == 'paused',
+            'Pid': None,
+            'ExitCode': int(exit_code_match.group(1)) if exit_code_match else 0,
+            'StartedAt': INITIAL_START_TIME if c_state == 'created' else None,
+        },
+    }
+
+
 class AbstractState(object):
     """
     Abstract base implementation for determining the current state of a single object on the client.
@@ -92,6 +135,8 @@ class ContainerBaseState(AbstractState):
     :param config_flags: Config flags on the container.
     :type config_flags: int
     """
+    requires_full_detail = False
+
     def __init__(self, *args, **kwargs):
         super(ContainerBaseState, self).__init__(*args, **kwargs)
         self.config = config = self.container_map.get_existing(self.config_id.config_name)
@@ -99,6 +144,7 @@ class ContainerBaseState(AbstractState):
             raise KeyError("Container configuration '{0.config_name}' not found on map '{0.map_name}'."
                            "".format(self.config_id))
         self.container_name = None
+        self.container_summaries = None
 
     def set_defaults(self):
         super(ContainerBaseState, self).set_defaults()
@@ -120,7 +166,13 @@ class ContainerBaseState(AbstractState):
 
         self.container_name = container_name
         if container_name in policy.container_names[self.client_name]:
-            self.detail = self.client.inspect_container(container_name)
+            summary = None
+            if self.container_summaries and not self.requires_full_detail:
+                summary = self.container_summaries.get(container_name)
+            if summary:
+                self.detail = get_summary_detail(summary)
+            else:
+                self.detail = self.client.inspect_container(container_name)
         else:
             self.detail = NOT_FOUND
 
@@ -296,10 +348,46 @@ class AbstractStateGenerator(with_metaclass(ABCPolicyUtilMeta, PolicyUtil)):
 
     nonrecoverable_exit_codes = (-127, -1)
     force_update = None
-    policy_options = ['nonrecoverable_exit_codes', 'force_update']
+    inspect_workers = None
+    bulk_inspect = False
+    prefetch_states = True
+    policy_options = ['nonrecoverable_exit_codes', 'force_update', 'inspect_workers', 'bulk_inspect']
 
-    def get_container_state(self, *args, **kwargs):
-        return self.container_state_class(self._policy, self.get_options(), *args, **kwargs)
+    def __init__(self, *args, **kwargs):
+        super(AbstractStateGenerator, self).__init__(*args, **kwargs)
+        self._container_summaries = {}
+
+    def get_container_summaries(self, client_name):
+        """
+        Lists all containers on the client once, and returns the list entries by container name. Further calls return
+        the same snapshot.
+
+        :param client_name: Client name.
+        :type client_name: unicode | str
+        :return: Dictionary of container names and their list entries.
+        :rtype: dict[unicode | str, dict]
+        """
+        summaries = self._container_summaries.get(client_name)
+        if summaries is None:
+            client = self._policy.clients[client_name].get_client()
+            filters = self._policy.get_cache_filters(ItemType.CONTAINER)
+            if filters:
+                container_list = client.containers(all=True, filters=filters)
+            else:
+                container_list = client.containers(all=True)
+            self._container_summaries[client_name] = summaries = {
+                name[1:]: container_info
+                for container_info in container_list
+                for name in container_info.get('Names') or ()
+                if '/' not in name[1:]
+            }
+        return summaries
+
+    def get_container_state(self, client_name, *args, **kwargs):
+        c_state = self.container_state_class(self._policy, self.get_options(), client_name, *args, **kwargs)
+        if self.bulk_inspect:
+            c_state.container_summaries = self.get_container_summaries(client_name)
+        return c_state
 
     def get_network_state(self, *args, **kwargs):
         return self.network_state_class(self._policy, self.get_options(), *args, **kwargs)
@@ -310,6 +398,45 @@ class AbstractStateGenerator(with_metaclass(ABCPolicyUtilMeta, PolicyUtil)):
     def get_image_state(self, *args, **kwargs):
         return self.image_state_class(self._policy, self.get_options(), *args, **kwargs)
 
+    def get_config_clients(self, config_id):
+        """
+        Returns the names of the clients that a configuration is applied to.
+
+        :param config_id: Configuration id tuple.
+        :type config_id: dockermap.map.input.MapConfigId
+        :return: List of client names.
+        :rtype: list[unicode | str]
+        """
+        c_map = self._policy.container_maps[config_id.map_name]
+        return c_map.clients or [self._policy.default_client_name]
+
+    def get_config_state(self, client_name, config_id, config_flags=ConfigFlags.NONE):
+        """
+        Creates the state object for a single item on a client, without inspecting it yet.
+
+        :param client_name: Client name.
+        :type client_name: unicode | str
+        :param config_id: Configuration id tuple.
+        :type config_id: dockermap.map.input.MapConfigId
+        :param config_flags: Optional configuration flags.
+        :type config_flags: dockermap.map.policy.ConfigFlags
+        :return: State object.
+        :rtype: AbstractState
+        """
+        config_type = config_id.config_type
+        if config_type == ItemType.CONTAINER:
+            return self.get_container_state(client_name, config_id, config_flags)
+        elif config_type == ItemType.VOLUME:
+            client_config = self._policy.clients[client_name]
+            if client_config.features['volumes']:
+                return self.get_volume_state(client_name, config_id, config_flags)
+            return self.get_container_state(client_name, config_id, config_flags)
+        elif config_type == ItemType.NETWORK:
+            return self.get_network_state(client_name, config_id, config_flags)
+        elif config_type == ItemType.IMAGE:
+            return self.get_image_state(client_name, config_id, config_flags)
+        raise ValueError("Invalid configuration type.", config_type)
+
     def generate_config_states(self, config_id, config_flags=ConfigFlags.NONE):
         """
         Generates the actions on a single item, which can be either a dependency or a explicitly selected
@@ -322,28 +449,93 @@ class AbstractStateGenerator(with_metaclass(ABCPolicyUtilMeta, PolicyUtil)):
         :return: Generator for container state information.
         :rtype: collections.Iterable[dockermap.map.state.ContainerConfigStates]
         """
-        c_map = self._policy.container_maps[config_id.map_name]
-        clients = c_map.clients or [self._policy.default_client_name]
-        config_type = config_id.config_type
+        for client_name in self.get_config_clients(config_id):
+            yield self.get_item_state(client_name, config_id, config_flags)
 
-        for client_name in clients:
-            if config_type == ItemType.CONTAINER:
-                c_state = self.get_container_state(client_name, config_id, config_flags)
-            elif config_type == ItemType.VOLUME:
-                client_config = self._policy.clients[client_name]
-                if client_config.features['volumes']:
-                    c_state = self.get_volume_state(client_name, config_id, config_flags)
-                else:
-                    c_state = self.get_container_state(client_name, config_id, config_flags)
-            elif config_type == ItemType.NETWORK:
-                c_state = self.get_network_state(client_name, config_id, config_flags)
-            elif config_type == ItemType.IMAGE:
-                c_state = self.get_image_state(client_name, config_id, config_flags)
-            else:
-                raise ValueError("Invalid configuration type.", config_type)
-            c_state.inspect()
-            # Extract base state, state flags, and extra info.
-            state_info = ConfigState(client_name, config_id, config_flags, *c_state.get_state())
+    def get_item_state(self, client_name, config_id, config_flags=ConfigFlags.NONE):
+        """
+        Inspects a single item on a client and determines its state.
+
+        :param client_name: Client name.
+        :type client_name: unicode | str
+        :param config_id: Configuration id tuple.
+        :type config_id: dockermap.map.input.MapConfigId
+        :param config_flags: Optional configuration flags.
+        :type config_flags: dockermap.map.policy.ConfigFlags
+        :return: Container state information.
+        :rtype: dockermap.map.state.ConfigState
+        """
+        c_state = self.get_config_state(client_name, config_id, config_flags)
+        c_state.inspect()
+        # Extract base state, state flags, and extra info.
+        state_info = ConfigState(client_name, config_id, config_flags, *c_state.get_state())
+        log.debug("Configuration state information: %s", state_info)
+        return state_info
+
+    def get_state_items(self, config_ids):
+        """
+        Returns the items that states are generated for, in the order of :meth:`get_states`, without inspecting them.
+        This implementation returns the given configurations.
+
+        :param config_ids: MapConfigId tuples.
+        :type config_ids: list[dockermap.map.input.MapConfigId]
+        :return: Configuration ids and configuration flags.
+        :rtype: list[(dockermap.map.input.MapConfigId, int)]
+        """
+        return [(config_id, ConfigFlags.NONE) for config_id in config_ids]
+
+    def _prepare_caches(self, client_name, c_states):
+        policy = self._policy
+        config_types = set(c_state.config_id.config_type for c_state in c_states)
+        # Cache access is not synchronized, so all listings are fetched before inspecting concurrently.
+        if ItemType.CONTAINER in config_types or ItemType.VOLUME in config_types:
+            policy.container_names[client_name]
+        if ItemType.VOLUME in config_types and policy.clients[client_name].features['volumes']:
+            policy.volume_names[client_name]
+        if ItemType.NETWORK in config_types:
+            policy.network_names[client_name]
+        if ItemType.IMAGE in config_types:
+            policy.images[client_name]
+
+    def generate_prefetched_states(self, config_items):
+        """
+        Like :meth:`generate_config_states`, but for multiple items at once. All items are inspected before
+        generating the first state, using a thread pool of up to ``inspect_workers`` threads for each client. States
+        are returned in the same order as from :meth:`generate_config_states`.
+
+        Note that the details reflect the situation before any action has been performed on the items. Actions
+        on one item should therefore not affect the state of a subsequent item. State generators where this does not
+        apply set :attr:`prefetch_states` to ``False``, so that ``inspect_workers`` does not have an effect on them.
+
+        :param config_items: Iterable of configuration ids and configuration flags.
+        :type config_items: collections.Iterable[(dockermap.map.input.MapConfigId, int)]
+        :return: Generator for container state information.
+        :rtype: collections.Iterable[dockermap.map.state.ContainerConfigStates]
+        """
+        c_states = [
+            self.get_config_state(client_name, config_id, config_flags)
+            for config_id, config_flags in config_items
+            for client_name in self.get_config_clients(config_id)
+        ]
+        client_states = OrderedDict()
+        for c_state in c_states:
+            client_states.setdefault(c_state.client_name, []).append(c_state)
+        pools = []
+        try:
+            results = []
+            for client_name, cl_states in client_states.items():
+                self._prepare_caches(client_name, cl_states)
+                pool = ThreadPool(min(self.inspect_workers, len(cl_states)))
+                pools.append(pool)
+                results.extend(pool.apply_async(c_state.inspect) for c_state in cl_states)
+            for result in results:
+                result.get()
+        finally:
+            for pool in pools:
+                pool.terminate()
+        for c_state in c_states:
+            state_info = ConfigState(c_state.client_name, c_state.config_id, c_state.config_flags,
+                                     *c_state.get_state())
             log.debug("Configuration state information: %s", state_info)
             yield state_info
 
@@ -384,6 +576,8 @@ class SingleStateGenerator(AbstractStateGenerator):
         :return: Iterable of configuration states.
         :rtype: collections.Iterable[dockermap.map.state.ConfigState]
         """
+        if self.inspect_workers and self.prefetch_states:
+            return self.generate_prefetched_states(self.get_state_items(config_ids))
         return itertools.chain.from_iterable(self.generate_config_states(config_id)
                                              for config_id in config_ids)
 
@@ -413,6 +607,34 @@ class AbstractDependencyStateGenerator(with_metaclass(ABCPolicyUtilMeta, Abstrac
         for state in self.generate_config_states(config_id):
             yield state
 
+    def _get_dependency_paths(self, config_ids):
+        input_paths = [
+            (config_id, list(self.get_dependency_path(config_id)))
+            for config_id in config_ids
+        ]
+        log.debug("Dependency paths from input: %s", input_paths)
+        dependency_paths = merge_dependency_paths(input_paths)
+        log.debug("Merged dependency paths: %s", dependency_paths)
+        return dependency_paths
+
+    def get_state_items(self, config_ids):
+        """
+        Returns the selected items along with their dependencies / dependents, in the order of :meth:`get_states`,
+        without inspecting them.
+
+        :param config_ids: MapConfigId tuples.
+        :type config_ids: list[dockermap.map.input.MapConfigId]
+        :return: Configuration ids and configuration flags.
+        :rtype: list[(dockermap.map.input.MapConfigId, int)]
+        """
+        return [
+            (d_config_id, d_config_flags)
+            for config_id, dependency_path in self._get_dependency_paths(config_ids)
+            for d_config_id, d_config_flags in itertools.chain(
+                ((d, ConfigFlags.DEPENDENT) for d in dependency_path),
+                [(config_id, ConfigFlags.NONE)])
+        ]
+
     def get_states(self, config_ids):
         """
         Generates state information for the selected container and its dependencies / dependents.
@@ -422,15 +644,10 @@ class AbstractDependencyStateGenerator(with_metaclass(ABCPolicyUtilMeta, Abstrac
         :return: Iterable of configuration states.
         :rtype: collections.Iterable[dockermap.map.state.ConfigState]
         """
-        input_paths = [
-            (config_id, list(self.get_dependency_path(config_id)))
-            for config_id in config_ids
-        ]
-        log.debug("Dependency paths from input: %s", input_paths)
-        dependency_paths = merge_dependency_paths(input_paths)
-        log.debug("Merged dependency paths: %s", dependency_paths)
+        if self.inspect_workers and self.prefetch_states:
+            return self.generate_prefetched_states(self.get_state_items(config_ids))
         return itertools.chain.from_iterable(self._get_all_states(config_id, dependency_path)
-                                             for config_id, dependency_path in dependency_paths)
+                                             for config_id, dependency_path in self._get_dependency_paths(config_ids))
 
 
 class DependencyStateGenerator(AbstractDependencyStateGenerator):
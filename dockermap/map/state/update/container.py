@@ -12,6 +12,8 @@ from ....functional import resolve_value
 from ....utils import format_image_tag
 from ...input import ItemType, CmdCheck, ExecPolicy
 from ...policy.utils import get_instance_volumes, extract_user, init_options
+from ...runner import ActionConfig
+from ...runner.base import DockerConfigMixin
 from .. import StateFlags, State
 from ..base import ContainerBaseState
 
@@ -174,11 +176,78 @@ def _check_restart_policy(container_config, instance_detail):
     return {}
 
 
+class ProcessIndex(object):
+    """
+    Index of the processes running in a container by user and command line, for looking up exec commands.
+
+    :param processes: Process list as returned by ``top`` with the columns pid, user, and args.
+    :type processes: list[list[unicode | str]]
+    """
+    def __init__(self, processes):
+        self._commands = commands = defaultdict(set)
+        for __, user, cmd in processes:
+            commands[user].add(cmd)
+        self._user_text = {}
+
+    def __bool__(self):
+        return bool(self._commands)
+
+    __nonzero__ = __bool__
+
+    def has_command(self, user, cmd):
+        """
+        Checks whether the exact command line is running as the given user.
+
+        :param user: User name.
+        :type user: unicode | str
+        :param cmd: Command line.
+        :type cmd: unicode | str
+        :rtype: bool
+        """
+        return cmd in self._commands.get(user, ())
+
+    def has_partial_command(self, user, cmd):
+        """
+        Checks whether the command is part of a command line running as the given user.
+
+        :param user: User name.
+        :type user: unicode | str
+        :param cmd: Part of a command line.
+        :type cmd: unicode | str
+        :rtype: bool
+        """
+        user_commands = self._commands.get(user)
+        if not user_commands:
+            return False
+        text = self._user_text.get(user)
+        if text is None:
+            # Command lines cannot contain null characters, so that a match cannot span multiple processes.
+            self._user_text[user] = text = '\0'.join(user_commands)
+        return cmd in text
+
+
+class ContainerKwargsGenerator(DockerConfigMixin):
+    """
+    Generates keyword arguments for containers the same way as the runner, e.g. for comparing fingerprints.
+
+    :param policy: Policy object.
+    :type policy: dockermap.map.policy.base.BasePolicy
+    """
+    def __init__(self, policy):
+        self._policy = policy
+
+
 class UpdateContainerState(ContainerBaseState):
     """
     Extends the base state by checking the current instance detail against the container configuration and volumes
     other containers. Also checks if the container image matches the configured image's id.
+
+    If the policy has a ``fingerprint_label``, and the container has been created with a fingerprint of its current
+    configuration, checks of the configuration (e.g. environment, command, ports, links, and host config) are skipped.
+    The image, volumes, networks, and exec commands are still checked, since these also depend on other items.
     """
+    requires_full_detail = True
+
     def __init__(self, *args, **kwargs):
         super(UpdateContainerState, self).__init__(*args, **kwargs)
         self.volume_checker = None
@@ -201,22 +270,6 @@ class UpdateContainerState(ContainerBaseState):
         return True
 
     def _check_commands(self, check_option):
-        def _find_full_command(f_cmd, f_user):
-            for __, c_user, c_cmd in self.current_commands:
-                if c_user == f_user and c_cmd == f_cmd:
-                    log.debug("Command for user %s found: %s.", c_user, c_cmd)
-                    return True
-            log.debug("Command for user %s not found: %s.", f_user, f_cmd)
-            return False
-
-        def _find_partial_command(f_cmd, f_user):
-            for __, c_user, c_cmd in self.current_commands:
-                if c_user == f_user and f_cmd in c_cmd:
-                    log.debug("Command for user %s found: %s.", c_user, c_cmd)
-                    return True
-            log.debug("Command for user %s not found: %s.", f_user, f_cmd)
-            return False
-
         def _cmd_running(cmd, cmd_user):
             res_cmd = resolve_value(cmd)
             if isinstance(res_cmd, (list, tuple)):
@@ -227,8 +280,10 @@ class UpdateContainerState(ContainerBaseState):
                 res_user = extract_user(self.config.user)
             if res_user is None:
                 res_user = 'root'
-            log.debug("Looking up %s command for user %s: %s", check_option, res_user, res_cmd)
-            return cmd_exists(res_cmd, res_user)
+            found = cmd_exists(res_user, res_cmd)
+            log.debug("Looking up %s command for user %s: %s - %s.", check_option, res_user, res_cmd,
+                      "found" if found else "not found")
+            return found
 
         if not self.config.exec_commands:
             return None
@@ -237,9 +292,9 @@ class UpdateContainerState(ContainerBaseState):
             return self.config.exec_commands
         log.debug("Checking commands for container %s.", self.container_name)
         if check_option == CmdCheck.FULL:
-            cmd_exists = _find_full_command
+            cmd_exists = self.current_commands.has_command
         elif check_option == CmdCheck.PARTIAL:
-            cmd_exists = _find_partial_command
+            cmd_exists = self.current_commands.has_partial_command
         else:
             log.debug("Invalid check mode %s - skipping.", check_option)
             return None
@@ -261,6 +316,23 @@ class UpdateContainerState(ContainerBaseState):
             ref_mode = net_mode
         return ref_mode == instance_mode
 
+    def _check_fingerprint(self):
+        label = self.policy.fingerprint_label
+        if not label:
+            return False
+        instance_labels = self.detail['Config'].get('Labels') or {}
+        instance_fingerprint = instance_labels.get(label)
+        if not instance_fingerprint:
+            return False
+        action = ActionConfig(self.client_name, self.config_id, self.client_config, self.client, self.container_map,
+                              self.config)
+        c_kwargs = ContainerKwargsGenerator(self.policy).get_container_create_kwargs(action, self.container_name)
+        if c_kwargs['labels'][label] != instance_fingerprint:
+            log.debug("Fingerprint of container %s does not match the configuration.", self.container_name)
+            return False
+        log.debug("Fingerprint of container %s matches the configuration.", self.container_name)
+        return True
+
     def set_defaults(self):
         super(UpdateContainerState, self).set_defaults()
         self.current_commands = None
@@ -270,7 +342,8 @@ class UpdateContainerState(ContainerBaseState):
         if self.detail and self.detail['State']['Running'] and self.config_id.config_type == ItemType.CONTAINER:
             check_exec_option = self.options['check_exec_commands']
             if check_exec_option and check_exec_option != CmdCheck.NONE and self.config.exec_commands:
-                self.current_commands = self.client.top(self.detail['Id'], ps_args='-eo pid,user,args')['Processes']
+                processes = self.client.top(self.detail['Id'], ps_args='-eo pid,user,args')['Processes']
+                self.current_commands = ProcessIndex(processes or ())
 
     def get_state(self):
         base_state, state_flags, extra = super(UpdateContainerState, self).get_state()
@@ -296,8 +369,11 @@ class UpdateContainerState(ContainerBaseState):
                 state_flags |= StateFlags.VOLUME_MISMATCH
             if not self._check_links():
                 state_flags |= StateFlags.MISSING_LINK
-            if not (_check_environment(self.config, self.detail) and _check_cmd(self.config, self.detail) and
-                    _check_container_network_ports(self.config, self.client_config, self.detail)):
+            config_unchanged = self._check_fingerprint()
+            if not (config_unchanged or (_check_environment(self.config, self.detail) and
+                                         _check_cmd(self.config, self.detail) and
+                                         _check_container_network_ports(self.config, self.client_config,
+                                                                        self.detail))):
                 state_flags |= StateFlags.MISC_MISMATCH
             if base_state == State.RUNNING:
                 check_exec_option = self.options['check_exec_commands']
@@ -311,8 +387,10 @@ class UpdateContainerState(ContainerBaseState):
                                                                                        self.detail)
                 state_flags |= net_s_flags
                 extra.update(net_extra)
-            elif not self._check_container_network_mode():
+            elif not (config_unchanged or self._check_container_network_mode()):
                 state_flags |= StateFlags.MISC_MISMATCH
+            if config_unchanged:
+                return base_state, state_flags, extra
             hc_update, hc_needs_reset = _check_limits(self.config, self.detail)
             restart_policy_update = _check_restart_policy(self.config, self.detail)
             hc_update.update(restart_policy_update)
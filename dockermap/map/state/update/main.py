@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import threading
+
 import six
 
-from ...input import CmdCheck
+from ...input import CmdCheck, ItemType
 from ..base import DependencyStateGenerator
 from .container import UpdateContainerState
-from .network import UpdateNetworkState, NetworkEndpointRegistry
+from .network import UpdateNetworkState, NetworkEndpointRegistry, get_network_details
 from .volume import ContainerLegacyVolumeChecker, ContainerVolumeChecker, VolumeUpdateState
 
 
@@ -32,6 +34,8 @@ class UpdateStateGenerator(DependencyStateGenerator):
     container_state_class = UpdateContainerState
     network_state_class = UpdateNetworkState
     volume_state_class = VolumeUpdateState
+    # Containers are compared with their dependencies, e.g. links, which may have been re-created in the meantime.
+    prefetch_states = False
 
     update_persistent = False
     check_exec_commands = CmdCheck.FULL
@@ -46,29 +50,46 @@ class UpdateStateGenerator(DependencyStateGenerator):
             else ContainerLegacyVolumeChecker(policy)
             for client_name, client_config in six.iteritems(policy.clients)
         }
-        default_network_details = {
-            client_name: {
-                n_name: client_config.get_client().inspect_network(n_name)
-                for n_name in policy.default_network_names
-                if n_name in policy.network_names[client_name]
-            }
-            for client_name, client_config in six.iteritems(policy.clients)
-            if client_config.features['networks']
-        }
-        self._network_registries = {
-            client_name: NetworkEndpointRegistry(policy.nname, policy.cname, policy.get_hostname,
-                                                 policy.container_names[client_name],
-                                                 default_network_details[client_name])
-            for client_name, network_details in six.iteritems(default_network_details)
-        }
+        self._network_registries = {}
+        self._network_registry_lock = threading.Lock()
+
+    def _get_network_registry(self, client_name):
+        registry = self._network_registries.get(client_name)
+        if registry is None:
+            client_config = self._policy.clients[client_name]
+            if not client_config.features['networks']:
+                return None
+            with self._network_registry_lock:
+                registry = self._network_registries.get(client_name)
+                if registry is None:
+                    registry = self._create_network_registry(client_name, client_config)
+                    self._network_registries[client_name] = registry
+        return registry
+
+    def _create_network_registry(self, client_name, client_config):
+        policy = self._policy
+        existing_networks = policy.network_names[client_name]
+        default_networks = [n_name for n_name in policy.default_network_names
+                            if n_name in existing_networks]
+        network_names = list(default_networks)
+        for map_name, c_map in six.iteritems(policy.container_maps):
+            for n_name in c_map.networks.keys():
+                network_name = policy.nname(map_name, n_name)
+                if network_name in existing_networks:
+                    network_names.append(network_name)
+        network_details = get_network_details(client_config.get_client(), network_names,
+                                              filters=policy.get_cache_filters(ItemType.NETWORK),
+                                              workers=self.inspect_workers)
+        return NetworkEndpointRegistry(policy.nname, policy.cname, policy.get_hostname,
+                                       policy.container_names[client_name], default_networks, network_details)
 
     def get_container_state(self, client_name, *args, **kwargs):
         c_state = super(UpdateStateGenerator, self).get_container_state(client_name, *args, **kwargs)
         c_state.volume_checker = self._volume_checkers[client_name]
-        c_state.endpoint_registry = self._network_registries.get(client_name)
+        c_state.endpoint_registry = self._get_network_registry(client_name)
         return c_state
 
     def get_network_state(self, client_name, *args, **kwargs):
         n_state = super(UpdateStateGenerator, self).get_network_state(client_name, *args, **kwargs)
-        n_state.endpoint_registry = self._network_registries.get(client_name)
+        n_state.endpoint_registry = self._get_network_registry(client_name)
         return n_state
@@ -3,6 +3,8 @@ from __future__ import unicode_literals
 
 import logging
 from collections import defaultdict
+from distutils.version import StrictVersion
+from multiprocessing.pool import ThreadPool
 
 import six
 from ipaddress import IPv4Address, IPv6Address, ip_address
@@ -16,6 +18,9 @@ from ..base import NetworkBaseState
 
 log = logging.getLogger(__name__)
 
+# Starting with this API version, the network listing does not include connected containers.
+NETWORK_LIST_CONTAINERS_MAX_VERSION = StrictVersion('1.28')
+
 
 def _check_network_driver_opts(network_config, instance_detail):
     driver_opts = init_options(network_config.driver_options)
@@ -68,22 +73,86 @@ def _check_network_endpoint(network_name, network_config, linked_names, network_
     return True
 
 
+def get_network_details(client, network_names, filters=None, workers=None):
+    """
+    Fetches the details of networks on a client, including their connected containers. Up to API version 1.27, all of
+    this is part of a single network listing. Later versions only list the networks themselves, so that each of the
+    given networks is inspected instead, using up to ``workers`` threads.
+
+    :param client: Client object.
+    :type client: docker.client.Client
+    :param network_names: Names of networks to inspect, if the listing does not include connected containers.
+    :type network_names: collections.Iterable[unicode | str]
+    :param filters: Optional filters to apply to the network listing.
+    :type filters: dict
+    :param workers: Number of threads for inspecting networks.
+    :type workers: int
+    :return: Network details.
+    :rtype: list[dict]
+    """
+    api_version = getattr(client, 'api_version', None)
+    if api_version and StrictVersion(str(api_version)) < NETWORK_LIST_CONTAINERS_MAX_VERSION:
+        if filters:
+            return client.networks(filters=filters)
+        return client.networks()
+    network_names = list(network_names)
+    if workers and len(network_names) > 1:
+        pool = ThreadPool(min(workers, len(network_names)))
+        try:
+            return pool.map(client.inspect_network, network_names)
+        finally:
+            pool.close()
+            pool.join()
+    return [client.inspect_network(n_name) for n_name in network_names]
+
+
 class NetworkEndpointRegistry(object):
-    def __init__(self, nname_func, cname_func, hostname_func, containers, default_networks):
+    """
+    Index of network endpoints on a client, for checking the network connections of containers without further
+    requests. Endpoints are indexed by container id.
+
+    :param nname_func: Function for generating network names.
+    :param cname_func: Function for generating container names.
+    :param hostname_func: Function for generating host names.
+    :param containers: Container names and ids on the client.
+    :type containers: dict[unicode | str, unicode | str]
+    :param default_networks: Names of default networks that exist on the client.
+    :type default_networks: collections.Iterable[unicode | str]
+    :param network_details: Details of networks to register, e.g. from :func:`get_network_details`.
+    :type network_details: collections.Iterable[dict]
+    """
+    def __init__(self, nname_func, cname_func, hostname_func, containers, default_networks, network_details=()):
         self._nname = nname_func
         self._cname = cname_func
         self._hostname = hostname_func
         self._containers = containers
-        self._default_networks = list(default_networks.keys())
+        self._default_networks = list(default_networks)
         self._endpoints = defaultdict(dict)
-        for network_detail in six.itervalues(default_networks):
+        for network_detail in network_details:
             self.register_network(network_detail)
 
     def register_network(self, detail):
+        """
+        Adds the endpoints of all containers connected to a network.
+
+        :param detail: Network detail, as returned by the listing (before API version 1.28) or inspection.
+        :type detail: dict
+        """
         network_id = detail['Id']
         for c_id, c_detail in six.iteritems(detail.get('Containers') or {}):
             self._endpoints[c_id][network_id] = c_detail['EndpointID']
 
+    def get_container_endpoints(self, container):
+        """
+        Returns the registered endpoints of a container.
+
+        :param container: Container id.
+        :type container: unicode | str
+        :return: Network ids and endpoint ids.
+        :rtype: dict[unicode | str, unicode | str]
+        """
+        return self._endpoints.get(container) or {}
+
     def check_container_config(self, config_id, c_config, detail):
         if not detail['Config'].get('NetworkDisabled', False):
             i_networks = detail['NetworkSettings'].get('Networks', {})
@@ -124,7 +193,7 @@ class NetworkEndpointRegistry(object):
         configured_network_names = {ce[0] for ce in named_endpoints}
         reset_networks = []
         if detail['State']['Running']:
-            network_endpoints = self._endpoints.get(detail['Id'], {})
+            network_endpoints = self.get_container_endpoints(detail['Id'])
             disconnected_networks = []
             for ref_n_name, cn_config in named_endpoints:
                 log.debug("Checking network %s.", ref_n_name)
@@ -8,16 +8,27 @@ def merge_dependency_paths(item_paths):
     and merged in the incoming order. Later paths that are independent, but share some dependencies, are shortened
     by these dependencies. Paths that are contained in another entirely are discarded.
 
+    Previously merged paths are looked up through an index of their items, so that each path is only compared to
+    merged paths it shares items with.
+
     :param item_paths: List or tuple of items along with their dependency path.
     :type item_paths: collections.Iterable[(Any, list[Any])]
     :return: List of merged or independent paths.
     :rtype: list[(Any, list[Any])]
     """
     merged_paths = []
+    path_index = {}
     for item, path in item_paths:
-        sub_path_idx = []
         path_set = set(path)
-        for index, (merged_item, merged_path, merged_set) in enumerate(merged_paths):
+        candidates = set(path_index.get(item, ()))
+        for p in path_set:
+            candidates.update(path_index.get(p, ()))
+        sub_path_idx = []
+        for index in sorted(candidates):
+            merged = merged_paths[index]
+            if merged is None:
+                continue
+            merged_item, merged_path, merged_set = merged
             if item in merged_set:
                 path = None
                 break
@@ -28,8 +39,12 @@ def merge_dependency_paths(item_paths):
                 path_set = set(path)
                 if not path:
                     break
-        for spi in reversed(sub_path_idx):
-            merged_paths.pop(spi)
+        for spi in sub_path_idx:
+            merged_paths[spi] = None
         if path is not None:
+            index = len(merged_paths)
             merged_paths.append((item, path, path_set))
-    return [(i[0], i[1]) for i in merged_paths]
+            path_index.setdefault(item, []).append(index)
+            for p in path_set:
+                path_index.setdefault(p, []).append(index)
+    return [(i[0], i[1]) for i in merged_paths if i is not None]
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import unittest
+
+try:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    asyncio = None
+
+from dockermap.map.config.client import ClientConfiguration
+from dockermap.map.config.main import ContainerMap
+
+from tests import MAP_DATA_2, CLIENT_DATA_1
+
+if asyncio:
+    from dockermap.map.aio import AsyncMappingDockerClient
+    from dockermap.map.client import MappingDockerClient
+
+
+class FakeMappingClient(object):
+    def __init__(self, barrier=None):
+        self.calls = []
+        self.barrier = barrier
+
+    def _record(self, method_name, *args, **kwargs):
+        self.calls.append((method_name, args, kwargs, threading.current_thread().name))
+        if self.barrier:
+            self.barrier.wait(5)
+
+    def get_states(self, action_name, config_name, **kwargs):
+        self._record('get_states', action_name, config_name, **kwargs)
+        for i in range(3):
+            yield '{0} state {1}'.format(config_name, i)
+
+    def run_actions(self, action_name, config_name, **kwargs):
+        self._record('run_actions', action_name, config_name, **kwargs)
+        if config_name == 'invalid':
+            raise ValueError("Invalid configuration.")
+        return ['{0} {1}'.format(action_name, config_name)]
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available.")
+class AsyncMappingClientTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.sample_map = ContainerMap('main', MAP_DATA_2, use_attached_parent_name=True)
+        self.sample_client_config = ClientConfiguration(**CLIENT_DATA_1)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _get_client(self, fake_client, **kwargs):
+        client = MappingDockerClient(self.sample_map, self.sample_client_config)
+        client.get_states = fake_client.get_states
+        client.run_actions = fake_client.run_actions
+        return AsyncMappingDockerClient(client, loop=self.loop, **kwargs)
+
+    def test_new_client(self):
+        async_client = AsyncMappingDockerClient(self.sample_map, self.sample_client_config, loop=self.loop)
+        self.assertIsInstance(async_client.client, MappingDockerClient)
+        self.assertEqual(async_client.client.get_policy().container_maps['main'].name, 'main')
+
+    def test_run_in_executor(self):
+        fake_client = FakeMappingClient()
+        async_client = self._get_client(fake_client)
+        result = self.loop.run_until_complete(async_client.run_actions('startup', 'server', map_name='main'))
+        self.assertListEqual(result, ['startup server'])
+        self.assertEqual(len(fake_client.calls), 1)
+        method_name, args, kwargs, thread_name = fake_client.calls[0]
+        self.assertEqual(method_name, 'run_actions')
+        self.assertTupleEqual(args, ('startup', 'server'))
+        self.assertDictEqual(kwargs, {'map_name': 'main'})
+        self.assertNotEqual(thread_name, threading.current_thread().name)
+
+    def test_get_states(self):
+        fake_client = FakeMappingClient()
+        async_client = self._get_client(fake_client)
+        states = self.loop.run_until_complete(async_client.get_states('update', 'server'))
+        self.assertListEqual(states, ['server state 0', 'server state 1', 'server state 2'])
+        self.assertNotEqual(fake_client.calls[0][3], threading.current_thread().name)
+
+    def test_error(self):
+        async_client = self._get_client(FakeMappingClient())
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(async_client.run_actions('startup', 'invalid'))
+
+    def test_shared_executor(self):
+        executor = ThreadPoolExecutor(2)
+        barrier = threading.Barrier(2)
+        fake_clients = [FakeMappingClient(barrier), FakeMappingClient(barrier)]
+        async_clients = [self._get_client(fake_client, executor=executor) for fake_client in fake_clients]
+        try:
+            results = self.loop.run_until_complete(asyncio.gather(*[
+                async_client.run_actions('startup', 'server{0}'.format(i))
+                for i, async_client in enumerate(async_clients)
+            ]))
+        finally:
+            executor.shutdown()
+        self.assertListEqual(results, [['startup server0'], ['startup server1']])
+        self.assertNotEqual(fake_clients[0].calls[0][3], fake_clients[1].calls[0][3])
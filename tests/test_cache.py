@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from six.moves import queue
+
+from dockermap.client.events import EventMonitor
+from dockermap.map.config.client import ClientConfiguration
+from dockermap.map.config.main import ContainerMap
+from dockermap.map.input import ItemType
+from dockermap.map.policy.base import BasePolicy
+from dockermap.map.policy.cache import (CachedImages, CachedVolumeNames, CacheRegistry, ContainerCache, ImageCache,
+                                        NetworkCache)
+from dockermap.map.policy.snapshot import CacheSnapshotStore
+
+
+def _event(item_type, action, item_id, time_nano, **attributes):
+    return {
+        'Type': item_type,
+        'Action': action,
+        'Actor': {'ID': item_id, 'Attributes': attributes},
+        'time': time_nano // 1000000000,
+        'timeNano': time_nano,
+    }
+
+
+class FakeClient(object):
+    def __init__(self, containers=(), images=(), networks=(), volumes=()):
+        self.container_list = list(containers)
+        self.image_list = list(images)
+        self.network_list = list(networks)
+        self.volume_list = list(volumes)
+        self.event_queue = queue.Queue()
+        self.list_calls = 0
+        self.list_filters = None
+
+    def _event_stream(self):
+        while True:
+            event = self.event_queue.get()
+            if event is None:
+                self.event_queue.task_done()
+                return
+            yield event
+            self.event_queue.task_done()
+
+    def events(self, decode=False, since=None):
+        return self._event_stream()
+
+    def containers(self, all=False, filters=None):
+        self.list_calls += 1
+        self.list_filters = filters
+        return self.container_list
+
+    def images(self, name=None):
+        self.list_calls += 1
+        return self.image_list
+
+    def inspect_image(self, image):
+        for image_info in self.image_list:
+            if image == image_info['Id'] or image in image_info['RepoTags']:
+                return image_info
+
+    def networks(self):
+        self.list_calls += 1
+        return self.network_list
+
+    def volumes(self):
+        self.list_calls += 1
+        return {'Volumes': self.volume_list}
+
+
+class TestEventCache(unittest.TestCase):
+    def test_container_events(self):
+        client = FakeClient(containers=[{'Id': 'c1', 'Names': ['/main.app']}])
+        client_config = ClientConfiguration(version='1.22', client=client, cache_events=True)
+        cache = ContainerCache({'__default__': client_config})
+        self.assertDictEqual(cache['__default__'], {'main.app': 'c1'})
+        monitor = client_config.event_monitor
+        self.assertTrue(monitor.running)
+        for event in (
+            _event('container', 'create', 'c2', 1000000000001, name='main.web'),
+            _event('container', 'start', 'c2', 1000000000002, name='main.web'),
+            _event('container', 'rename', 'c1', 1000000000003, name='main.app2', oldName='/main.app'),
+            _event('container', 'destroy', 'c2', 1000000000004, name='main.web'),
+        ):
+            client.event_queue.put(event)
+        client.event_queue.join()
+        monitor.stop()
+        client.event_queue.put(None)
+        self.assertDictEqual(cache['__default__'], {'main.app2': 'c1'})
+        self.assertEqual(client.list_calls, 1)
+        self.assertEqual(monitor.cursor, '1000.000000004')
+
+    def test_network_events(self):
+        client = FakeClient(networks=[{'Id': 'n1', 'Name': 'bridge'}])
+        client_config = ClientConfiguration(version='1.22', client=client, cache_events=True)
+        cache = NetworkCache({'__default__': client_config})
+        self.assertDictEqual(cache['__default__'], {'bridge': 'n1'})
+        client.event_queue.put(_event('network', 'create', 'n2', 1000000000001, name='main.app_net'))
+        client.event_queue.put(_event('network', 'connect', 'n2', 1000000000002, name='main.app_net'))
+        client.event_queue.put(_event('network', 'destroy', 'n1', 1000000000003, name='bridge'))
+        client.event_queue.join()
+        client_config.event_monitor.stop()
+        client.event_queue.put(None)
+        self.assertDictEqual(cache['__default__'], {'main.app_net': 'n2'})
+
+    def test_image_events(self):
+        client = FakeClient(images=[{'Id': 'i1', 'RepoTags': ['app:1.0', 'app:latest']}])
+        images = CachedImages(client)
+        monitor = EventMonitor(client)
+        monitor.add_listener(images.update_from_event)
+        client.image_list = [
+            {'Id': 'i1', 'RepoTags': ['app:1.0']},
+            {'Id': 'i2', 'RepoTags': ['app:latest', 'app:2.0']},
+        ]
+        monitor.process_events([
+            _event('image', 'pull', 'app:latest', 1000000000001),
+            _event('image', 'tag', 'i2', 1000000000002, name='app:2.0'),
+        ])
+        self.assertDictEqual(images, {'app:1.0': 'i1', 'app:latest': 'i2', 'app:2.0': 'i2'})
+        client.image_list = [{'Id': 'i2', 'RepoTags': ['app:latest', 'app:2.0']}]
+        monitor.process_events([
+            _event('image', 'untag', 'i1', 1000000000003, name='i1'),
+            _event('image', 'delete', 'i1', 1000000000004, name='i1'),
+        ])
+        self.assertDictEqual(images, {'app:latest': 'i2', 'app:2.0': 'i2'})
+
+    def test_volume_events(self):
+        client = FakeClient(volumes=[{'Name': 'main.app.data'}])
+        volumes = CachedVolumeNames(client)
+        monitor = EventMonitor(client)
+        monitor.add_listener(volumes.update_from_event)
+        monitor.process_events([
+            _event('volume', 'create', 'main.web.data', 1000000000001, driver='local'),
+            _event('volume', 'destroy', 'main.app.data', 1000000000002, driver='local'),
+        ])
+        self.assertSetEqual(volumes, {'main.web.data'})
+
+
+class TestCachedImages(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeClient(images=[
+            {'Id': 'i1', 'RepoTags': ['app:1.0', 'registry:5000/app:1.0']},
+            {'Id': 'i2', 'RepoTags': ['app:latest', 'app:2.0']},
+            {'Id': 'i3', 'RepoTags': ['web:latest']},
+        ])
+        self.images = CachedImages(self.client)
+
+    def test_refresh(self):
+        self.assertEqual(self.client.list_calls, 1)
+        self.assertEqual(len(self.images), 5)
+        self.assertSetEqual(self.images.get_tags('i1'), {'app:1.0', 'registry:5000/app:1.0'})
+        self.assertSetEqual(self.images.get_repository_tags('app'), {'app:1.0', 'app:latest', 'app:2.0'})
+        self.assertSetEqual(self.images.get_repository_tags('registry:5000/app'), {'registry:5000/app:1.0'})
+
+    def test_refresh_repo(self):
+        self.client.image_list = [
+            {'Id': 'i4', 'RepoTags': ['app:latest', 'app:3.0']},
+            {'Id': 'i2', 'RepoTags': ['app:2.0']},
+        ]
+        self.images.refresh_repo('app')
+        self.assertDictEqual(self.images, {
+            'app:latest': 'i4',
+            'app:3.0': 'i4',
+            'app:2.0': 'i2',
+            'registry:5000/app:1.0': 'i1',
+            'web:latest': 'i3',
+        })
+        self.assertSetEqual(self.images.get_tags('i1'), {'registry:5000/app:1.0'})
+        self.assertSetEqual(self.images.get_tags('i2'), {'app:2.0'})
+        self.assertSetEqual(self.images.get_repository_tags('app'), {'app:latest', 'app:3.0', 'app:2.0'})
+
+    def test_remove_tags(self):
+        del self.images['app:1.0']
+        self.images.pop('registry:5000/app:1.0')
+        self.assertSetEqual(self.images.get_tags('i1'), set())
+        self.images.update({'web:latest': 'i2'})
+        self.assertSetEqual(self.images.get_tags('i2'), {'app:latest', 'app:2.0', 'web:latest'})
+        self.assertSetEqual(self.images.get_tags('i3'), set())
+
+
+class TestCacheInvalidation(unittest.TestCase):
+    def setUp(self):
+        self.client1 = FakeClient(containers=[{'Id': 'c1', 'Names': ['/main.app']}])
+        self.client2 = FakeClient(containers=[{'Id': 'c2', 'Names': ['/main.web']}])
+        self.clients = {
+            'client1': ClientConfiguration(version='1.22', client=self.client1),
+            'client2': ClientConfiguration(version='1.22', client=self.client2),
+        }
+
+    def test_invalidate_client(self):
+        cache = ContainerCache(self.clients)
+        self.assertDictEqual(cache['client1'], {'main.app': 'c1'})
+        self.assertDictEqual(cache['client2'], {'main.web': 'c2'})
+        self.client1.container_list = [{'Id': 'c3', 'Names': ['/main.app']}]
+        self.client2.container_list = []
+        cache.invalidate('client1')
+        self.assertEqual(cache.get_generation('client1'), 1)
+        self.assertEqual(cache.get_generation('client2'), 0)
+        self.assertDictEqual(cache['client1'], {'main.app': 'c3'})
+        self.assertDictEqual(cache['client2'], {'main.web': 'c2'})
+        self.assertEqual(self.client1.list_calls, 2)
+        self.assertEqual(self.client2.list_calls, 1)
+        cache.invalidate()
+        self.assertDictEqual(cache['client2'], {})
+
+    def test_ttl_per_item_type(self):
+        self.clients['client1'].cache_ttl = {'container': 0.01}
+        containers = ContainerCache(self.clients)
+        images = ImageCache(self.clients)
+        containers['client1']
+        images['client1']
+        time.sleep(0.02)
+        containers['client1']
+        images['client1']
+        self.assertEqual(self.client1.list_calls, 3)
+        self.assertFalse(images.is_stale('client1'))
+
+
+class TestCacheRegistry(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeClient(containers=[{'Id': 'c1', 'Names': ['/main.app']}])
+        self.registry = CacheRegistry()
+
+    def _get_cache(self, filters=None):
+        client_config = ClientConfiguration(base_url='apps1_host', version='1.22', client=self.client)
+        return ContainerCache({'__default__': client_config}, filters=filters, registry=self.registry)
+
+    def test_shared_items(self):
+        cache1 = self._get_cache()
+        cache2 = self._get_cache()
+        self.assertIs(cache1['__default__'], cache2['__default__'])
+        cache1['__default__']['main.web'] = 'c2'
+        self.assertDictEqual(cache2['__default__'], {'main.app': 'c1', 'main.web': 'c2'})
+        self.assertEqual(self.client.list_calls, 1)
+        self.client.container_list = []
+        cache2.invalidate('__default__')
+        self.assertDictEqual(cache1['__default__'], {})
+        self.assertIs(cache1['__default__'], cache2['__default__'])
+        self.assertEqual(self.client.list_calls, 2)
+        filtered_cache = self._get_cache(filters={'name': ['^/main\\.']})
+        self.assertIsNot(filtered_cache['__default__'], cache1['__default__'])
+        self.assertEqual(self.client.list_calls, 3)
+
+    def test_concurrent_access(self):
+        list_containers = self.client.containers
+
+        def _slow_list(**kwargs):
+            time.sleep(0.05)
+            return list_containers(**kwargs)
+
+        self.client.containers = _slow_list
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self._get_cache()['__default__']))
+                   for __ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.client.list_calls, 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r is results[0] for r in results))
+
+
+class FilteredPolicy(BasePolicy):
+    filter_caches = True
+
+
+class TestCacheFilters(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeClient(containers=[{'Id': 'c1', 'Names': ['/main.app']}])
+        self.client_config = ClientConfiguration(version='1.22', client=self.client)
+        self.maps = {
+            'main': ContainerMap('main', {'app': {}}),
+            'other.map': ContainerMap('other.map', {'web': {}}),
+        }
+
+    def test_name_filters(self):
+        policy = FilteredPolicy(self.maps, {'__default__': self.client_config})
+        self.assertDictEqual(policy.get_cache_filters(ItemType.CONTAINER),
+                             {'name': ['^/main\\.', '^/other\\.map\\.']})
+        self.assertDictEqual(policy.get_cache_filters(ItemType.NETWORK),
+                             {'name': ['^main\\.', '^other\\.map\\.', '^host$', '^bridge$', '^none$']})
+        self.assertDictEqual(policy.get_cache_filters(ItemType.VOLUME),
+                             {'name': ['^main\\.', '^other\\.map\\.']})
+        self.assertIsNone(policy.get_cache_filters(ItemType.IMAGE))
+        self.assertDictEqual(policy.container_names['__default__'], {'main.app': 'c1'})
+        self.assertDictEqual(self.client.list_filters, policy.get_cache_filters(ItemType.CONTAINER))
+        self.assertIsNone(BasePolicy(self.maps, {}).get_cache_filters(ItemType.CONTAINER))
+
+    def test_label_filters(self):
+        policy = FilteredPolicy(self.maps, {'__default__': self.client_config})
+        policy.managed_label = 'dockermap.map'
+        filters = policy.get_cache_filters(ItemType.CONTAINER)
+        self.assertDictEqual(filters, {'label': 'dockermap.map'})
+        self.assertEqual(policy.get_cache_filters(ItemType.NETWORK)['name'][0], '^main\\.')
+
+    def test_filtered_events(self):
+        policy = FilteredPolicy(self.maps, {'__default__': self.client_config})
+        container_names = policy.container_names['__default__']
+        container_names.update_from_event(_event('container', 'create', 'c2', 1000000000001, name='ci.job'))
+        container_names.update_from_event(_event('container', 'create', 'c3', 1000000000002, name='main.web'))
+        self.assertDictEqual(container_names, {'main.app': 'c1', 'main.web': 'c3'})
+
+
+class TestCacheSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = CacheSnapshotStore(os.path.join(self.temp_dir, 'snapshot.json'))
+        self.maps = {'main': ContainerMap('main', {'app': {}})}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _get_policy(self, client):
+        client_config = ClientConfiguration(base_url='apps1_host', version='1.22', client=client, cache_events=True)
+        return BasePolicy(self.maps, {'__default__': client_config})
+
+    def test_save_and_load(self):
+        client1 = FakeClient(containers=[{'Id': 'c1', 'Names': ['/main.app']}],
+                             volumes=[{'Name': 'main.app.data'}])
+        policy1 = self._get_policy(client1)
+        self.assertDictEqual(policy1.container_names['__default__'], {'main.app': 'c1'})
+        self.assertSetEqual(policy1.volume_names['__default__'], {'main.app.data'})
+        client1.event_queue.put(_event('container', 'create', 'c2', 1000000000001, name='main.web'))
+        client1.event_queue.join()
+        self.store.save(policy1)
+        policy1.clients['__default__'].event_monitor.stop()
+        client1.event_queue.put(None)
+
+        client2 = FakeClient()
+        policy2 = self._get_policy(client2)
+        self.assertListEqual(self.store.load(policy2), ['__default__'])
+        monitor = policy2.clients['__default__'].event_monitor
+        self.assertTrue(monitor.running)
+        self.assertEqual(monitor.cursor, '1000.000000001')
+        client2.event_queue.put(_event('container', 'destroy', 'c1', 1000000000002, name='main.app'))
+        client2.event_queue.join()
+        self.assertDictEqual(policy2.container_names['__default__'], {'main.web': 'c2'})
+        self.assertSetEqual(policy2.volume_names['__default__'], {'main.app.data'})
+        self.assertEqual(client2.list_calls, 0)
+        monitor.stop()
+        client2.event_queue.put(None)
+
+    def test_skip_changed_client(self):
+        client1 = FakeClient(containers=[{'Id': 'c1', 'Names': ['/main.app']}])
+        client1.info = lambda: {'SystemTime': '2017-08-08T22:28:29.06202363+02:00'}
+        policy1 = self._get_policy(client1)
+        policy1.container_names['__default__']
+        self.store.save(policy1)
+        policy1.clients['__default__'].event_monitor.stop()
+        client1.event_queue.put(None)
+        with open(self.store._path) as f:
+            self.assertEqual(json.load(f)['__default__']['cursor'], '1502224108.062023630')
+
+        client2 = FakeClient()
+        policy2 = self._get_policy(client2)
+        policy2.clients['__default__'].base_url = 'apps2_host'
+        self.assertListEqual(self.store.load(policy2), [])
+        self.assertIsNone(policy2.clients['__default__'].event_monitor)
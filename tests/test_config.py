@@ -151,9 +151,37 @@ class TestConfig(unittest.TestCase):
             },
         })
 
+    def test_cached_extended_config(self):
+        cfg_base = self.sample_map.get_existing('worker_q2')
+        cfg1 = self.sample_map.get_extended(cfg_base)
+        cached_configs = dict(self.sample_map._extended_configs)
+        cfg1_copy = self.sample_map.get_extended(cfg_base)
+        self.assertIsNot(cfg1_copy, cfg1)
+        self.assertEqual(cfg1_copy, cfg1)
+        self.assertDictEqual(self.sample_map._extended_configs, cached_configs)
+        cfg1_copy.user = 'modified_user'
+        cfg1_copy.create_options['mem_limit'] = '2g'
+        self.assertEqual(self.sample_map.get_extended(cfg_base), cfg1)
+        self.sample_map.get_existing('abstract_config').user = 'other_user'
+        cfg2 = self.sample_map.get_extended(cfg_base)
+        self.assertIsNot(cfg2, cfg1)
+        self.assertEqual(cfg2.user, 'other_user')
+        self.assertEqual(self.sample_map.get_extended_map().get_existing('worker_q2').user, 'other_user')
+
+    def test_cached_extended_config_removed(self):
+        cfg_base = self.sample_map.get_existing('worker_q2')
+        self.sample_map.get_extended(cfg_base)
+        self.assertIn(id(cfg_base), self.sample_map._extended_configs)
+        del self.sample_map.containers['worker_q2']
+        self.sample_map.get_extended_map()
+        self.assertNotIn(id(cfg_base), self.sample_map._extended_configs)
+
     def test_partial_extended_map(self):
         self.assertEqual(self.ext_simple.host.root, MAP_DATA_3.get('host_root'))
 
+    def test_image_names(self):
+        self.assertSetEqual(self.simple_map.get_image_names(), {'registry.example.com/server:latest'})
+
     def test_get_persistent(self):
         attached_items, persistent_items = self.ext_main.get_persistent_items()
         six.assertCountEqual(self, attached_items, [('worker', SharedVolume('app_log')),
@@ -6,7 +6,7 @@ import six
 
 from dockermap.api import ContainerMap
 from dockermap.map.input import ItemType
-from dockermap.dep import ImageDependentsResolver
+from dockermap.dep import CircularDependency, DependencyGraph, ImageDependentsResolver
 from dockermap.map.policy.dep import ContainerDependencyResolver, ContainerDependentsResolver
 
 
@@ -104,5 +104,58 @@ class ImageDependenceTest(unittest.TestCase):
         self.assertListEqual(['f'], self.res.get_dependencies('x'))
 
 
+class DependencyGraphTest(unittest.TestCase):
+    def setUp(self):
+        test_map = ContainerMap('test_map', initial=TEST_MAP_DATA, check_integrity=False)
+        self.dependency_items = list(test_map.dependency_items())
+        self.graph = DependencyGraph(self.dependency_items)
+
+    def test_same_as_resolvers(self):
+        f_res = ContainerDependencyResolver(self.dependency_items)
+        r_res = ContainerDependentsResolver(self.dependency_items)
+        for item in self.graph.items:
+            self.assertListEqual(f_res.get_dependencies(item), self.graph.get_dependencies(item))
+            self.assertListEqual(r_res.get_dependencies(item), self.graph.get_dependents(item))
+
+    def test_levels_and_closures(self):
+        graph = self.graph
+        order = graph.topological_order
+        self.assertEqual(len(order), len(graph))
+        for item in order:
+            item_index = order.index(item)
+            for dependency in graph.get(item):
+                self.assertLess(order.index(dependency), item_index)
+                self.assertLess(graph.get_level(dependency), graph.get_level(item))
+        levels = graph.levels
+        self.assertTrue(all(levels))
+        self.assertEqual(sum(len(l) for l in levels), len(graph))
+        a_id = (ItemType.CONTAINER, 'test_map', 'a', None)
+        e_id = (ItemType.CONTAINER, 'test_map', 'e', '1')
+        l_id = (ItemType.CONTAINER, 'test_map', 'l', None)
+        self.assertTrue(graph.depends_on(a_id, e_id))
+        self.assertFalse(graph.depends_on(e_id, a_id))
+        self.assertFalse(graph.depends_on(a_id, l_id))
+        six.assertCountEqual(self, graph.get_items(graph.get_dependency_bits(a_id)), graph.get_dependencies(a_id))
+        six.assertCountEqual(self, graph.get_items(graph.get_dependent_bits(e_id)), graph.get_dependents(e_id))
+
+    def test_circular_dependency(self):
+        graph = DependencyGraph([
+            ('a', ['b']),
+            ('b', ['c']),
+            ('c', ['a']),
+            ('d', ['a']),
+            ('e', ['e']),
+            ('f', ['g']),
+        ])
+        self.assertListEqual(graph.topological_order, ['g', 'f'])
+        self.assertIsNone(graph.get_level('d'))
+        self.assertRaises(CircularDependency, graph.get_dependencies, 'd')
+        with self.assertRaises(CircularDependency) as cm:
+            graph.get_dependencies('e')
+        self.assertTrue(cm.exception.is_direct)
+        self.assertListEqual(graph.get_dependencies('f'), ['g'])
+        self.assertListEqual(graph.get_dependents('g'), ['f'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import unittest
+
+from docker.errors import APIError
+
+from dockermap.client.docker_util import DockerUtilityMixin, ImageGarbageCollector
+from dockermap.exceptions import PartialResultsError
+
+
+class FakeDockerClient(DockerUtilityMixin):
+    stop_poll_interval = 0.01
+
+    def __init__(self, running=(), exited=(), stop_signals=None, ignored_signals=None, kill_errors=(), images=(),
+                 container_images=None, list_image_ids=True, image_errors=()):
+        self.lock = threading.Lock()
+        self.running = set(running)
+        self.exited = list(exited)
+        self.all_containers = list(running) + self.exited
+        self.stop_signals = stop_signals or {}
+        self.ignored_signals = ignored_signals or {}
+        self.kill_errors = set(kill_errors)
+        self.kills = []
+        self.removed = []
+        self.image_list = list(images)
+        self.container_images = container_images or {}
+        self.list_image_ids = list_image_ids
+        self.image_errors = set(image_errors)
+        self.removed_images = []
+        self.inspected = []
+
+    def containers(self, all=False):
+        container_list = [{'Id': c_id, 'Status': 'Up 5 minutes' if c_id in self.running else 'Exited (0) 1 minute ago'}
+                          for c_id in self.all_containers
+                          if all or c_id in self.running]
+        if self.list_image_ids:
+            for container in container_list:
+                container['ImageID'] = self.container_images.get(container['Id'])
+        return container_list
+
+    def inspect_container(self, container):
+        self.inspected.append(container)
+        return {
+            'Id': container,
+            'Image': self.container_images.get(container),
+            'State': {'Running': container in self.running},
+            'Config': {'StopSignal': self.stop_signals.get(container)},
+        }
+
+    def images(self, all=False):
+        return list(self.image_list)
+
+    def remove_image(self, image, force=False):
+        with self.lock:
+            if image in self.image_errors:
+                raise APIError("Cannot remove image {0}.".format(image))
+            if any(i['ParentId'] == image for i in self.image_list):
+                raise APIError("Image {0} has dependent child images.".format(image))
+            self.image_list = [i for i in self.image_list if i['Id'] != image]
+            self.removed_images.append((image, force))
+
+    def kill(self, container, signal=None):
+        with self.lock:
+            self.kills.append((container, signal))
+            if signal is None and container in self.kill_errors:
+                raise APIError("Cannot kill container {0}.".format(container))
+            if signal is None or signal not in self.ignored_signals.get(container, ()):
+                self.running.discard(container)
+
+    def remove_container(self, container):
+        with self.lock:
+            self.removed.append(container)
+
+
+def _image(image_id, parent_id, created, size=100, tags=None):
+    return {'Id': image_id, 'ParentId': parent_id, 'Created': created, 'Size': size,
+            'RepoTags': tags or ['<none>:<none>']}
+
+
+CLEANUP_IMAGES = [
+    _image('app2', 'base', 1200, tags=['app:latest']),
+    _image('app1', 'app_layer', 1100, tags=['app:1']),
+    _image('child', 'layer', 1050),
+    _image('layer', 'base', 1000),
+    _image('app_layer', 'base', 1000),
+    _image('used', 'layer', 950),
+    _image('base', '', 900, tags=['base:latest']),
+    _image('dangling', '', 800),
+]
+
+TEST_GC_IMAGES = [
+    _image('app3', 'base', 1300, tags=['app:3']),
+    _image('app2', 'base', 1200, tags=['app:2', 'app:latest']),
+    _image('app1', 'app1_layer', 1100, tags=['app:1']),
+    _image('app1_layer', 'base', 1050),
+    _image('tool1', '', 1000, tags=['tool:1']),
+    _image('base', '', 900, tags=['base:latest']),
+    _image('dangling', '', 800),
+]
+
+
+class RemoveAllContainersTest(unittest.TestCase):
+    def test_stop_signal(self):
+        client = FakeDockerClient(running=['a', 'b'], exited=['c'], stop_signals={'a': 'SIGQUIT'})
+        stopped, removed = client.remove_all_containers(stop_timeout=1, workers=2)
+        self.assertListEqual(['a', 'b'], stopped)
+        self.assertListEqual(['a', 'b', 'c'], removed)
+        self.assertListEqual([('a', 'SIGQUIT'), ('b', 'SIGTERM')], sorted(client.kills))
+
+    def test_kill_after_timeout(self):
+        client = FakeDockerClient(running=['a', 'b'], ignored_signals={'b': ['SIGTERM']})
+        stopped, removed = client.remove_all_containers(stop_timeout=0.05, workers=2)
+        self.assertListEqual(['a', 'b'], stopped)
+        self.assertListEqual(['a', 'b'], removed)
+        self.assertSetEqual({('a', 'SIGTERM'), ('b', 'SIGTERM')}, set(client.kills[:2]))
+        self.assertEqual(('b', None), client.kills[2])
+        self.assertSetEqual(set(), client.running)
+
+    def test_kill_error(self):
+        client = FakeDockerClient(running=['a', 'b'], ignored_signals={'b': ['SIGTERM']}, kill_errors=['b'])
+        with self.assertRaises(PartialResultsError) as context:
+            client.remove_all_containers(stop_timeout=0.05, workers=2)
+        self.assertIsInstance(context.exception.source_exception[1], APIError)
+        self.assertEqual((['a'], []), context.exception.results)
+        self.assertListEqual([], client.removed)
+
+
+class CleanupImagesTest(unittest.TestCase):
+    def _get_client(self, **kwargs):
+        return FakeDockerClient(exited=['c1', 'c2'], container_images={'c1': 'used', 'c2': 'app2'},
+                                images=CLEANUP_IMAGES, **kwargs)
+
+    def test_list_only(self):
+        client = self._get_client()
+        self.assertListEqual(['child', 'dangling'], client.cleanup_images(list_only=True))
+        self.assertListEqual([], client.removed_images)
+        self.assertListEqual([], client.inspected)
+
+    def test_container_image_fallback(self):
+        client = self._get_client(list_image_ids=False)
+        self.assertListEqual(['child', 'dangling'], client.cleanup_images(list_only=True))
+        self.assertListEqual(['c1', 'c2'], client.inspected)
+
+    def test_remove_old(self):
+        client = self._get_client()
+        self.assertListEqual(['app1', 'child', 'app_layer', 'dangling'],
+                             client.cleanup_images(remove_old=True, list_only=True))
+        self.assertListEqual(['child', 'dangling'],
+                             client.cleanup_images(remove_old=True, keep_tags=['1'], list_only=True))
+
+    def test_remove_children_first(self):
+        client = self._get_client()
+        removed = client.cleanup_images(remove_old=True, force=True)
+        self.assertListEqual(['app1', 'child', 'dangling', 'app_layer'], removed)
+        self.assertListEqual([(image_id, True) for image_id in removed], client.removed_images)
+
+    def test_remove_workers(self):
+        client = self._get_client()
+        removed = client.cleanup_images(remove_old=True, workers=3)
+        self.assertListEqual(['app1', 'child', 'dangling', 'app_layer'], removed)
+        self.assertSetEqual({'app1', 'child', 'dangling'}, {image_id for image_id, __ in client.removed_images[:3]})
+        self.assertEqual('app_layer', client.removed_images[3][0])
+
+    def test_remove_error(self):
+        client = self._get_client(image_errors=['app1'])
+        self.assertListEqual(['child', 'dangling'], client.cleanup_images(remove_old=True))
+        with self.assertRaises(PartialResultsError) as context:
+            self._get_client(image_errors=['child']).cleanup_images(remove_old=True, raise_on_error=True)
+        self.assertListEqual(['app1'], context.exception.results)
+
+
+class ImageGarbageCollectorTest(unittest.TestCase):
+    def test_keep_tagged(self):
+        collector = ImageGarbageCollector(TEST_GC_IMAGES)
+        self.assertListEqual(collector.get_removal_plan(), [['dangling']])
+
+    def test_keep_latest(self):
+        collector = ImageGarbageCollector(TEST_GC_IMAGES)
+        self.assertListEqual(collector.get_removal_plan(keep_latest=2), [['app1', 'dangling'], ['app1_layer']])
+        self.assertListEqual(collector.get_removal_plan(keep_latest=0),
+                             [['app3', 'app2', 'app1', 'tool1', 'dangling'], ['app1_layer'], ['base']])
+
+    def test_used_and_protected(self):
+        collector = ImageGarbageCollector(TEST_GC_IMAGES, used_images=['app1'], protected=['tool:1', 'app3'])
+        self.assertListEqual(collector.get_removal_plan(keep_latest=0), [['app2', 'dangling']])
+
+    def test_age_and_size_budget(self):
+        collector = ImageGarbageCollector(TEST_GC_IMAGES)
+        self.assertListEqual(collector.get_removal_plan(keep_latest=0, max_age=250, now=1400),
+                             [['app1', 'tool1', 'dangling'], ['app1_layer']])
+        self.assertListEqual(collector.get_removal_plan(keep_latest=0, size_budget=250),
+                             [['app1', 'tool1', 'dangling'], ['app1_layer']])
+
+
+class CollectImagesTest(unittest.TestCase):
+    def _get_client(self, **kwargs):
+        return FakeDockerClient(exited=['c1'], container_images={'c1': 'app1'}, images=TEST_GC_IMAGES, **kwargs)
+
+    def test_list_only(self):
+        client = self._get_client()
+        self.assertListEqual([['app3', 'app2', 'tool1', 'dangling']],
+                             client.collect_images(keep_latest=0, protected=['base'], list_only=True))
+        self.assertListEqual([], client.removed_images)
+
+    def test_collect(self):
+        client = self._get_client()
+        removed = client.collect_images(keep_latest=1, force=True)
+        self.assertListEqual(['app2', 'dangling'], removed)
+        self.assertListEqual([('app2', True), ('dangling', True)], client.removed_images)
+
+
+class RemoveImageLevelsTest(unittest.TestCase):
+    levels = [['app1', 'app3', 'dangling'], ['app1_layer'], ['base']]
+
+    def test_sequential(self):
+        client = FakeDockerClient(images=TEST_GC_IMAGES)
+        removed = client.remove_image_levels(self.levels[:2])
+        self.assertListEqual(['app1', 'app3', 'dangling', 'app1_layer'], removed)
+        self.assertListEqual(removed, [image_id for image_id, __ in client.removed_images])
+
+    def test_sequential_error(self):
+        client = FakeDockerClient(images=TEST_GC_IMAGES, image_errors=['app3'])
+        self.assertListEqual(['app1', 'dangling', 'app1_layer'], client.remove_image_levels(self.levels))
+        client = FakeDockerClient(images=TEST_GC_IMAGES, image_errors=['app3'])
+        with self.assertRaises(PartialResultsError) as context:
+            client.remove_image_levels(self.levels, raise_on_error=True)
+        self.assertListEqual(['app1'], context.exception.results)
+
+    def test_workers(self):
+        client = FakeDockerClient(images=TEST_GC_IMAGES)
+        removed = client.remove_image_levels(self.levels[:2], workers=3)
+        self.assertListEqual(['app1', 'app3', 'dangling', 'app1_layer'], removed)
+        self.assertSetEqual({'app1', 'app3', 'dangling'}, {image_id for image_id, __ in client.removed_images[:3]})
+        self.assertEqual('app1_layer', client.removed_images[3][0])
+
+    def test_workers_error(self):
+        client = FakeDockerClient(images=TEST_GC_IMAGES, image_errors=['app3'])
+        self.assertListEqual(['app1', 'dangling', 'app1_layer'], client.remove_image_levels(self.levels, workers=3))
+        client = FakeDockerClient(images=TEST_GC_IMAGES, image_errors=['app3'])
+        with self.assertRaises(PartialResultsError) as context:
+            client.remove_image_levels(self.levels, raise_on_error=True, workers=1)
+        self.assertListEqual(['app1'], context.exception.results)
+        self.assertNotIn('app1_layer', [image_id for image_id, __ in client.removed_images])
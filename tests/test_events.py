@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+import unittest
+
+from requests import Timeout
+from six.moves import queue
+
+from dockermap.client import events
+from dockermap.client.events import ContainerWaiter, EventMonitor, get_event_time, get_timestamp_time
+
+
+def _wait_result(exit_code):
+    # Same as ``wait`` of the client, which returns the exit code before docker-py 3.0.
+    if events.WAIT_RESULT_DICT:
+        return {'StatusCode': exit_code}
+    return exit_code
+
+
+def _event(item_type, action, item_id, time_nano, **attributes):
+    return {
+        'Type': item_type,
+        'Action': action,
+        'Actor': {'ID': item_id, 'Attributes': attributes},
+        'time': time_nano // 1000000000,
+        'timeNano': time_nano,
+    }
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.event_queue = queue.Queue()
+        self.container_states = {}
+
+    def _event_stream(self):
+        while True:
+            event = self.event_queue.get()
+            if event is None:
+                self.event_queue.task_done()
+                return
+            yield event
+            self.event_queue.task_done()
+
+    def events(self, decode=False, since=None):
+        return self._event_stream()
+
+    def inspect_container(self, container):
+        c_id, name, state = self.container_states[container]
+        return {'Id': c_id, 'Name': '/' + name, 'State': state}
+
+
+class TestEventTime(unittest.TestCase):
+    def test_event_time(self):
+        self.assertEqual(get_event_time(_event('container', 'start', 'c1', 1000000000001)), '1000.000000001')
+        self.assertEqual(get_event_time({'time': 1000}), '1000')
+        self.assertIsNone(get_event_time({}))
+
+    def test_timestamp_time(self):
+        self.assertEqual(get_timestamp_time('1970-01-01T00:16:40Z'), '1000')
+        self.assertEqual(get_timestamp_time('1970-01-01T00:16:40.5Z'), '1000.500000000')
+        self.assertEqual(get_timestamp_time('1970-01-01T01:16:40.123456789123+01:00'), '1000.123456789')
+        self.assertRaises(ValueError, get_timestamp_time, 'invalid')
+
+
+class TestContainerWaiter(unittest.TestCase):
+    def setUp(self):
+        self.client = client = FakeClient()
+        self.monitor = EventMonitor(client)
+        self.waiter = ContainerWaiter(client, self.monitor)
+
+    def tearDown(self):
+        self.monitor.stop()
+        self.client.event_queue.put(None)
+
+    def _wait_async(self, func, *args, **kwargs):
+        results = []
+        thread = threading.Thread(target=lambda: results.append(func(*args, **kwargs)))
+        thread.start()
+        return thread, results
+
+    def test_stopped_container(self):
+        self.client.container_states['main.app'] = 'c1', 'main.app', {'Running': False, 'ExitCode': 3}
+        self.assertEqual(self.waiter.wait('main.app', timeout=1), _wait_result(3))
+
+    def test_wait_multiple(self):
+        client = self.client
+        for c_id in ('c1', 'c2', 'c3'):
+            client.container_states[c_id] = c_id, 'main.{0}'.format(c_id), {'Running': True}
+        threads = [self._wait_async(self.waiter.wait, c_id, timeout=5) for c_id in ('c1', 'c2', 'c3')]
+        while len(self.waiter._waits) < 6:
+            time.sleep(0.01)
+        client.event_queue.put(_event('container', 'die', 'c2', 1000000000001, name='main.c2', exitCode='1'))
+        client.event_queue.put(_event('container', 'die', 'c1', 1000000000002, name='main.c1', exitCode='0'))
+        client.event_queue.put(_event('container', 'die', 'c3', 1000000000003, name='main.c3', exitCode='137'))
+        for thread, __ in threads:
+            thread.join(5)
+        self.assertListEqual([results for __, results in threads],
+                             [[_wait_result(0)], [_wait_result(1)], [_wait_result(137)]])
+        self.assertDictEqual(self.waiter._waits, {})
+
+    def test_wait_result_type(self):
+        self.client.container_states['main.app'] = 'c1', 'main.app', {'Running': False, 'ExitCode': 3}
+        wait_result_dict = events.WAIT_RESULT_DICT
+        try:
+            events.WAIT_RESULT_DICT = True
+            self.assertEqual(self.waiter.wait('main.app', timeout=1), {'StatusCode': 3})
+            events.WAIT_RESULT_DICT = False
+            self.assertEqual(self.waiter.wait('main.app', timeout=1), 3)
+        finally:
+            events.WAIT_RESULT_DICT = wait_result_dict
+
+    def test_wait_health(self):
+        client = self.client
+        client.container_states['main.db'] = 'c1', 'main.db', {'Running': True, 'Health': {'Status': 'starting'}}
+        thread, results = self._wait_async(self.waiter.wait_health, 'main.db', timeout=5)
+        while not self.waiter._waits:
+            time.sleep(0.01)
+        client.event_queue.put(_event('container', 'health_status: healthy', 'c1', 1000000000001, name='main.db'))
+        thread.join(5)
+        self.assertListEqual(results, ['healthy'])
+
+    def test_timeout(self):
+        self.client.container_states['main.app'] = 'c1', 'main.app', {'Running': True}
+        self.assertRaises(Timeout, self.waiter.wait, 'main.app', timeout=0.05)
+        self.assertDictEqual(self.waiter._waits, {})
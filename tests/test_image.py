@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from collections import defaultdict, namedtuple
+import gc
+import threading
+import time
+import unittest
+
+from dockermap.map.action import ImageAction, ContainerUtilAction
+from dockermap.map.config.client import ClientConfiguration
+from dockermap.map.exceptions import ActionRunnerException
+from dockermap.map.input import ItemType, MapConfigId
+from dockermap.map.runner.image import ImageMixin, LoginCache, _get_registry
+
+from tests import CLIENT_DATA_1
+
+
+SampleAction = namedtuple('SampleAction', ['client_name', 'config_id', 'action_types', 'extra_data'])
+SamplePolicy = namedtuple('SamplePolicy', ['clients', 'container_maps', 'images'])
+
+WAIT_TIMEOUT = 5
+
+
+class FakeClient(object):
+    def __init__(self, blocking=None, failing=(), delay=None):
+        self.lock = threading.Lock()
+        self.pulls = []
+        self.logins = []
+        self.started = defaultdict(threading.Event)
+        self.blocking = blocking or {}
+        self.failing = set(failing)
+        self.delay = delay
+        self.running = defaultdict(int)
+        self.max_running = defaultdict(int)
+
+    def login(self, **kwargs):
+        with self.lock:
+            self.logins.append(kwargs['registry'])
+        return {'Status': 'Login Succeeded'}
+
+    def pull(self, repository, tag=None, **kwargs):
+        registry = _get_registry(repository)
+        with self.lock:
+            self.pulls.append((repository, tag))
+            self.running[registry] += 1
+            self.max_running[registry] = max(self.max_running[registry], self.running[registry])
+        try:
+            self.started[registry].set()
+            wait_for = self.blocking.get(repository)
+            if wait_for and not self.started[wait_for].wait(WAIT_TIMEOUT):
+                raise AssertionError("No image from {0} has been pulled concurrently.".format(wait_for))
+            if self.delay:
+                time.sleep(self.delay)
+            if repository in self.failing:
+                raise ValueError("Cannot pull {0}.".format(repository))
+            return 'pulled {0}:{1}'.format(repository, tag)
+        finally:
+            with self.lock:
+                self.running[registry] -= 1
+
+
+class FakeImageCache(object):
+    def __init__(self):
+        self.refreshed = 0
+
+    def refresh(self):
+        self.refreshed += 1
+
+
+class PullRunner(ImageMixin):
+    def __init__(self, policy, **kwargs):
+        self._policy = policy
+        self.login_cache = LoginCache()
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+def _pull_list(image, client_name='__default__', action_types=ImageAction.PULL):
+    repository, __, tag = image.rpartition(':')
+    config_id = MapConfigId(ItemType.IMAGE, 'main', repository, tag)
+    return [SampleAction(client_name, config_id, [action_types], {})]
+
+
+class PullAllTest(unittest.TestCase):
+    def setUp(self):
+        self.clients = {
+            '__default__': FakeClient(),
+            'other': FakeClient(),
+        }
+        self.policy = SamplePolicy(
+            {client_name: ClientConfiguration(client=client, **CLIENT_DATA_1)
+             for client_name, client in self.clients.items()},
+            {'main': None},
+            {client_name: FakeImageCache() for client_name in self.clients},
+        )
+
+    def test_deduplicate(self):
+        runner = PullRunner(self.policy, pull_workers=3)
+        results = runner.pull_all([
+            _pull_list('redis:latest') + _pull_list('nginx:latest'),
+            _pull_list('redis:latest'),
+            _pull_list('redis:latest', 'other'),
+            _pull_list('redis:4'),
+            _pull_list('nginx:latest', action_types=ContainerUtilAction.SIGNAL_STOP),
+        ])
+        self.assertListEqual([('__default__', 'redis', 'latest'), ('__default__', 'nginx', 'latest'),
+                              ('other', 'redis', 'latest'), ('__default__', 'redis', '4')],
+                             [(res.client_name, res.config_id.config_name, res.config_id.instance_name)
+                              for res in results])
+        self.assertListEqual(['pulled redis:latest', 'pulled nginx:latest', 'pulled redis:latest', 'pulled redis:4'],
+                             [res.result for res in results])
+        self.assertListEqual([('nginx', 'latest'), ('redis', '4'), ('redis', 'latest')],
+                             sorted(self.clients['__default__'].pulls))
+        self.assertListEqual([('redis', 'latest')], self.clients['other'].pulls)
+        self.assertEqual(1, self.policy.images['__default__'].refreshed)
+        self.assertEqual(1, self.policy.images['other'].refreshed)
+
+    def test_no_pulls(self):
+        runner = PullRunner(self.policy, pull_workers=2)
+        self.assertListEqual([], runner.pull_all([
+            _pull_list('nginx:latest', action_types=ContainerUtilAction.SIGNAL_STOP),
+        ]))
+        self.assertEqual(0, self.policy.images['__default__'].refreshed)
+
+    def test_registry_workers(self):
+        client = self.clients['__default__'] = FakeClient(blocking={'redis': 'registry.example.com'}, delay=0.05)
+        self.policy.clients['__default__'] = ClientConfiguration(client=client, **CLIENT_DATA_1)
+        self.policy.clients['__default__'].auth_configs = {'registry.example.com': {'username': 'user'}}
+        runner = PullRunner(self.policy, pull_workers=4, registry_pull_workers=1)
+        results = runner.pull_all([
+            _pull_list('registry.example.com/app:1'),
+            _pull_list('registry.example.com/app:2'),
+            _pull_list('registry.example.com/tool:1'),
+            _pull_list('redis:latest'),
+        ])
+        self.assertEqual(4, len(results))
+        self.assertEqual(1, client.max_running['registry.example.com'])
+        self.assertIn(('redis', 'latest'), client.pulls)
+
+    def test_error_partial_results(self):
+        client = self.clients['__default__'] = FakeClient(failing=['nginx'])
+        self.policy.clients['__default__'] = ClientConfiguration(client=client, **CLIENT_DATA_1)
+        runner = PullRunner(self.policy, pull_workers=2)
+        with self.assertRaises(ActionRunnerException) as context:
+            runner.pull_all([
+                _pull_list('redis:latest'),
+                _pull_list('nginx:latest'),
+                _pull_list('redis:latest', 'other'),
+            ])
+        exc = context.exception
+        self.assertEqual('nginx', exc.config_id.config_name)
+        self.assertEqual(ImageAction.PULL, exc.action_type)
+        self.assertListEqual(['pulled redis:latest', 'pulled redis:latest'], [res.result for res in exc.results])
+        self.assertEqual(1, self.policy.images['__default__'].refreshed)
+        self.assertEqual(1, self.policy.images['other'].refreshed)
+
+
+class LoginCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.client1 = FakeClient()
+        self.client2 = FakeClient()
+
+    def test_set_valid(self):
+        login_cache = LoginCache()
+        self.assertFalse(login_cache.is_valid(self.client1, 'registry.example.com'))
+        login_cache.set(self.client1, 'registry.example.com')
+        self.assertTrue(login_cache.is_valid(self.client1, 'registry.example.com'))
+        self.assertFalse(login_cache.is_valid(self.client1, 'other.example.com'))
+        self.assertFalse(login_cache.is_valid(self.client2, 'registry.example.com'))
+
+    def test_expiry(self):
+        login_cache = LoginCache(ttl=0)
+        login_cache.set(self.client1, 'registry.example.com')
+        self.assertFalse(login_cache.is_valid(self.client1, 'registry.example.com'))
+        login_cache.ttl = None
+        self.assertTrue(login_cache.is_valid(self.client1, 'registry.example.com'))
+
+    def test_get_lock(self):
+        login_cache = LoginCache()
+        lock = login_cache.get_lock(self.client1, 'registry.example.com')
+        self.assertIs(lock, login_cache.get_lock(self.client1, 'registry.example.com'))
+        self.assertIsNot(lock, login_cache.get_lock(self.client1, 'other.example.com'))
+        self.assertIsNot(lock, login_cache.get_lock(self.client2, 'registry.example.com'))
+
+    def test_invalidate(self):
+        login_cache = LoginCache()
+        for client in (self.client1, self.client2):
+            for registry in ('registry.example.com', 'other.example.com'):
+                login_cache.set(client, registry)
+        login_cache.invalidate(self.client1, 'registry.example.com')
+        self.assertFalse(login_cache.is_valid(self.client1, 'registry.example.com'))
+        self.assertTrue(login_cache.is_valid(self.client1, 'other.example.com'))
+        login_cache.invalidate(registry='other.example.com')
+        self.assertFalse(login_cache.is_valid(self.client1, 'other.example.com'))
+        self.assertFalse(login_cache.is_valid(self.client2, 'other.example.com'))
+        self.assertTrue(login_cache.is_valid(self.client2, 'registry.example.com'))
+        login_cache.invalidate(self.client2)
+        self.assertFalse(login_cache.is_valid(self.client2, 'registry.example.com'))
+        login_cache.set(self.client1, 'registry.example.com')
+        login_cache.invalidate()
+        self.assertFalse(login_cache.is_valid(self.client1, 'registry.example.com'))
+
+    def test_client_released(self):
+        login_cache = LoginCache()
+        login_cache.set(self.client1, 'registry.example.com')
+        login_cache.get_lock(self.client1, 'registry.example.com')
+        del self.client1
+        gc.collect()
+        self.assertEqual(0, len(login_cache._logins))
+        self.assertEqual(0, len(login_cache._locks))
+
+    def test_shared_login(self):
+        client = FakeClient(delay=0.05)
+        client_config = ClientConfiguration(client=client, **CLIENT_DATA_1)
+        client_config.auth_configs = {'registry.example.com': {'username': 'user'}}
+        policy = SamplePolicy({'__default__': client_config}, {'main': None}, {'__default__': FakeImageCache()})
+        login_cache = LoginCache()
+        runners = [PullRunner(policy, pull_workers=2, login_cache=login_cache) for __ in range(2)]
+        runners[0].pull_all([_pull_list('registry.example.com/app:1'), _pull_list('registry.example.com/app:2')])
+        runners[1].pull_all([_pull_list('registry.example.com/tool:1')])
+        self.assertListEqual(['registry.example.com'], client.logins)
+        login_cache.invalidate(client)
+        runners[1].pull_all([_pull_list('registry.example.com/tool:2')])
+        self.assertListEqual(['registry.example.com', 'registry.example.com'], client.logins)
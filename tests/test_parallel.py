@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+from collections import defaultdict, namedtuple
+import sys
+import threading
+import unittest
+
+from dockermap.exceptions import PartialResultsError
+from dockermap.map.action import Action
+from dockermap.map.config.client import ClientConfiguration
+from dockermap.map.config.main import ContainerMap
+from dockermap.map.exceptions import ActionException, ActionRunnerException
+from dockermap.map.input import ItemType, MapConfigId
+from dockermap.map.policy.base import BasePolicy
+from dockermap.map.runner.parallel import DeferredActions, ParallelRunnerMixin
+
+from tests import MAP_DATA_2, CLIENT_DATA_1
+
+
+SampleAction = namedtuple('SampleAction', ['client_name', 'config_id', 'action_types'])
+
+WAIT_TIMEOUT = 5
+
+
+class RecordingRunner(ParallelRunnerMixin):
+    def __init__(self, policy, **kwargs):
+        self._policy = policy
+        self.lock = threading.Lock()
+        self.events = []
+        self.started = {}
+        self.failing = {}
+        self.blocking = {}
+        self.running = defaultdict(int)
+        self.max_running = defaultdict(int)
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def _record(self, *event):
+        with self.lock:
+            self.events.append(event)
+
+    def run_actions(self, actions):
+        for action in actions:
+            client_name = action.client_name
+            config_name = action.config_id.config_name
+            with self.lock:
+                self.events.append(('start', config_name))
+                self.running[client_name] += 1
+                self.max_running[client_name] = max(self.max_running[client_name], self.running[client_name])
+            try:
+                self.started.setdefault(config_name, threading.Event()).set()
+                wait_for = self.blocking.get(config_name)
+                if wait_for and not self.started.setdefault(wait_for, threading.Event()).wait(WAIT_TIMEOUT):
+                    raise AssertionError("{0} has not been started concurrently.".format(wait_for))
+                yield 'output {0}'.format(config_name)
+                error = self.failing.get(config_name)
+                if error:
+                    raise error
+                self._record('end', config_name)
+            finally:
+                with self.lock:
+                    self.running[client_name] -= 1
+
+
+def _container_id(config_name):
+    return MapConfigId(ItemType.CONTAINER, 'main', config_name)
+
+
+def _action_list(config_name, client_name='__default__'):
+    return [SampleAction(client_name, _container_id(config_name), [Action.START])]
+
+
+class ParallelRunnerTest(unittest.TestCase):
+    def setUp(self):
+        sample_map = ContainerMap('main', MAP_DATA_2, use_attached_parent_name=True).get_extended_map()
+        self.policy = BasePolicy({'main': sample_map}, {
+            '__default__': ClientConfiguration(**CLIENT_DATA_1),
+            'other': ClientConfiguration(**CLIENT_DATA_1),
+        })
+
+    def test_dependencies_ordered(self):
+        runner = RecordingRunner(self.policy, parallel_workers=3, blocking={'sub_sub_svc': 'svc2'})
+        results = runner.run_parallel([
+            _action_list('sub_sub_svc'),
+            _action_list('sub_svc'),
+            _action_list('svc2'),
+        ])
+        self.assertListEqual(['output sub_sub_svc', 'output sub_svc', 'output svc2'], results)
+        events = runner.events
+        self.assertLess(events.index(('start', 'svc2')), events.index(('end', 'sub_sub_svc')))
+        self.assertLess(events.index(('end', 'sub_sub_svc')), events.index(('start', 'sub_svc')))
+
+    def test_deferred_actions_after_dependencies(self):
+        runner = RecordingRunner(self.policy, parallel_workers=2)
+        resolved = []
+
+        def _get_actions(config_name):
+            def _get():
+                runner._record('resolve', config_name)
+                resolved.append(config_name)
+                return _action_list(config_name)
+            return _get
+
+        action_lists = [
+            DeferredActions('__default__', _container_id(config_name), _get_actions(config_name))
+            for config_name in ('sub_sub_svc', 'sub_svc')
+        ]
+        self.assertListEqual([], resolved)
+        results = runner.run_parallel(action_lists)
+        self.assertListEqual(['output sub_sub_svc', 'output sub_svc'], results)
+        events = runner.events
+        self.assertLess(events.index(('end', 'sub_sub_svc')), events.index(('resolve', 'sub_svc')))
+
+    def test_generator_sequential(self):
+        runner = RecordingRunner(self.policy, parallel_workers=2)
+
+        def _get_action_lists():
+            for config_name in ('svc2', 'sub_sub_svc'):
+                runner._record('request', config_name)
+                yield _action_list(config_name)
+
+        results = runner.run_parallel(_get_action_lists())
+        self.assertListEqual(['output svc2', 'output sub_sub_svc'], results)
+        events = runner.events
+        self.assertLess(events.index(('end', 'svc2')), events.index(('request', 'sub_sub_svc')))
+
+    def test_action_error_partial_results(self):
+        try:
+            raise ValueError("Test error.")
+        except ValueError:
+            exc_info = sys.exc_info()
+        error = ActionException(exc_info, '__default__', _container_id('sub_svc'), Action.START)
+        runner = RecordingRunner(self.policy, parallel_workers=2, failing={'sub_svc': error})
+        with self.assertRaises(ActionRunnerException) as context:
+            runner.run_parallel([
+                _action_list('sub_sub_svc'),
+                _action_list('sub_svc'),
+                _action_list('redis'),
+            ])
+        exc = context.exception
+        self.assertEqual(_container_id('sub_svc'), exc.config_id)
+        self.assertEqual('__default__', exc.client_name)
+        self.assertListEqual(['output sub_sub_svc', 'output sub_svc'], exc.results)
+        self.assertNotIn(('start', 'redis'), runner.events)
+
+    def test_error_partial_results(self):
+        runner = RecordingRunner(self.policy, parallel_workers=2, failing={'sub_svc': ValueError("Test error.")})
+        with self.assertRaises(PartialResultsError) as context:
+            runner.run_parallel([
+                _action_list('sub_sub_svc'),
+                _action_list('sub_svc'),
+            ])
+        self.assertListEqual(['output sub_sub_svc', 'output sub_svc'], context.exception.results)
+
+    def test_base_exception(self):
+        runner = RecordingRunner(self.policy, parallel_workers=2, failing={'svc2': KeyboardInterrupt()})
+        with self.assertRaises(KeyboardInterrupt):
+            runner.run_parallel([
+                _action_list('svc2'),
+                _action_list('sub_sub_svc'),
+            ])
+
+    def test_shard_clients(self):
+        runner = RecordingRunner(self.policy, parallel_workers=4, shard_clients=True,
+                                 blocking={'sub_sub_svc': 'net_sub_svc'})
+        results = runner.run_parallel([
+            _action_list('sub_sub_svc'),
+            _action_list('sub_svc'),
+            _action_list('svc2'),
+            _action_list('net_sub_svc', 'other'),
+        ])
+        self.assertListEqual(['output sub_sub_svc', 'output sub_svc', 'output svc2', 'output net_sub_svc'], results)
+        events = runner.events
+        self.assertLess(events.index(('start', 'net_sub_svc')), events.index(('end', 'sub_sub_svc')))
+        self.assertLess(events.index(('end', 'sub_sub_svc')), events.index(('start', 'sub_svc')))
+        self.assertEqual(1, runner.max_running['__default__'])
+
+    def test_client_workers(self):
+        runner = RecordingRunner(self.policy, parallel_workers=4, client_workers=2, shard_clients=True,
+                                 blocking={'sub_sub_svc': 'svc2'})
+        results = runner.run_parallel([
+            _action_list('sub_sub_svc'),
+            _action_list('sub_svc'),
+            _action_list('svc2'),
+            _action_list('net_sub_svc'),
+        ])
+        self.assertListEqual(['output sub_sub_svc', 'output sub_svc', 'output svc2', 'output net_sub_svc'], results)
+        events = runner.events
+        self.assertLess(events.index(('start', 'svc2')), events.index(('end', 'sub_sub_svc')))
+        self.assertLess(events.index(('end', 'sub_sub_svc')), events.index(('start', 'sub_svc')))
+        self.assertEqual(2, runner.max_running['__default__'])
@@ -5,10 +5,12 @@ import unittest
 
 from dockermap.docker_api import HostConfig
 from dockermap.api import ClientConfiguration, ContainerMap
+from dockermap.functional import lazy
 from dockermap.map.input import MapConfigId, ItemType
 from dockermap.map.policy.base import BasePolicy
 from dockermap.map.runner import ActionConfig
 from dockermap.map.runner.base import DockerClientRunner
+from dockermap.map.runner.utils import get_config_fingerprint
 
 from tests import MAP_DATA_1, CLIENT_DATA_1, CLIENT_DATA_2, MAP_DATA_1_NEW
 
@@ -45,6 +47,112 @@ class TestPolicyClientKwargs(unittest.TestCase):
             domainname=None,
         ))
 
+    def test_create_kwargs_with_managed_label(self):
+        cfg_name = 'web_server'
+        cfg = self.sample_map1.get_existing(cfg_name)
+        cfg_id = MapConfigId(ItemType.CONTAINER, 'main', cfg_name)
+        c_name = 'main.web_server'
+        self.policy.managed_label = 'dockermap.map'
+        config = ActionConfig('legacy', cfg_id, self.sample_client_config2, None, self.sample_map2, cfg)
+        kwargs = self.runner.get_container_create_kwargs(config, c_name,
+                                                         kwargs=dict(labels={'com.example.app': 'web'}))
+        self.assertDictEqual(kwargs['labels'], {'dockermap.map': 'main', 'com.example.app': 'web'})
+
+    def test_create_kwargs_with_managed_label_create_options(self):
+        cfg_name = 'web_server'
+        cfg = self.sample_map1.get_existing(cfg_name)
+        cfg_id = MapConfigId(ItemType.CONTAINER, 'main', cfg_name)
+        c_name = 'main.web_server'
+        self.policy.managed_label = 'dockermap.map'
+        cfg.create_options['labels'] = ['com.example.app=web']
+        config = ActionConfig('legacy', cfg_id, self.sample_client_config2, None, self.sample_map2, cfg)
+        kwargs = self.runner.get_container_create_kwargs(config, c_name)
+        self.assertDictEqual(kwargs['labels'], {'dockermap.map': 'main', 'com.example.app': 'web'})
+
+    def test_create_kwargs_with_fingerprint_label(self):
+        cfg_name = 'web_server'
+        cfg = self.sample_map1.get_existing(cfg_name)
+        cfg_id = MapConfigId(ItemType.CONTAINER, 'main', cfg_name)
+        c_name = 'main.web_server'
+        self.sample_client_config2.features['host_config'] = False
+        self.policy.fingerprint_label = 'dockermap.fingerprint'
+        config = ActionConfig('legacy', cfg_id, self.sample_client_config2, None, self.sample_map2, cfg)
+        kwargs = self.runner.get_container_create_kwargs(config, c_name)
+        fingerprint = kwargs['labels']['dockermap.fingerprint']
+        self.assertEqual(get_config_fingerprint(kwargs, 'dockermap.fingerprint'), fingerprint)
+        self.assertEqual(self.runner.get_container_create_kwargs(config, c_name)['labels']['dockermap.fingerprint'],
+                         fingerprint)
+        changed_kwargs = self.runner.get_container_create_kwargs(config, c_name, kwargs=dict(ports=[22]))
+        self.assertNotEqual(changed_kwargs['labels']['dockermap.fingerprint'], fingerprint)
+
+    def test_create_kwargs_with_fingerprint_list_labels(self):
+        cfg_name = 'web_server'
+        cfg = self.sample_map1.get_existing(cfg_name)
+        cfg_id = MapConfigId(ItemType.CONTAINER, 'main', cfg_name)
+        c_name = 'main.web_server'
+        self.sample_client_config2.features['host_config'] = False
+        self.policy.fingerprint_label = 'dockermap.fingerprint'
+        config = ActionConfig('legacy', cfg_id, self.sample_client_config2, None, self.sample_map2, cfg)
+        kwargs = self.runner.get_container_create_kwargs(config, c_name,
+                                                         kwargs=dict(labels=['com.example.app=web', 'debug']))
+        labels = kwargs['labels']
+        self.assertEqual(labels['com.example.app'], 'web')
+        self.assertEqual(labels['debug'], '')
+        self.assertEqual(get_config_fingerprint(kwargs, 'dockermap.fingerprint'), labels['dockermap.fingerprint'])
+
+    def test_create_kwargs_template(self):
+        cfg_name = 'web_server'
+        cfg = self.sample_map1.get_existing(cfg_name)
+        cfg_id = MapConfigId(ItemType.CONTAINER, 'main', cfg_name)
+        c_name = 'main.web_server'
+        self.sample_client_config2.features['host_config'] = False
+        config = ActionConfig('legacy', cfg_id, self.sample_client_config2, None, self.sample_map2, cfg)
+        kwargs1 = self.runner.get_container_create_kwargs(config, c_name, kwargs=dict(ports=[22]))
+        self.assertEqual(len(self.policy.kwargs_templates), 1)
+        kwargs2 = self.runner.get_container_create_kwargs(config, c_name)
+        self.assertListEqual(kwargs1['ports'], [80, 443, 22])
+        self.assertListEqual(kwargs2['ports'], [80, 443])
+        cfg.user = 'app_user'
+        self.assertEqual(self.runner.get_container_create_kwargs(config, c_name)['user'], 'app_user')
+
+    def test_create_kwargs_template_lazy(self):
+        cfg_name = 'web_server'
+        cfg = self.sample_map1.get_existing(cfg_name)
+        cfg_id = MapConfigId(ItemType.CONTAINER, 'main', cfg_name)
+        c_name = 'main.web_server'
+        self.sample_client_config2.features['host_config'] = False
+        users = ['user1']
+        cfg.user = lazy(lambda: users[0])
+        config = ActionConfig('legacy', cfg_id, self.sample_client_config2, None, self.sample_map2, cfg)
+        self.assertEqual(self.runner.get_container_create_kwargs(config, c_name)['user'], 'user1')
+        users[0] = 'user2'
+        self.assertEqual(self.runner.get_container_create_kwargs(config, c_name)['user'], 'user2')
+
+    def test_create_kwargs_template_client_config(self):
+        cfg_name = 'web_server'
+        cfg = self.sample_map1.get_existing(cfg_name)
+        cfg_id = MapConfigId(ItemType.CONTAINER, 'main', cfg_name)
+        c_name = 'main.web_server'
+        self.sample_client_config2.features['host_config'] = False
+        config = ActionConfig('legacy', cfg_id, self.sample_client_config2, None, self.sample_map2, cfg)
+        self.assertIsNone(self.runner.get_container_create_kwargs(config, c_name)['domainname'])
+        self.sample_client_config2['domainname'] = 'example.com'
+        self.assertEqual(self.runner.get_container_create_kwargs(config, c_name)['domainname'], 'example.com')
+
+    def test_host_config_kwargs_template_map(self):
+        cfg_name = 'web_server'
+        cfg = self.sample_map2.get_existing(cfg_name)
+        cfg_id = MapConfigId(ItemType.CONTAINER, 'main', cfg_name)
+        c_name = 'main.web_server'
+        config = ActionConfig('legacy', cfg_id, self.sample_client_config2, None, self.sample_map2, cfg)
+        kwargs1 = self.runner.get_container_host_config_kwargs(config, c_name)
+        self.assertListEqual(kwargs1['binds'], ['/var/lib/site/config/nginx:/etc/nginx:ro'])
+        self.sample_map2.host.root = '/var/lib/other'
+        self.sample_map2.use_attached_parent_name = True
+        kwargs2 = self.runner.get_container_host_config_kwargs(config, c_name)
+        self.assertListEqual(kwargs2['binds'], ['/var/lib/other/config/nginx:/etc/nginx:ro'])
+        self.assertIn('main.web_server.web_log', kwargs2['volumes_from'])
+
     def test_host_config_kwargs(self):
         cfg_name = 'web_server'
         cfg = self.sample_map2.get_existing(cfg_name)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import unittest
+
+from dockermap.client.progress import ProgressAggregator
+
+
+def _status(layer_id, status, current=None, total=None):
+    output = {'id': layer_id, 'status': status}
+    if current is not None:
+        output['progressDetail'] = {'current': current, 'total': total}
+    return output
+
+
+PULL_STREAM = [
+    (100, {'id': 'latest', 'status': 'Pulling from app'}),
+    (100, _status('l1', 'Already exists')),
+    (100, _status('l2', 'Pulling fs layer')),
+    (100, _status('l3', 'Pulling fs layer')),
+    (101, _status('l2', 'Downloading', 100, 1000)),
+    (102, _status('l3', 'Downloading', 300, 3000)),
+    (103, _status('l2', 'Downloading', 900, 1000)),
+    (104, _status('l2', 'Download complete')),
+    (104, _status('l2', 'Extracting', 500, 1000)),
+]
+
+
+class ProgressAggregatorTest(unittest.TestCase):
+    def test_pull_progress(self):
+        progress = ProgressAggregator('app:latest')
+        for timestamp, output in PULL_STREAM:
+            progress.update(output, timestamp)
+        self.assertEqual(progress.present_layers, 1)
+        self.assertEqual(progress.complete_layers, 2)
+        self.assertEqual(progress.current_bytes, 1300)
+        self.assertEqual(progress.total_bytes, 4000)
+        self.assertEqual(progress.bytes_per_second, 325.0)
+        self.assertAlmostEqual(progress.eta, 2700 / 325.0)
+        self.assertEqual(progress.layers['l3'].current, 300)
+
+    def test_image_status(self):
+        progress = ProgressAggregator('app:latest')
+        for timestamp, output in PULL_STREAM:
+            progress.update(output, timestamp)
+        progress.update({'id': 'latest', 'status': 'Digest: sha256:0123456789abcdef'}, 105)
+        progress.update({'status': 'Status: Downloaded newer image for app:latest'}, 105)
+        self.assertSetEqual(set(progress.layers), {'l1', 'l2', 'l3'})
+        self.assertEqual(progress.complete_layers, 2)
+
+    def test_push_callback(self):
+        reports = []
+        progress = ProgressAggregator('app:latest', callback=lambda p: reports.append(p.current_bytes),
+                                      callback_interval=5)
+        progress.update(_status('l1', 'Preparing'), 10)
+        progress.update(_status('l1', 'Pushing', 500, 2000), 11)
+        progress.update(_status('l1', 'Pushing', 1500, 2000), 15)
+        progress.update(_status('l1', 'Pushed'), 16)
+        progress.update(_status('l2', 'Layer already exists'), 16)
+        progress.finish(16)
+        self.assertListEqual(reports, [0, 1500, 2000])
+        self.assertTrue(progress.finished)
+        self.assertEqual(progress.present_layers, 1)
+        self.assertEqual(progress.eta, 0)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+import unittest
+
+from requests import Timeout
+
+from dockermap.map.config.client import ClientConfiguration
+from dockermap.map.config.container import ContainerConfiguration
+from dockermap.map.config.main import ContainerMap
+from dockermap.map.input import ItemType, MapConfigId
+from dockermap.map.policy.base import BasePolicy
+from dockermap.map.runner import ActionConfig
+from dockermap.map.runner.ready import ReadinessGateMixin
+
+from tests import MAP_DATA_2, CLIENT_DATA_1
+
+
+class FakeClient(object):
+    def __init__(self, health_states=None):
+        self.health_states = health_states or {}
+        self.inspected = []
+
+    def inspect_container(self, container):
+        self.inspected.append(container)
+        states = self.health_states[container]
+        status = states.pop(0) if len(states) > 1 else states[0]
+        return {'State': {'Running': True, 'Health': {'Status': status}}}
+
+
+class FakeWaiter(object):
+    def __init__(self, client, monitor):
+        self.waits = []
+        self.result = 'healthy'
+
+    def wait_health(self, container, timeout=None):
+        self.waits.append((container, timeout))
+        if self.result is None:
+            raise Timeout()
+        return self.result
+
+
+class EventClientConfiguration(ClientConfiguration):
+    event_monitor_constructor = staticmethod(lambda client: None)
+    container_waiter_constructor = FakeWaiter
+
+
+class BaseRunner(object):
+    def __init__(self, policy):
+        self._policy = policy
+        self.performed = []
+
+    def run_actions(self, actions):
+        self.performed.extend(actions)
+        return []
+
+
+class ReadyRunner(ReadinessGateMixin, BaseRunner):
+    readiness_poll_interval = 0.01
+
+
+class SampleAction(object):
+    def __init__(self, client_name, config_id):
+        self.client_name = client_name
+        self.config_id = config_id
+
+
+def _container_id(config_name):
+    return MapConfigId(ItemType.CONTAINER, 'main', config_name)
+
+
+class ReadinessGateTest(unittest.TestCase):
+    def setUp(self):
+        self.sample_map = ContainerMap('main', MAP_DATA_2, use_attached_parent_name=True).get_extended_map()
+        self.client = FakeClient()
+        self.client_config = ClientConfiguration(client=self.client, **CLIENT_DATA_1)
+        self.policy = BasePolicy({'main': self.sample_map}, {'__default__': self.client_config})
+        self.runner = ReadyRunner(self.policy)
+        self.runner.readiness_gating = True
+
+    def _add_pending(self, config_name, client_config=None, **kwargs):
+        config = ContainerConfiguration(**kwargs)
+        action = ActionConfig('__default__', _container_id(config_name), client_config or self.client_config,
+                              self.client, self.sample_map, config)
+        c_name = 'main.{0}'.format(config_name)
+        self.runner.add_pending_ready(action, c_name)
+        return c_name
+
+    def test_no_delay(self):
+        self._add_pending('sub_sub_svc')
+        self.assertDictEqual(self.runner._pending_ready, {})
+
+    def test_start_delay_dependent(self):
+        self._add_pending('sub_sub_svc', start_delay=0.1)
+        start = time.time()
+        self.runner.run_actions([SampleAction('__default__', _container_id('sub_svc'))])
+        self.assertGreaterEqual(time.time() - start, 0.09)
+        self.assertDictEqual(self.runner._pending_ready, {})
+        self.assertEqual(len(self.runner.performed), 1)
+
+    def test_start_delay_independent(self):
+        self._add_pending('sub_sub_svc', start_delay=5)
+        start = time.time()
+        self.runner.run_actions([SampleAction('__default__', _container_id('svc2'))])
+        self.assertLess(time.time() - start, 1)
+        self.assertIn(('__default__', _container_id('sub_sub_svc')), self.runner._pending_ready)
+
+    def test_wait_ready_concurrent(self):
+        self._add_pending('sub_sub_svc', start_delay=0.2)
+        durations = []
+
+        def _wait():
+            start = time.time()
+            self.runner.wait_ready('__default__', [_container_id('sub_sub_svc')])
+            durations.append(time.time() - start)
+
+        threads = [threading.Thread(target=_wait) for __ in range(2)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        self.assertIn(('__default__', _container_id('sub_sub_svc')), self.runner._pending_ready)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(durations), 2)
+        for duration in durations:
+            self.assertGreaterEqual(duration, 0.1)
+        self.assertDictEqual(self.runner._pending_ready, {})
+
+    def test_wait_ready_health(self):
+        self.client.health_states['main.sub_sub_svc'] = ['starting', 'starting', 'healthy']
+        self._add_pending('sub_sub_svc', healthcheck={'test': ['true']})
+        self.runner.wait_ready('__default__', [_container_id('sub_sub_svc')])
+        self.assertListEqual(self.client.inspected, ['main.sub_sub_svc'] * 3)
+        self.assertDictEqual(self.runner._pending_ready, {})
+
+    def test_wait_ready_timeout(self):
+        self.client.health_states['main.sub_sub_svc'] = ['starting']
+        self.runner.readiness_timeout = 0.05
+        self._add_pending('sub_sub_svc', healthcheck={'test': ['true']})
+        start = time.time()
+        self.runner.wait_ready('__default__', [_container_id('sub_sub_svc')])
+        self.assertGreaterEqual(time.time() - start, 0.04)
+        self.assertLess(time.time() - start, 1)
+        self.assertDictEqual(self.runner._pending_ready, {})
+
+    def test_wait_all_ready(self):
+        self.client.health_states['main.sub_sub_svc'] = ['starting', 'healthy']
+        self._add_pending('sub_sub_svc', healthcheck={'test': ['true']})
+        self._add_pending('svc2', start_delay=0.05)
+        start = time.time()
+        self.runner.wait_all_ready()
+        self.assertGreaterEqual(time.time() - start, 0.04)
+        self.assertListEqual(self.client.inspected, ['main.sub_sub_svc'] * 2)
+        self.assertDictEqual(self.runner._pending_ready, {})
+
+    def test_wait_ready_events(self):
+        client_config = EventClientConfiguration(client=self.client, wait_events=True, **CLIENT_DATA_1)
+        self._add_pending('sub_sub_svc', client_config=client_config, healthcheck={'test': ['true']})
+        waiter = client_config.get_container_waiter()
+        waiter.result = None
+        self.runner.wait_all_ready()
+        self.assertEqual(len(waiter.waits), 1)
+        self.assertEqual(waiter.waits[0][0], 'main.sub_sub_svc')
+        self.assertListEqual(self.client.inspected, [])
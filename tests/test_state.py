@@ -11,6 +11,8 @@ import six
 from docker.utils import parse_bytes
 
 from dockermap import DEFAULT_COREIMAGE, DEFAULT_BASEIMAGE
+from dockermap.map.action import DerivedAction
+from dockermap.map.client import MappingDockerClient
 from dockermap.map.config.client import ClientConfiguration
 from dockermap.map.config.main import ContainerMap
 from dockermap.map.config.utils import get_map_config_ids
@@ -18,10 +20,13 @@ from dockermap.map.input import ExecCommand, ExecPolicy, MapConfigId, ItemType,
 from dockermap.map.policy import ConfigFlags
 from dockermap.map.policy.base import BasePolicy
 from dockermap.map.policy.utils import get_shared_volume_path
+from dockermap.map.runner import ActionConfig
+from dockermap.map.runner.base import DockerClientRunner
 from dockermap.map.state import INITIAL_START_TIME, State, StateFlags
 from dockermap.map.state.base import DependencyStateGenerator, DependentStateGenerator, SingleStateGenerator
 from dockermap.map.state.update import UpdateStateGenerator
-from dockermap.map.state.update.container import CONTAINER_UPDATE_VARS
+from dockermap.map.state.update.container import CONTAINER_UPDATE_VARS, ContainerKwargsGenerator, ProcessIndex
+from dockermap.map.state.update.network import NetworkEndpointRegistry
 from dockermap.map.state.utils import merge_dependency_paths
 from dockermap.utils import format_image_tag
 
@@ -111,18 +116,31 @@ def _network(config_name, **kwargs):
     return config_name, kwargs
 
 
-def _add_container_list(rsps, container_names):
+def _add_container_list(rsps, container_names, status=None):
     results = [
         {'Id': get_container_id(name), 'Names': ['/{0}'.format(name)]}
         for name in container_names
     ]
+    if status:
+        for result, name in zip(results, container_names):
+            result.update(status[name])
     for prefix in URL_PREFIXES:
         rsps.add('GET', '{0}/containers/json'.format(prefix), content_type='application/json', json=results)
 
 
-def _add_network_list(rsps, network_names):
+def _add_network_list(rsps, network_names, network_containers=None):
     results = [
-        {'Id': get_network_id(name), 'Name': name}
+        {
+            'Id': get_network_id(name),
+            'Name': name,
+            'Containers': {
+                get_container_id(c_name): {
+                    'Name': c_name,
+                    'EndpointID': get_endpoint_id(name, get_container_id(c_name)),
+                }
+                for c_name in (network_containers or {}).get(name, [])
+            },
+        }
         for name in network_names
     ]
     for prefix in URL_PREFIXES:
@@ -457,6 +475,7 @@ class TestPolicyStateGenerators(unittest.TestCase):
         container_names = []
         volume_names = []
         network_names = []
+        listed_containers = {}
         _add_image_list(rsps, self.images)
         image_dict = {name: _id for _id, name in self.images}
         base_image_id = image_dict[DEFAULT_BASEIMAGE]
@@ -497,11 +516,13 @@ class TestPolicyStateGenerators(unittest.TestCase):
             network_name = '{0.map_name}.{0.config_name}'.format(config_id)
             _add_network_inspect(rsps, network_name, n_config, network_containers.get(n_name, []), **kwargs)
             network_names.append(network_name)
+            listed_containers[network_name] = network_containers.get(n_name, [])
         for dn_name in ('bridge', 'none', 'host'):
             _add_network_inspect(rsps, dn_name, None, network_containers.get(dn_name, []))
             network_names.append(dn_name)
+            listed_containers[dn_name] = network_containers.get(dn_name, [])
         _add_container_list(rsps, container_names)
-        _add_network_list(rsps, network_names)
+        _add_network_list(rsps, network_names, listed_containers)
         _add_volume_list(rsps, volume_names)
 
     def _setup_default_containers(self, rsps):
@@ -556,6 +577,34 @@ class TestPolicyStateGenerators(unittest.TestCase):
             server_states = _get_single_state(sg, self.server_config_id)
             self.assertEqual(server_states.base_state, State.ABSENT)
 
+    def test_single_states_bulk_inspect(self):
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            status = {
+                'main.redis.cache': {'Status': 'Exited (0) 2 hours ago'},
+                'main.redis.queue': {'Status': 'Up 2 hours', 'State': 'running'},
+                'main.svc': {'Status': 'Exited (-127) 2 hours ago', 'State': 'exited'},
+                'main.worker': {'Status': 'Restarting (255) 3 seconds ago'},
+                'main.worker_q2': {'Status': 'Created', 'State': 'created'},
+            }
+            _add_container_list(rsps, list(status.keys()), status)
+            sg = SingleStateGenerator(self.policy, {'bulk_inspect': True})
+            cache_state = _get_single_state(sg, self._config_id('redis', 'cache'))
+            self.assertEqual(cache_state.base_state, State.PRESENT)
+            self.assertEqual(cache_state.state_flags, StateFlags.NONE)
+            self.assertEqual(cache_state.extra_data['id'], get_container_id('main.redis.cache'))
+            queue_state = _get_single_state(sg, self._config_id('redis', 'queue'))
+            self.assertEqual(queue_state.base_state, State.RUNNING)
+            svc_state = _get_single_state(sg, self._config_id('svc'))
+            self.assertEqual(svc_state.base_state, State.PRESENT)
+            self.assertEqual(svc_state.state_flags & StateFlags.NONRECOVERABLE, StateFlags.NONRECOVERABLE)
+            worker_state = _get_single_state(sg, self._config_id('worker'))
+            self.assertEqual(worker_state.base_state, State.RUNNING)
+            worker2_state = _get_single_state(sg, self._config_id('worker_q2'))
+            self.assertEqual(worker2_state.base_state, State.PRESENT)
+            self.assertEqual(worker2_state.state_flags & StateFlags.INITIAL, StateFlags.INITIAL)
+            server_states = _get_single_state(sg, self.server_config_id)
+            self.assertEqual(server_states.base_state, State.ABSENT)
+
     def test_single_states_forced_config(self):
         with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
             self._setup_containers(rsps, [
@@ -607,6 +656,33 @@ class TestPolicyStateGenerators(unittest.TestCase):
                                 for s in states
                                 if not (s.config_id.config_type == ItemType.CONTAINER and s.config_id.config_name == 'redis')))
 
+    def test_prefetched_states(self):
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            self._setup_containers(rsps, [
+                _container('sub_sub_svc'),
+                _container('sub_svc', P_STATE_EXITED_0),
+                _container('redis'),
+                _container('svc', P_STATE_EXITED_127),
+                _container('server', P_STATE_INITIAL),
+            ])
+            for sg_class in (DependencyStateGenerator, UpdateStateGenerator):
+                states = list(sg_class(self.policy, {}).get_states(self.server_config_id))
+                prefetched_states = list(sg_class(self.policy, {'inspect_workers': 3}).get_states(
+                    self.server_config_id))
+                self.assertListEqual(states, prefetched_states)
+
+    def test_update_states_not_prefetched(self):
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            self._setup_default_containers(rsps)
+            state_generator = UpdateStateGenerator(self.policy, {'inspect_workers': 3})
+
+            def _prefetch(config_items):
+                raise AssertionError("States for updates should not be prefetched.")
+
+            state_generator.generate_prefetched_states = _prefetch
+            states = list(state_generator.get_states(self.server_config_id))
+            self.assertListEqual(states, list(UpdateStateGenerator(self.policy, {}).get_states(self.server_config_id)))
+
     def test_update_states_clean(self):
         with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
             self._setup_default_containers(rsps)
@@ -803,6 +879,45 @@ class TestPolicyStateGenerators(unittest.TestCase):
             self.assertEqual(server_state.base_state, State.RUNNING)
             self.assertEqual(server_state.state_flags & StateFlags.MISC_MISMATCH, StateFlags.MISC_MISMATCH)
 
+    def test_update_states_fingerprint(self):
+        self.policy.fingerprint_label = 'dockermap.fingerprint'
+        config_id = self.server_config_id[0]
+        action = ActionConfig('__default__', config_id, self.sample_client_config1,
+                              self.sample_client_config1.get_client(), self.sample_map,
+                              self.sample_map.get_existing('server'))
+        c_kwargs = ContainerKwargsGenerator(self.policy).get_container_create_kwargs(action, 'main.server')
+        server_config = {
+            'Env': None,
+            'Cmd': [],
+            'Entrypoint': [],
+            'Labels': c_kwargs['labels'],
+        }
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            self._setup_containers(rsps, [
+                _container('sub_sub_svc'),
+                _container('sub_svc'),
+                _container('redis'),
+                _container('svc'),
+                _container('server', Config=server_config),
+            ])
+            states = _get_states_dict(UpdateStateGenerator(self.policy, {}).get_states(self.server_config_id))
+            self.assertEqual(states['containers'][('server', None)].state_flags, StateFlags.NONE)
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            self._setup_containers(rsps, [
+                _container('sub_sub_svc'),
+                _container('sub_svc'),
+                _container('redis'),
+                _container('svc'),
+                _container('server', links_valid=False, Config=server_config),
+            ])
+            states = _get_states_dict(UpdateStateGenerator(self.policy, {}).get_states(self.server_config_id))
+            self.assertEqual(states['containers'][('server', None)].state_flags, StateFlags.MISSING_LINK)
+            self.sample_map.containers['server'].create_options.update(environment=dict(Test='x'))
+            states = _get_states_dict(UpdateStateGenerator(self.policy, {}).get_states(self.server_config_id))
+            server_flags = states['containers'][('server', None)].state_flags
+            self.assertEqual(server_flags & StateFlags.MISSING_LINK, StateFlags.MISSING_LINK)
+            self.assertEqual(server_flags & StateFlags.MISC_MISMATCH, StateFlags.MISC_MISMATCH)
+
     def test_update_states_updated_exec(self):
         with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
             cmd1 = ExecCommand(2, '/bin/true', ExecPolicy.INITIAL)
@@ -863,6 +978,41 @@ class TestPolicyStateGenerators(unittest.TestCase):
         self.assertEqual(server_state.extra_data['update_container'],
                          {'restart_policy': {'Name': 'on-failure', 'MaximumRetryCount': 3}})
 
+    def test_update_network_registry_lazy(self):
+        with responses.RequestsMock():
+            state_generator = UpdateStateGenerator(self.policy, {})
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            self._setup_default_containers(rsps)
+            registry = state_generator._get_network_registry('__default__')
+            self.assertIsInstance(registry, NetworkEndpointRegistry)
+        self.assertIs(registry, state_generator._get_network_registry('__default__'))
+
+    def test_update_parallel_pull_before_update(self):
+        image_name = format_image_tag(self.sample_map.get_image('sub_sub_svc'))
+        new_image_id = get_image_id('{0}-updated'.format(image_name))
+        performed = []
+
+        class RecordingRunner(DockerClientRunner):
+            def run_actions(self, actions):
+                for action in actions:
+                    performed.append(action)
+                    config_id = action.config_id
+                    if config_id.config_type == ItemType.IMAGE:
+                        tag = format_image_tag((config_id.config_name, config_id.instance_name))
+                        self._policy.images[action.client_name][tag] = new_image_id
+                return []
+
+        map_client = MappingDockerClient(self.sample_map, self.sample_client_config1)
+        map_client.runner_class = RecordingRunner
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            self._setup_containers(rsps, [
+                _container('sub_sub_svc'),
+            ])
+            map_client.run_actions('update', 'sub_sub_svc', pull_before_update=True, parallel_workers=2)
+        self.assertEqual(ItemType.IMAGE, performed[0].config_id.config_type)
+        self.assertEqual(ItemType.CONTAINER, performed[1].config_id.config_type)
+        self.assertListEqual(DerivedAction.RESET_CONTAINER, performed[1].action_types)
+
 
 
 class TestPolicyStateUtils(unittest.TestCase):
@@ -899,6 +1049,36 @@ class TestPolicyStateUtils(unittest.TestCase):
             (ItemType.IMAGE, map_name, 'registry.example.com/redis', 'latest'),
         ]
 
+    def test_process_index(self):
+        index = ProcessIndex([
+            ['1', 'root', '/usr/bin/app --serve'],
+            ['2', 'app', '/usr/bin/worker -q high'],
+            ['3', 'app', 'sleep 10'],
+        ])
+        self.assertTrue(index.has_command('root', '/usr/bin/app --serve'))
+        self.assertFalse(index.has_command('app', '/usr/bin/app --serve'))
+        self.assertFalse(index.has_command('app', '/usr/bin/worker'))
+        self.assertTrue(index.has_partial_command('app', '/usr/bin/worker'))
+        self.assertTrue(index.has_partial_command('app', 'sleep'))
+        self.assertFalse(index.has_partial_command('app', 'high sleep'))
+        self.assertFalse(index.has_partial_command('nobody', ''))
+
+    def test_network_endpoint_registry(self):
+        container_id = get_container_id('main.server3')
+        network_details = [
+            {'Id': get_network_id(n_name), 'Name': n_name, 'Containers': {
+                container_id: {'Name': 'main.server3', 'EndpointID': get_endpoint_id(n_name, container_id)},
+            }}
+            for n_name in ('main.app_net1', 'main.app_net2')
+        ]
+        policy = self.policy
+        registry = NetworkEndpointRegistry(policy.nname, policy.cname, policy.get_hostname, {}, ['bridge'],
+                                           network_details)
+        expected = {get_network_id(n_name): get_endpoint_id(n_name, container_id)
+                    for n_name in ('main.app_net1', 'main.app_net2')}
+        self.assertDictEqual(registry.get_container_endpoints(container_id), expected)
+        self.assertDictEqual(registry.get_container_endpoints(get_container_id('main.other')), {})
+
     def test_merge_single(self):
         redis_config = self._config_id('redis', 'queue')
         merged_paths = merge_dependency_paths([